@@ -1,10 +1,16 @@
 import pandas as pd
 import os
+import argparse
 import numpy as np
 
+from data_quality import validate_tables, print_report
+from schema import PRIMARY_KEYS
+from incremental import diff_table, apply_changes, new_run_dir, schema_change, write_changelog, summarize_changes
+from store import load_manifest, save_manifest, commit_table, frame_bytes, resolve
+
 # Define file paths
-data_dir = "."
-output_dir = "cleaned"
+data_dir = "data/raw"
+output_dir = "data/cleaned"
 os.makedirs(output_dir, exist_ok=True)
 
 files = [
@@ -64,21 +70,92 @@ def clean_entities(df):
     print(f"  Dropped {initial_shape[0] - final_shape[0]} entities with missing names.")
     return df
 
+CLEANERS = {
+    'anime': clean_anime_df,
+    'entities': clean_entities,
+}
+
+def load_previous_store(names):
+    """Load the previous cleaned tables, re-applying cleaning so dtypes match a fresh drop"""
+    previous = {}
+    for name in names:
+        path = resolve(name, output_dir)
+        if os.path.exists(path):
+            df = pd.read_csv(path, float_precision='round_trip')
+            previous[name] = CLEANERS[name](df) if name in CLEANERS else df
+    return previous
+
+def save_incremental(dfs):
+    """Diff each table against the previous store and only rewrite tables that changed"""
+    print("\nLoading previous cleaned store...")
+    previous = load_previous_store(dfs.keys())
+    manifest = load_manifest(output_dir)
+    run_dir = new_run_dir(output_dir)
+    changesets = {}
+    
+    print("\nApplying changes to /cleaned/ ...")
+    for name, df in dfs.items():
+        if name not in previous:
+            # No previous version: full write, every row is an insert
+            changes = df.assign(op='insert', sign=1)
+            commit_table(manifest, name, frame_bytes(df), output_dir)
+        else:
+            changes = diff_table(previous[name], df, PRIMARY_KEYS[name])
+            added, removed = schema_change(previous[name], df)
+            if added or removed:
+                print(f"  {name}: schema changed (added {added or 'none'}, removed {removed or 'none'})")
+            if len(changes) or added or removed:
+                commit_table(manifest, name, frame_bytes(apply_changes(previous[name], changes)), output_dir)
+        changesets[name] = changes
+        
+        counts = summarize_changes(changes)
+        print(f"  {name}: +{counts['inserts']:,} ~{counts['updates']:,} -{counts['deletes']:,}"
+              + ("" if len(changes) else " (unchanged, not rewritten)"))
+    
+    save_manifest(manifest, output_dir)
+    write_changelog(run_dir, changesets, {name: manifest[name]['hash'] for name in dfs if name in manifest})
+    print(f"  Changelog written to {run_dir}")
+
+def save_tables(dfs):
+    """Store each table by content hash; tables no cleaner touched are stored from their raw bytes"""
+    manifest = load_manifest(output_dir)
+    for name, df in dfs.items():
+        if name in CLEANERS:
+            data = frame_bytes(df)
+        else:
+            with open(os.path.join(data_dir, f"{name}.csv"), "rb") as f:
+                data = f.read()
+        if commit_table(manifest, name, data, output_dir):
+            print(f"  Stored {name} ({manifest[name]['hash'][:12]})")
+        else:
+            print(f"  {name} unchanged, not rewritten")
+    save_manifest(manifest, output_dir)
+
 def main():
+    parser = argparse.ArgumentParser(description="Clean the raw dataset tables")
+    parser.add_argument('--incremental', action='store_true',
+                        help="diff against the previous cleaned store and emit a changelog")
+    args = parser.parse_args()
+    
     dfs = load_data()
     
-    if 'anime' in dfs:
-        dfs['anime'] = clean_anime_df(dfs['anime'])
-        
-    if 'entities' in dfs:
-        dfs['entities'] = clean_entities(dfs['entities'])
+    for name, cleaner in CLEANERS.items():
+        if name in dfs:
+            dfs[name] = cleaner(dfs[name])
+    
+    # Validate keys, relationships and value ranges before saving
+    print("\nValidating cleaned tables...")
+    report = validate_tables(dfs)
+    print_report(report)
+    report.to_csv(os.path.join(output_dir, "quality_report.csv"), index=False)
+    
+    if args.incremental:
+        save_incremental(dfs)
+        return
         
-    # Save cleaned files
-    print("\nSaving cleaned files to /cleaned/ ...")
-    for name, df in dfs.items():
-        output_path = os.path.join(output_dir, f"{name}_cleaned.csv")
-        df.to_csv(output_path, index=False)
-        print(f"  Saved {output_path}")
+    # Save cleaned tables to the content-addressed store
+    print("\nSaving cleaned tables to /cleaned/ ...")
+    save_tables(dfs)
 
 if __name__ == "__main__":
     main()
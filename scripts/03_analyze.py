@@ -2,21 +2,32 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import argparse
+
+from results import save_results
+from tables import add_sample_argument, load_tables, use_sample
+from slices import param, year_window
+from plot_utils import is_large, density_scatter, draw_ols_fit
+from ranking import rank_groups, draw_error_bars, distinct_labels, label_with_stability
+from streaming_stats import summarize
+from chart_plan import planner
 
 # Settings
-input_dir = "data/cleaned"
 output_dir = "output/images"
 os.makedirs(output_dir, exist_ok=True)
 sns.set_theme(style="whitegrid")
 
-def load_data():
-    anime = pd.read_csv(os.path.join(input_dir, "anime_cleaned.csv"))
-    genres = pd.read_csv(os.path.join(input_dir, "anime_genres_cleaned.csv"))
-    companies = pd.read_csv(os.path.join(input_dir, "anime_companies_cleaned.csv"))
-    entities = pd.read_csv(os.path.join(input_dir, "entities_cleaned.csv"))
-    staff = pd.read_csv(os.path.join(input_dir, "anime_staff_cleaned.csv"))
-    voice_actors = pd.read_csv(os.path.join(input_dir, "anime_voice_actors_cleaned.csv"))
-    characters = pd.read_csv(os.path.join(input_dir, "anime_characters_cleaned.csv"))
+def load_data(tables=None):
+    if tables is None:
+        tables = load_tables(["anime", "anime_genres", "anime_companies", "entities",
+                              "anime_staff", "anime_voice_actors", "anime_characters"])
+    anime = tables['anime'].copy()
+    genres = tables['anime_genres']
+    companies = tables['anime_companies']
+    entities = tables['entities']
+    staff = tables['anime_staff']
+    voice_actors = tables['anime_voice_actors']
+    characters = tables['anime_characters']
     
     # Ensure dates are datetime
     anime['start_date'] = pd.to_datetime(anime['start_date'])
@@ -45,6 +56,7 @@ def plot_top_genres(genres_df):
     plt.savefig(os.path.join(output_dir, 'top_genres.png'))
     plt.close()
     print("Generated top_genres.png")
+    return top_genres
 
 def plot_score_vs_popularity(df):
     # Bin popularity (members) into categories to make it understandable
@@ -65,8 +77,9 @@ def plot_score_vs_popularity(df):
     plt.savefig(os.path.join(output_dir, 'score_vs_popularity_binned.png'))
     plt.close()
     print("Generated score_vs_popularity_binned.png")
+    return avg_scores
 
-def plot_top_studios(anime, companies, entities):
+def plot_top_studios(anime, companies, entities, min_count=15):
     # 1. Filter companies for "Studio" role
     studios_rel = companies[companies['role'] == 'Studio']
     
@@ -76,19 +89,27 @@ def plot_top_studios(anime, companies, entities):
     # 3. Merge with Anime to get Score
     studios_full = studios_named.merge(anime[['anime_id', 'score']], on='anime_id')
     
-    # 4. Group by Studio
+    # 4. Group by Studio id (canonical when entities are resolved; distinct studios can share a name)
     # Count movies/shows and Avg Score
-    studio_stats = studios_full.groupby('name').agg(
+    studio_stats = studios_full.groupby('company_id').agg(
+        name=('name', 'first'),
         count=('anime_id', 'count'),
         mean_score=('score', 'mean')
     ).reset_index()
     
-    # 5. Filter: Only studios with > 15 animes (to find consistent quality, not 1-hit wonders)
-    top_studios = studio_stats[studio_stats['count'] > 15].sort_values('mean_score', ascending=False).head(15)
+    # 5. Filter: Only studios with > min_count animes (to find consistent quality, not 1-hit wonders)
+    eligible = studio_stats.loc[studio_stats['count'] > min_count, 'company_id']
+    
+    # 6. Bootstrap CIs and top-15 stability for every eligible studio at once
+    ranked = rank_groups(studios_full, 'company_id', eligible=eligible, top_n=15)
+    top_studios = ranked.head(15).merge(studio_stats[['company_id', 'name', 'count']], on='company_id')
+    top_studios['label'] = distinct_labels(top_studios['name'], top_studios['company_id'])
     
     plt.figure(figsize=(12, 8))
-    sns.barplot(data=top_studios, x='mean_score', y='name', palette='magma')
-    plt.title('Top 15 Anime Studios (Avg Score, >15 Productions)')
+    ax = sns.barplot(data=top_studios, x='mean_score', y='label', palette='magma')
+    draw_error_bars(ax, top_studios)
+    ax.set_yticks(range(len(top_studios)), label_with_stability(top_studios['label'], top_studios['p_top'], 15))
+    plt.title(f'Top 15 Anime Studios (Avg Score with 95% Bootstrap CI, >{min_count} Productions)')
     plt.xlabel('Average Score')
     plt.ylabel('Studio')
     plt.xlim(6, 9) # Zoom in
@@ -96,16 +117,20 @@ def plot_top_studios(anime, companies, entities):
     plt.savefig(os.path.join(output_dir, 'top_studios.png'))
     plt.close()
     print("Generated top_studios.png")
+    return top_studios.drop(columns='label')
 
-def plot_trends_over_time(df):
+def plot_trends_over_time(df, years=(1990, 2024), yearly=None):
+    """Release volume and mean score per year; `yearly` may be the planner's shared per-year stats"""
     df['year'] = df['start_date'].dt.year
-    # Filter valid years (e.g., 1980+)
-    df = df[(df['year'] >= 1990) & (df['year'] <= 2024)]
-    
-    yearly_stats = df.groupby('year').agg(
-        count=('anime_id', 'count'),
-        mean_score=('score', 'mean')
-    ).sort_index()
+    if yearly is None:
+        # Filter valid years (e.g., 1980+)
+        df = df[(df['year'] >= years[0]) & (df['year'] <= years[1])]
+        yearly_stats = df.groupby('year').agg(
+            count=('anime_id', 'count'),
+            mean_score=('score', 'mean')
+        ).sort_index()
+    else:
+        yearly_stats = yearly.loc[(yearly.index >= years[0]) & (yearly.index <= years[1]), ['count', 'mean_score']]
     
     fig, ax1 = plt.subplots(figsize=(12, 6))
     
@@ -124,11 +149,12 @@ def plot_trends_over_time(df):
     ax2.tick_params(axis='y', labelcolor=color)
     ax2.set_ylim(6, 8.5)
     
-    plt.title('Anime Industry Trends: Quantity vs. Quality (1990-2024)')
+    plt.title(f'Anime Industry Trends: Quantity vs. Quality ({years[0]}-{years[1]})')
     fig.tight_layout()
     plt.savefig(os.path.join(output_dir, 'trends_over_time.png'))
     plt.close()
     print("Generated trends_over_time.png")
+    return yearly_stats
 
 def plot_format_comparison(df):
     # Group by Type
@@ -143,26 +169,32 @@ def plot_format_comparison(df):
     plt.savefig(os.path.join(output_dir, 'format_comparison.png'))
     plt.close()
     print("Generated format_comparison.png")
+    return type_stats
 
-def plot_duration_vs_score(df):
+def plot_duration_vs_score(df, max_episodes=150):
     # Filter for standard TV series range (e.g. < 200 eps) to see the trend clearer
     # and exclude movies (1 ep)
-    tv_anime = df[(df['type'] == 'TV') & (df['episodes'] > 1) & (df['episodes'] < 150)]
+    tv_anime = df[(df['type'] == 'TV') & (df['episodes'] > 1) & (df['episodes'] < max_episodes)]
     
     plt.figure(figsize=(10, 6))
-    sns.scatterplot(data=tv_anime, x='episodes', y='score', alpha=0.5, color='purple')
-    
-    # Add a trendline
-    sns.regplot(data=tv_anime, x='episodes', y='score', scatter=False, color='black')
+    if is_large(len(tv_anime)):
+        # Binned density + closed-form fit instead of one marker per title and a bootstrapped CI
+        density_scatter(plt.gca(), tv_anime['episodes'], tv_anime['score'])
+        draw_ols_fit(plt.gca(), tv_anime['episodes'], tv_anime['score'])
+    else:
+        sns.scatterplot(data=tv_anime, x='episodes', y='score', alpha=0.5, color='purple')
+        
+        # Add a trendline
+        sns.regplot(data=tv_anime, x='episodes', y='score', scatter=False, color='black')
     
-    plt.title('Do Longer Series Get Better Scores? (TV Anime < 150 Eps)')
+    plt.title(f'Do Longer Series Get Better Scores? (TV Anime < {max_episodes} Eps)')
     plt.xlabel('Number of Episodes')
     plt.ylabel('Score')
     plt.savefig(os.path.join(output_dir, 'duration_vs_score.png'))
     plt.close()
     print("Generated duration_vs_score.png")
 
-def plot_top_directors(anime, staff, entities):
+def plot_top_directors(anime, staff, entities, min_count=5):
     # 1. Filter for Directors
     # Role often contains multiple roles like "Director, Storyboard", so we use string contains
     directors = staff[staff['role'].str.contains('Director', case=False, na=False)]
@@ -173,18 +205,26 @@ def plot_top_directors(anime, staff, entities):
     # 3. Join with Anime to get Score
     directors_full = directors_named.merge(anime[['anime_id', 'score']], on='anime_id')
     
-    # 4. Group by Director
-    director_stats = directors_full.groupby('name').agg(
+    # 4. Group by Director id (namesakes stay apart)
+    director_stats = directors_full.groupby('person_id').agg(
+        name=('name', 'first'),
         count=('anime_id', 'count'),
         mean_score=('score', 'mean')
     ).reset_index()
     
     # 5. Filter: Min 5 animes to filter out one-hit wonders
-    top_directors = director_stats[director_stats['count'] >= 5].sort_values('mean_score', ascending=False).head(15)
+    eligible = director_stats.loc[director_stats['count'] >= min_count, 'person_id']
+    
+    # 6. Bootstrap CIs and top-15 stability for every eligible director at once
+    ranked = rank_groups(directors_full, 'person_id', eligible=eligible, top_n=15)
+    top_directors = ranked.head(15).merge(director_stats[['person_id', 'name', 'count']], on='person_id')
+    top_directors['label'] = distinct_labels(top_directors['name'], top_directors['person_id'])
     
     plt.figure(figsize=(12, 8))
-    sns.barplot(data=top_directors, x='mean_score', y='name', palette='rocket')
-    plt.title('Top 15 Anime Directors (Avg Score, >5 Titles)')
+    ax = sns.barplot(data=top_directors, x='mean_score', y='label', palette='rocket')
+    draw_error_bars(ax, top_directors)
+    ax.set_yticks(range(len(top_directors)), label_with_stability(top_directors['label'], top_directors['p_top'], 15))
+    plt.title(f'Top 15 Anime Directors (Avg Score with 95% Bootstrap CI, >={min_count} Titles)')
     plt.xlabel('Average Score')
     plt.ylabel('Director')
     plt.xlim(7, 9.5) # Zoom in to see differences
@@ -192,8 +232,10 @@ def plot_top_directors(anime, staff, entities):
     plt.savefig(os.path.join(output_dir, 'top_directors.png'))
     plt.close()
     print("Generated top_directors.png")
+    return top_directors.drop(columns='label')
 
-def plot_top_voice_actors(anime, voice_actors, characters, entities):
+def voice_actor_stats(anime, voice_actors, characters, entities):
+    """Per-VA stats and (person_id, score, m) credit multiplicities (pandas path)"""
     # 1. Filter for Japanese (Original) cast if column exists
     if 'language' in voice_actors.columns:
         voice_actors = voice_actors[voice_actors['language'] == 'Japanese']
@@ -210,18 +252,32 @@ def plot_top_voice_actors(anime, voice_actors, characters, entities):
     # Merge with Entities to get VA Name
     va_named = va_full.merge(entities[['entity_id', 'name']], left_on='person_id', right_on='entity_id')
     
-    # 3. Group by Voice Actor
-    va_stats = va_named.groupby('name').agg(
+    # 3. Group by Voice Actor id (namesakes stay apart)
+    va_stats = va_named.groupby('person_id').agg(
+        name=('name', 'first'),
         count=('anime_id', 'nunique'), # Count distinct anime
         mean_score=('score', 'mean')
     ).reset_index()
+    score_counts = va_named.groupby(['person_id', 'score']).size().reset_index(name='m')
+    return va_stats, score_counts
+
+def plot_top_voice_actors(anime, voice_actors, characters, entities, min_count=15, precomputed=None):
+    """Top VAs by average score; `precomputed` takes voice_actor_stats-shaped results (e.g. lazy engine)"""
+    va_stats, score_counts = precomputed or voice_actor_stats(anime, voice_actors, characters, entities)
     
     # 4. Filter: Min 15 roles for consistency
-    top_vas = va_stats[va_stats['count'] > 15].sort_values('mean_score', ascending=False).head(15)
+    eligible = va_stats.loc[va_stats['count'] > min_count, 'person_id']
+    
+    # 5. Bootstrap CIs and top-15 stability for every eligible VA at once
+    ranked = rank_groups(score_counts, 'person_id', eligible=eligible, top_n=15, weight='m')
+    top_vas = ranked.head(15).merge(va_stats[['person_id', 'name', 'count']], on='person_id')
+    top_vas['label'] = distinct_labels(top_vas['name'], top_vas['person_id'])
     
     plt.figure(figsize=(12, 8))
-    sns.barplot(data=top_vas, x='mean_score', y='name', palette='mako')
-    plt.title('Top 15 Voice Actors (Avg Score of Anime, >15 Roles)')
+    ax = sns.barplot(data=top_vas, x='mean_score', y='label', palette='mako')
+    draw_error_bars(ax, top_vas)
+    ax.set_yticks(range(len(top_vas)), label_with_stability(top_vas['label'], top_vas['p_top'], 15))
+    plt.title(f'Top 15 Voice Actors (Avg Score of Anime with 95% Bootstrap CI, >{min_count} Roles)')
     plt.xlabel('Average Score')
     plt.ylabel('Voice Actor')
     plt.xlim(7, 9)
@@ -229,11 +285,12 @@ def plot_top_voice_actors(anime, voice_actors, characters, entities):
     plt.savefig(os.path.join(output_dir, 'top_voice_actors.png'))
     plt.close()
     print("Generated top_voice_actors.png")
+    return top_vas.drop(columns='label')
 
-def main():
+def main(tables=None, spec=None):
     print("Loading data...")
     try:
-        data = load_data()
+        data = load_data(tables)
         anime, genres, companies, entities, staff, voice_actors, characters = data
     except FileNotFoundError as e:
         print(f"Error: {e}. Run the cleaning script first.")
@@ -241,25 +298,65 @@ def main():
 
     print("Generating Phase 2 & 3 plots...")
     plot_score_distribution(anime)
-    plot_top_genres(genres)
-    plot_score_vs_popularity(anime)
-    plot_top_studios(anime, companies, entities)
-    plot_trends_over_time(anime)
-    plot_format_comparison(anime)
-    plot_duration_vs_score(anime)
+    top_genres = plot_top_genres(genres)
+    popularity_scores = plot_score_vs_popularity(anime)
+    top_studios = plot_top_studios(anime, companies, entities,
+                                   min_count=param(spec, 'min_studio_titles', 15))
+    yearly_stats = plot_trends_over_time(anime, years=year_window(spec, (1990, 2024)),
+                                         **planner(tables, anime=anime).inputs('trends_over_time'))
+    type_stats = plot_format_comparison(anime)
+    plot_duration_vs_score(anime, max_episodes=param(spec, 'max_episodes', 150))
     
     # Phase 3 Plots
-    plot_top_directors(anime, staff, entities)
-    plot_top_voice_actors(anime, voice_actors, characters, entities)
+    top_directors = plot_top_directors(anime, staff, entities,
+                                       min_count=param(spec, 'min_director_titles', 5))
+    va_precomputed = None
+    if param(spec, 'engine', 'pandas') == 'polars':
+        from lazy_engine import voice_actor_stats as lazy_voice_actor_stats
+        va_precomputed = lazy_voice_actor_stats(tables)
+    top_vas = plot_top_voice_actors(anime, voice_actors, characters, entities,
+                                    min_count=param(spec, 'min_va_roles', 15), precomputed=va_precomputed)
+    
+    # One pass over the anime table for moments, extremes, quantiles and correlations
+    stats = summarize(anime)
+    column_stats = stats.summary().set_index('column')
+    score, members, year = column_stats.loc['score'], column_stats.loc['members'], column_stats.loc['year']
     
     # Save a summary text
     with open(os.path.join(output_dir, "summary_stats.txt"), "w") as f:
         f.write(f"Total Anime Analyzed: {len(anime)}\n")
-        f.write(f"Average Score: {anime['score'].mean():.2f}\n")
-        f.write(f"Most Popular Anime: {anime.sort_values('members', ascending=False).iloc[0]['title']}\n")
-        f.write(f"Highest Rated Anime: {anime.sort_values('score', ascending=False).iloc[0]['title']}\n")
+        f.write(f"Average Score: {score['mean']:.2f} (std {score['std']:.2f}, median ~{score['q50']:.2f})\n")
+        f.write(f"Most Popular Anime: {members['argmax_label']}\n")
+        f.write(f"Highest Rated Anime: {score['argmax_label']}\n")
+        f.write(f"Score/Members Correlation: {stats.correlation().loc['score', 'members']:.3f}\n")
     print("Saved summary_stats.txt")
+    
+    save_results('analysis', {
+        'total_anime': len(anime),
+        'unique_characters': characters['character_id'].nunique(),
+        'average_score': score['mean'],
+        'median_score': score['q50'],
+        'year_min': year['min'],
+        'year_max': year['max'],
+        'most_popular_anime': members['argmax_label'],
+        'highest_rated_anime': score['argmax_label'],
+        'column_stats': column_stats.reset_index(),
+        'correlations': stats.correlation().round(4).rename_axis('column').reset_index(),
+        'top_genres': top_genres.rename_axis('genre').reset_index(name='count'),
+        'popularity_groups': popularity_scores.astype({'popularity_group': str}),
+        'yearly_stats': yearly_stats.reset_index(),
+        'format_scores': type_stats,
+        'top_studios': top_studios,
+        'top_directors': top_directors,
+        'top_voice_actors': top_vas,
+    })
     print("All Analysis complete!")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Core analysis figures")
+    parser.add_argument('--engine', choices=['pandas', 'polars'], default='pandas',
+                        help="execution backend for the heavier aggregations")
+    add_sample_argument(parser)
+    args = parser.parse_args()
+    use_sample(args.sample)
+    main(spec={'engine': args.engine})
@@ -2,9 +2,15 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import argparse
+
+from results import save_results
+from tables import add_sample_argument, load_tables, use_sample
+from chart_plan import planner
+from crosstab import (anime_index, crosstab, crosstab_mean, entity_names, incidence, long_format, pivot, studio_pairs,
+                      top_labels)
 
 # Settings
-input_dir = "data/cleaned"
 output_dir = "output/images"
 os.makedirs(output_dir, exist_ok=True)
 sns.set_theme(style="whitegrid")
@@ -22,16 +28,20 @@ def get_season(month):
     else:  # 12, 1, 2
         return 'Winter'
 
-def load_data():
-    anime = pd.read_csv(os.path.join(input_dir, "anime_cleaned.csv"))
-    genres = pd.read_csv(os.path.join(input_dir, "anime_genres_cleaned.csv"))
+def load_data(tables=None):
+    if tables is None:
+        tables = load_tables(["anime", "anime_genres", "anime_companies", "entities"])
+    anime = tables['anime'].copy()
+    genres = tables['anime_genres']
+    companies = tables['anime_companies']
+    entities = tables['entities']
     
     # Ensure dates are datetime
     anime['start_date'] = pd.to_datetime(anime['start_date'])
     anime['month'] = anime['start_date'].dt.month
     anime['season'] = anime['month'].apply(get_season)
     
-    return anime, genres
+    return anime, genres, companies, entities
 
 def plot_seasonal_scores(anime):
     # Filter out Unknown
@@ -60,28 +70,19 @@ def plot_seasonal_scores(anime):
     plt.close()
     print("Generated seasonal_scores.png")
 
-def plot_seasonal_genres(anime, genres):
-    # Merge anime with genres
-    anime_genres = anime.merge(genres, on='anime_id')
-    
-    # Filter out Unknown season
-    seasonal_genres = anime_genres[anime_genres['season'] != 'Unknown']
-    
-    # Get top 10 genres overall
-    top_genres = genres['genre'].value_counts().head(10).index.tolist()
-    
-    # Filter to top genres
-    seasonal_genres = seasonal_genres[seasonal_genres['genre'].isin(top_genres)]
-    
-    # Count by season and genre
-    season_genre_counts = seasonal_genres.groupby(['season', 'genre']).size().reset_index(name='count')
-    
-    # Pivot for heatmap
-    pivot_data = season_genre_counts.pivot(index='genre', columns='season', values='count').fillna(0)
-    
-    # Reindex to ensure all seasons are present
+def plot_seasonal_genres(anime, genres, genre_counts=None):
+    # Genre x season counts as one sparse product over the anime with a known season
+    dated = anime[anime['season'] != 'Unknown']
+    index = anime_index(dated)
+    genre_sets = incidence(genres, index, key='genre')
+    seasons = incidence(dated, index, key='season')
+    
+    # Top 10 genres overall, one column per season
+    if genre_counts is None:
+        genre_counts = genres['genre'].value_counts()
+    top_genres = genre_counts.head(10).index.tolist()
     season_order = ['Spring', 'Summer', 'Fall', 'Winter']
-    pivot_data = pivot_data.reindex(columns=season_order, fill_value=0)
+    pivot_data = pivot(crosstab(genre_sets, seasons)).reindex(index=top_genres, columns=season_order, fill_value=0)
     
     plt.figure(figsize=(10, 8))
     sns.heatmap(pivot_data, annot=True, fmt='g', cmap='YlOrRd', cbar_kws={'label': 'Count'})
@@ -93,6 +94,37 @@ def plot_seasonal_genres(anime, genres):
     plt.close()
     print("Generated seasonal_genres.png")
 
+def plot_studio_seasons(anime, companies, entities, top=15):
+    """Mean score of the most prolific studios' releases in each season"""
+    dated = anime[anime['season'] != 'Unknown']
+    index = anime_index(dated)
+    studios = incidence(studio_pairs(companies, entities), index)
+    seasons = incidence(dated, index, key='season')
+    scores = dated.drop_duplicates('anime_id').set_index('anime_id')['score'].reindex(index)
+    
+    season_order = ['Spring', 'Summer', 'Fall', 'Winter']
+    top_studios = top_labels(studios, top)
+    mean, count = crosstab_mean(studios, seasons, scores)
+    mean_scores = pivot(mean, top_studios).reindex(columns=season_order)
+    counts = pivot(count, top_studios).reindex(columns=season_order, fill_value=0)
+    mean_scores = mean_scores.where(counts > 0)
+    
+    plt.figure(figsize=(10, 9))
+    sns.heatmap(mean_scores.set_axis(entity_names(mean_scores.index, entities)), annot=True, fmt='.2f', cmap='RdYlGn',
+                cbar_kws={'label': 'Mean Score'})
+    plt.title(f'Mean Score by Season for the Top {top} Studios')
+    plt.xlabel('Season')
+    plt.ylabel('Studio')
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'studio_seasons.png'))
+    plt.close()
+    print("Generated studio_seasons.png")
+    studio_seasons = long_format(mean_scores.round(3).fillna(0), 'company_id', 'season', 'mean_score').merge(
+        long_format(counts.astype(int), 'company_id', 'season', 'count'), on=['company_id', 'season']
+    ).astype({'company_id': int})
+    studio_seasons.insert(1, 'studio', entity_names(studio_seasons['company_id'], entities))
+    return studio_seasons
+
 def plot_seasonal_volume(anime):
     # Count anime per season
     seasonal_data = anime[anime['season'] != 'Unknown']
@@ -113,13 +145,14 @@ def plot_seasonal_volume(anime):
     plt.close()
     print("Generated seasonal_volume.png")
 
-def main():
+def main(tables=None, spec=None):
     print("Loading data for seasonal analysis...")
-    anime, genres = load_data()
+    anime, genres, companies, entities = load_data(tables)
     
     print("Generating seasonal plots...")
     plot_seasonal_scores(anime)
-    plot_seasonal_genres(anime, genres)
+    plot_seasonal_genres(anime, genres, **planner(tables, anime=anime, anime_genres=genres).inputs('seasonal_genres'))
+    studio_seasons = plot_studio_seasons(anime, companies, entities)
     plot_seasonal_volume(anime)
     
     # Print summary stats
@@ -128,8 +161,14 @@ def main():
     seasonal_stats = seasonal_stats.reindex(season_order)
     print("\nSeasonal Statistics:")
     print(seasonal_stats)
+    save_results('seasonal', {'seasonal_stats': seasonal_stats.rename_axis('season').reset_index(),
+                              'studio_seasons': studio_seasons})
     
     print("\nSeasonal analysis complete!")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seasonal analysis figures")
+    add_sample_argument(parser)
+    args = parser.parse_args()
+    use_sample(args.sample)
     main()
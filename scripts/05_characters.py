@@ -2,18 +2,21 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import argparse
+
+from results import save_results
+from tables import add_sample_argument, load_tables, use_sample
+from franchises import franchise_labels, franchise_summary
 
 # Settings
-input_dir = "data/cleaned"
 output_dir = "output/images"
 os.makedirs(output_dir, exist_ok=True)
 sns.set_theme(style="whitegrid")
 
-def load_data():
-    anime = pd.read_csv(os.path.join(input_dir, "anime_cleaned.csv"))
-    characters = pd.read_csv(os.path.join(input_dir, "anime_characters_cleaned.csv"))
-    entities = pd.read_csv(os.path.join(input_dir, "entities_cleaned.csv"))
-    return anime, characters, entities
+def load_data(tables=None):
+    if tables is None:
+        tables = load_tables(["anime", "anime_characters", "entities"])
+    return tables['anime'].copy(), tables['anime_characters'], tables['entities']
 
 def plot_character_roles(characters):
     """Distribution of character roles - Top 10 only"""
@@ -83,21 +86,82 @@ def plot_role_impact(anime, characters):
     plt.close()
     print("Generated role_impact.png")
 
-def main():
+def plot_top_franchises(summary, top=15):
+    """Largest multi-title franchises (titles linked by shared characters) by total members"""
+    top_franchises = summary[summary['n_titles'] > 1].head(top)
+    
+    plt.figure(figsize=(12, 8))
+    plt.barh(range(len(top_franchises)), top_franchises['total_members'] / 1e6, color='#FF6B6B')
+    plt.yticks(range(len(top_franchises)), top_franchises['name'])
+    plt.xlabel('Total Members Across Titles (millions)', fontsize=12)
+    plt.ylabel('Franchise (earliest title)', fontsize=12)
+    plt.title(f'Top {top} Franchises by Total Members', fontsize=14, fontweight='bold')
+    plt.gca().invert_yaxis()
+    
+    # Annotate with title count and average score
+    for i, row in enumerate(top_franchises.itertuples()):
+        plt.text(row.total_members / 1e6, i, f"  {row.n_titles} titles, avg {row.mean_score:.2f}",
+                 va='center', fontsize=10)
+    
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'top_franchises.png'), dpi=150, bbox_inches='tight')
+    plt.close()
+    print("Generated top_franchises.png")
+    return top_franchises
+
+def plot_franchise_trajectories(anime, labels, summary, top=8):
+    """Score of each entry in release order for the franchises with the most titles"""
+    largest = summary[summary['n_titles'] > 1].nlargest(top, 'n_titles')
+    entries = anime[['anime_id', 'score', 'start_date']].merge(labels, on='anime_id')
+    entries = entries[entries['franchise_id'].isin(largest['franchise_id'])].dropna(subset=['score', 'start_date'])
+    entries = entries.sort_values('start_date')
+    
+    plt.figure(figsize=(14, 7))
+    for row in largest.itertuples():
+        data = entries[entries['franchise_id'] == row.franchise_id]
+        plt.plot(data['start_date'], data['score'], marker='o', linewidth=1.5, label=f"{row.name} ({row.n_titles})")
+    plt.title(f'Score Trajectories of the {top} Largest Franchises', fontsize=14, fontweight='bold')
+    plt.xlabel('Release Date', fontsize=12)
+    plt.ylabel('Score', fontsize=12)
+    plt.legend(fontsize=9, loc='best')
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'franchise_trajectories.png'), dpi=150, bbox_inches='tight')
+    plt.close()
+    print("Generated franchise_trajectories.png")
+
+def main(tables=None, spec=None):
     print("Loading data for character analysis...")
-    anime, characters, entities = load_data()
+    anime, characters, entities = load_data(tables)
     
     print("Generating character plots...")
     plot_character_roles(characters)
     plot_top_characters(characters, entities)
     plot_role_impact(anime, characters)
     
+    # Franchises: anime linked by shared characters
+    labels = franchise_labels(anime['anime_id'], characters)
+    summary = franchise_summary(anime, labels)
+    top_franchises = plot_top_franchises(summary)
+    plot_franchise_trajectories(anime, labels, summary)
+    
     print("\nCharacter Analysis Statistics:")
     print(f"Total unique characters: {characters['character_id'].nunique()}")
     print(f"Total character-anime relationships: {len(characters)}")
     print(f"\nRole distribution:\n{characters['role'].value_counts()}")
+    save_results('characters', {
+        'unique_characters': characters['character_id'].nunique(),
+        'character_relationships': len(characters),
+        'role_counts': characters['role'].value_counts().head(10),
+        'n_franchises': int((summary['n_titles'] > 1).sum()),
+        'top_franchises': top_franchises,
+    })
     
     print("\nCharacter analysis complete!")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Character analysis figures")
+    add_sample_argument(parser)
+    args = parser.parse_args()
+    use_sample(args.sample)
     main()
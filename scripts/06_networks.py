@@ -2,42 +2,44 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import argparse
+
+from results import save_results
+from tables import add_sample_argument, load_tables, use_sample
+from slices import param
+from crosstab import (anime_index, crosstab, director_pairs, entity_names, incidence, label_positions, long_format,
+                      pivot, studio_pairs, top_cells, top_labels, voice_actor_pairs)
+from chart_plan import planner
 import numpy as np
 
 # Settings
-input_dir = "data/cleaned"
 output_dir = "output/images"
 os.makedirs(output_dir, exist_ok=True)
 sns.set_theme(style="whitegrid")
 
-def load_data():
-    companies = pd.read_csv(os.path.join(input_dir, "anime_companies_cleaned.csv"))
-    entities = pd.read_csv(os.path.join(input_dir, "entities_cleaned.csv"))
-    staff = pd.read_csv(os.path.join(input_dir, "anime_staff_cleaned.csv"))
-    anime = pd.read_csv(os.path.join(input_dir, "anime_cleaned.csv"))
-    genres = pd.read_csv(os.path.join(input_dir, "anime_genres_cleaned.csv"))
-    return companies, entities, staff, anime, genres
+def load_data(tables=None):
+    if tables is None:
+        tables = load_tables(["anime_companies", "entities", "anime_staff", "anime", "anime_genres",
+                              "anime_voice_actors", "anime_characters"])
+    return (tables['anime_companies'], tables['entities'], tables['anime_staff'],
+            tables['anime'].copy(), tables['anime_genres'],
+            tables['anime_voice_actors'], tables['anime_characters'])
 
 def plot_director_studio_network(companies, entities, staff, anime):
     """Analyze director-studio collaboration patterns"""
-    # Get directors
-    directors = staff[staff['role'].str.contains('Director', case=False, na=False)]
-    directors_named = directors.merge(entities[['entity_id', 'name']], left_on='person_id', right_on='entity_id')
-    directors_named = directors_named.rename(columns={'name': 'director_name'})
-    
-    # Get studios
-    studios = companies[companies['role'] == 'Studio']
-    studios_named = studios.merge(entities[['entity_id', 'name']], left_on='company_id', right_on='entity_id')
-    studios_named = studios_named.rename(columns={'name': 'studio_name'})
-    
-    # Merge to find director-studio collaborations
-    collab = directors_named.merge(studios_named, on='anime_id')
-    
-    # Count collaborations
-    collab_counts = collab.groupby(['director_name', 'studio_name']).size().reset_index(name='collaborations')
+    # Director x studio collaboration counts as one sparse product over shared anime
+    director_credits = director_pairs(staff, entities)
+    studio_credits = studio_pairs(companies, entities)
+    index = anime_index(director_credits, studio_credits)
+    directors = incidence(director_credits, index)
+    studios = incidence(studio_credits, index)
+    collab_counts = crosstab(directors, studios)
     
     # Get top collaborations
-    top_collabs = collab_counts.nlargest(15, 'collaborations')
+    top_collabs = top_cells(collab_counts, 15, 'collaborations').rename(
+        columns={'row': 'director_id', 'col': 'studio_id'}).astype({'collaborations': int})
+    top_collabs['director_name'] = entity_names(top_collabs['director_id'], entities)
+    top_collabs['studio_name'] = entity_names(top_collabs['studio_id'], entities)
     
     # Create visualization
     plt.figure(figsize=(12, 8))
@@ -54,30 +56,29 @@ def plot_director_studio_network(companies, entities, staff, anime):
     plt.savefig(os.path.join(output_dir, 'director_studio_network.png'))
     plt.close()
     print("Generated director_studio_network.png")
+    return top_collabs
 
-def plot_studio_genre_heatmap(companies, entities, anime, genres):
-    """Studio genre specialization heatmap"""
-    # Get studios
-    studios = companies[companies['role'] == 'Studio']
-    studios_named = studios.merge(entities[['entity_id', 'name']], left_on='company_id', right_on='entity_id')
+def studio_genre_counts(companies, entities, anime, genres, genre_counts=None):
+    """(company_id, name, genre, count) for the top 10 studios x top 10 genres (pandas path)"""
+    index = anime_index(anime)
+    studios = incidence(studio_pairs(companies, entities), index)
+    genre_sets = incidence(genres, index, key='genre')
     
-    # Merge with anime and genres
-    studio_anime = studios_named.merge(anime[['anime_id']], on='anime_id')
-    studio_genres = studio_anime.merge(genres, on='anime_id')
-    
-    # Get top 10 studios and top 10 genres
-    top_studios = studios_named['name'].value_counts().head(10).index.tolist()
-    top_genres = genres['genre'].value_counts().head(10).index.tolist()
-    
-    # Filter
-    studio_genres_filtered = studio_genres[
-        (studio_genres['name'].isin(top_studios)) & 
-        (studio_genres['genre'].isin(top_genres))
-    ]
+    # Studio x genre counts, restricted to the most frequent studios and genres
+    top_genres = top_labels(genre_sets, 10) if genre_counts is None else label_positions(genre_sets, genre_counts.index[:10])
+    counts = pivot(crosstab(studios, genre_sets), top_labels(studios, 10), top_genres)
+    heatmap_data = long_format(counts, 'company_id', 'genre').astype({'company_id': int, 'count': int})
+    heatmap_data.insert(1, 'name', entity_names(heatmap_data['company_id'], entities))
+    return heatmap_data.sort_values(['name', 'company_id', 'genre'], ignore_index=True)
+
+def plot_studio_genre_heatmap(companies, entities, anime, genres, heatmap_data=None, genre_counts=None):
+    """Studio genre specialization heatmap; `heatmap_data` may be precomputed (e.g. lazy engine)"""
+    if heatmap_data is None:
+        heatmap_data = studio_genre_counts(companies, entities, anime, genres, genre_counts)
     
-    # Create pivot table
-    heatmap_data = studio_genres_filtered.groupby(['name', 'genre']).size().reset_index(name='count')
-    pivot = heatmap_data.pivot(index='name', columns='genre', values='count').fillna(0)
+    # Create pivot table (rows by studio id, labelled by name)
+    pivot = heatmap_data.pivot(index=['name', 'company_id'], columns='genre', values='count').fillna(0)
+    pivot = pivot.droplevel('company_id')
     
     plt.figure(figsize=(14, 8))
     sns.heatmap(pivot, annot=True, fmt='g', cmap='YlGnBu', cbar_kws={'label': 'Count'})
@@ -89,15 +90,57 @@ def plot_studio_genre_heatmap(companies, entities, anime, genres):
     plt.close()
     print("Generated studio_genre_heatmap.png")
 
-def main():
+def plot_voice_actor_genre_heatmap(voice_actors, characters, entities, anime, genres, top=15, n_genres=10):
+    """Share of each prolific voice actor's titles in each of the most common genres"""
+    index = anime_index(anime)
+    vas = incidence(voice_actor_pairs(voice_actors, characters, entities), index, binary=True)
+    genre_sets = incidence(genres, index, key='genre', binary=True)
+    top_vas = top_labels(vas, top)
+    
+    counts = pivot(crosstab(vas, genre_sets), top_vas, top_labels(genre_sets, n_genres))
+    titles = np.asarray(vas[0][:, top_vas].sum(axis=0)).ravel()
+    share = counts.div(titles, axis=0) * 100
+    
+    plt.figure(figsize=(14, 9))
+    sns.heatmap(share.set_axis(entity_names(share.index, entities)), annot=True, fmt='.0f', cmap='PuRd', cbar_kws={'label': '% of the VA\'s titles'})
+    plt.title(f'Voice Actor Genre Profile (Top {top} VAs by Titles × Top {n_genres} Genres)')
+    plt.xlabel('Genre')
+    plt.ylabel('Voice Actor')
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'va_genre_heatmap.png'))
+    plt.close()
+    print("Generated va_genre_heatmap.png")
+    va_genres = long_format(share.round(1), 'person_id', 'genre', 'share').astype({'person_id': int})
+    va_genres.insert(1, 'name', entity_names(va_genres['person_id'], entities))
+    return va_genres
+
+def main(tables=None, spec=None):
     print("Loading data for network analysis...")
-    companies, entities, staff, anime, genres = load_data()
+    companies, entities, staff, anime, genres, voice_actors, characters = load_data(tables)
     
     print("Generating network visualizations...")
-    plot_director_studio_network(companies, entities, staff, anime)
-    plot_studio_genre_heatmap(companies, entities, anime, genres)
+    top_collabs = plot_director_studio_network(companies, entities, staff, anime)
+    heatmap_data = None
+    if param(spec, 'engine', 'pandas') == 'polars':
+        from lazy_engine import studio_genre_counts as lazy_studio_genre_counts
+        heatmap_data = lazy_studio_genre_counts(tables)
+    plot_studio_genre_heatmap(companies, entities, anime, genres, heatmap_data,
+                              **planner(tables, anime=anime, anime_genres=genres).inputs('studio_genre_heatmap'))
+    va_genres = plot_voice_actor_genre_heatmap(voice_actors, characters, entities, anime, genres)
+    
+    save_results('networks', {
+        'top_collaborations': top_collabs.sort_values('collaborations', ascending=False)[
+            ['director_id', 'director_name', 'studio_id', 'studio_name', 'collaborations']],
+        'voice_actor_genre_share': va_genres,
+    })
     
     print("\nNetwork analysis complete!")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Network analysis figures")
+    parser.add_argument('--engine', choices=['pandas', 'polars'], default='pandas',
+                        help="execution backend for the heavier aggregations")
+    add_sample_argument(parser)
+    args = parser.parse_args()
+    use_sample(args.sample)
+    main(spec={'engine': args.engine})
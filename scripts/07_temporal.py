@@ -2,32 +2,46 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import argparse
+
+from results import save_results
+from tables import add_sample_argument, load_tables, use_sample
+from slices import decade_window, param, year_window
+from chart_plan import planner
 
 # Settings
-input_dir = "data/cleaned"
 output_dir = "output/images"
 os.makedirs(output_dir, exist_ok=True)
 sns.set_theme(style="whitegrid")
 
-def load_data():
-    anime = pd.read_csv(os.path.join(input_dir, "anime_cleaned.csv"))
-    genres = pd.read_csv(os.path.join(input_dir, "anime_genres_cleaned.csv"))
+def load_data(tables=None):
+    if tables is None:
+        tables = load_tables(["anime", "anime_genres"])
+    anime = tables['anime'].copy()
+    genres = tables['anime_genres']
     anime['start_date'] = pd.to_datetime(anime['start_date'])
     anime['year'] = anime['start_date'].dt.year
     anime['decade'] = (anime['year'] // 10) * 10
     return anime, genres
 
-def plot_genre_evolution(anime, genres):
-    """Decade-by-decade genre evolution"""
+def genre_decade_counts(anime, genres, decades=(1980, 2020), genre_counts=None):
+    """(decade, genre, count) for the top 5 genres, plus those genres (pandas path)"""
     anime_genres = anime.merge(genres, on='anime_id')
-    anime_genres = anime_genres[(anime_genres['decade'] >= 1980) & (anime_genres['decade'] <= 2020)]
+    anime_genres = anime_genres[(anime_genres['decade'] >= decades[0]) & (anime_genres['decade'] <= decades[1])]
     
     # Get top 5 genres
-    top_genres = genres['genre'].value_counts().head(5).index.tolist()
+    if genre_counts is None:
+        genre_counts = genres['genre'].value_counts()
+    top_genres = genre_counts.head(5).index.tolist()
     anime_genres = anime_genres[anime_genres['genre'].isin(top_genres)]
     
     # Count by decade and genre
     decade_genre = anime_genres.groupby(['decade', 'genre']).size().reset_index(name='count')
+    return decade_genre, top_genres
+
+def plot_genre_evolution(anime, genres, decades=(1980, 2020), precomputed=None, genre_counts=None):
+    """Decade-by-decade genre evolution; `precomputed` may come from the lazy engine"""
+    decade_genre, top_genres = precomputed or genre_decade_counts(anime, genres, decades, genre_counts)
     
     plt.figure(figsize=(14, 8))
     for genre in top_genres:
@@ -44,17 +58,17 @@ def plot_genre_evolution(anime, genres):
     plt.close()
     print("Generated genre_evolution.png")
 
-def plot_episode_trends(anime):
+def plot_episode_trends(anime, years=(1990, 2024), max_episodes=200):
     """Episode count trends over time"""
-    anime_filtered = anime[(anime['year'] >= 1990) & (anime['year'] <= 2024) & (anime['type'] == 'TV')]
-    anime_filtered = anime_filtered[anime_filtered['episodes'] < 200]  # Filter outliers
+    anime_filtered = anime[(anime['year'] >= years[0]) & (anime['year'] <= years[1]) & (anime['type'] == 'TV')]
+    anime_filtered = anime_filtered[anime_filtered['episodes'] < max_episodes]  # Filter outliers
     
     yearly_eps = anime_filtered.groupby('year')['episodes'].agg(['mean', 'median']).reset_index()
     
     plt.figure(figsize=(14, 6))
     plt.plot(yearly_eps['year'], yearly_eps['mean'], label='Mean Episodes', linewidth=2, marker='o')
     plt.plot(yearly_eps['year'], yearly_eps['median'], label='Median Episodes', linewidth=2, marker='s')
-    plt.title('TV Anime Episode Count Trends (1990-2024)')
+    plt.title(f'TV Anime Episode Count Trends ({years[0]}-{years[1]})')
     plt.xlabel('Year')
     plt.ylabel('Number of Episodes')
     plt.legend()
@@ -63,12 +77,16 @@ def plot_episode_trends(anime):
     plt.savefig(os.path.join(output_dir, 'episode_trends.png'))
     plt.close()
     print("Generated episode_trends.png")
+    return yearly_eps
 
-def plot_score_inflation(anime):
-    """Score inflation/deflation analysis"""
-    anime_filtered = anime[(anime['year'] >= 1990) & (anime['year'] <= 2024)]
-    
-    yearly_scores = anime_filtered.groupby('year')['score'].agg(['mean', 'std']).reset_index()
+def plot_score_inflation(anime, years=(1990, 2024), yearly=None):
+    """Score inflation/deflation analysis; `yearly` may be the planner's shared per-year stats"""
+    if yearly is None:
+        anime_filtered = anime[(anime['year'] >= years[0]) & (anime['year'] <= years[1])]
+        yearly_scores = anime_filtered.groupby('year')['score'].agg(['mean', 'std']).reset_index()
+    else:
+        window = yearly.loc[(yearly.index >= years[0]) & (yearly.index <= years[1])]
+        yearly_scores = window[['mean_score', 'std_score']].set_axis(['mean', 'std'], axis=1).rename_axis('year').reset_index()
     
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
     
@@ -92,17 +110,38 @@ def plot_score_inflation(anime):
     plt.savefig(os.path.join(output_dir, 'score_inflation.png'))
     plt.close()
     print("Generated score_inflation.png")
+    return yearly_scores
 
-def main():
+def main(tables=None, spec=None):
     print("Loading data for temporal analysis...")
-    anime, genres = load_data()
+    anime, genres = load_data(tables)
+    years = year_window(spec, (1990, 2024))
     
     print("Generating temporal plots...")
-    plot_genre_evolution(anime, genres)
-    plot_episode_trends(anime)
-    plot_score_inflation(anime)
+    plan = planner(tables, anime=anime, anime_genres=genres)
+    decades = decade_window(spec, (1980, 2020))
+    genre_precomputed = None
+    if param(spec, 'engine', 'pandas') == 'polars':
+        from lazy_engine import genre_decade_counts as lazy_genre_decade_counts
+        genre_precomputed = lazy_genre_decade_counts(tables, decades)
+    plot_genre_evolution(anime, genres, decades=decades, precomputed=genre_precomputed,
+                         **plan.inputs('genre_evolution'))
+    yearly_eps = plot_episode_trends(anime, years=years)
+    yearly_scores = plot_score_inflation(anime, years=years, **plan.inputs('score_inflation'))
+    
+    save_results('temporal', {
+        'overall_mean_score': yearly_scores['mean'].mean(),
+        'yearly_scores': yearly_scores,
+        'yearly_episodes': yearly_eps,
+    })
     
     print("\nTemporal analysis complete!")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Temporal analysis figures")
+    parser.add_argument('--engine', choices=['pandas', 'polars'], default='pandas',
+                        help="execution backend for the heavier aggregations")
+    add_sample_argument(parser)
+    args = parser.parse_args()
+    use_sample(args.sample)
+    main(spec={'engine': args.engine})
@@ -1,23 +1,34 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, GroupShuffleSplit
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import json
+import argparse
+import joblib
+
+from results import save_results, to_builtin
+from tables import add_sample_argument, load_tables, use_sample
+from slices import param, year_window
+from plot_utils import is_large, density_scatter
+from explain import explain, N_REPEATS
 
 # Settings
-input_dir = "data/cleaned"
 output_dir = "output/images"
+model_dir = "data/models"
 os.makedirs(output_dir, exist_ok=True)
 sns.set_theme(style="whitegrid")
 
-def load_and_prepare_data():
+def load_and_prepare_data(tables=None):
     """Load and engineer features for ML model"""
-    anime = pd.read_csv(os.path.join(input_dir, "anime_cleaned.csv"))
-    genres = pd.read_csv(os.path.join(input_dir, "anime_genres_cleaned.csv"))
-    companies = pd.read_csv(os.path.join(input_dir, "anime_companies_cleaned.csv"))
+    if tables is None:
+        tables = load_tables(["anime", "anime_genres", "anime_companies"])
+    anime = tables['anime'].copy()
+    genres = tables['anime_genres']
+    companies = tables['anime_companies']
     
     # Feature engineering
     anime['start_date'] = pd.to_datetime(anime['start_date'])
@@ -38,25 +49,40 @@ def load_and_prepare_data():
     
     return anime
 
-def train_model(anime):
+def train_model(anime, years=(1990, 2024), synopsis=None, group_col=None, n_jobs=-1):
     """Train Random Forest model to predict scores"""
     # Select features
     features = ['year', 'month', 'episodes', 'genre_count', 'has_studio']
     
     # Filter valid data
-    df = anime[features + ['score']].dropna()
-    df = df[(df['year'] >= 1990) & (df['year'] <= 2024)]
+    extra = [group_col] if group_col else []
+    df = anime[['anime_id'] + features + ['score'] + extra].dropna()
+    df = df[(df['year'] >= years[0]) & (df['year'] <= years[1])]
     df = df[df['episodes'] < 500]  # Remove outliers
     
-    X = df[features]
-    y = df['score']
-    
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Split rows (optionally keeping each group, e.g. a franchise, entirely on one side)
+    if group_col:
+        splitter = GroupShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
+        train_idx, test_idx = next(splitter.split(df, groups=df[group_col]))
+    else:
+        train_idx, test_idx = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+    train, test = df.iloc[train_idx].copy(), df.iloc[test_idx].copy()
+    
+    # Text feature: ridge score from the synopsis TF-IDF (stays sparse), fitted on training rows only
+    if synopsis is not None:
+        from text_features import align_rows, synopsis_score_feature
+        print("Adding synopsis text feature...")
+        text = align_rows(synopsis[0], synopsis[1], df['anime_id'])
+        groups = train[group_col] if group_col else None
+        train['synopsis_score'], test['synopsis_score'] = synopsis_score_feature(
+            text[train_idx], train['score'], text[test_idx], groups=groups)
+        features = features + ['synopsis_score']
+    
+    X_train, X_test, y_train, y_test = train[features], test[features], train['score'], test['score']
     
     # Train model
     print("Training Random Forest model...")
-    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
     model.fit(X_train, y_train)
     
     # Predictions
@@ -64,35 +90,66 @@ def train_model(anime):
     y_pred_test = model.predict(X_test)
     
     # Metrics
+    metrics = {
+        'train_r2': r2_score(y_train, y_pred_train),
+        'test_r2': r2_score(y_test, y_pred_test),
+        'test_mae': mean_absolute_error(y_test, y_pred_test),
+        'test_rmse': np.sqrt(mean_squared_error(y_test, y_pred_test)),
+        'n_train': len(X_train),
+        'n_test': len(X_test),
+        'split': group_col or 'random',
+    }
     print("\n=== Model Performance ===")
-    print(f"Train R² Score: {r2_score(y_train, y_pred_train):.4f}")
-    print(f"Test R² Score: {r2_score(y_test, y_pred_test):.4f}")
-    print(f"Test MAE: {mean_absolute_error(y_test, y_pred_test):.4f}")
-    print(f"Test RMSE: {np.sqrt(mean_squared_error(y_test, y_pred_test)):.4f}")
+    print(f"Train R² Score: {metrics['train_r2']:.4f}")
+    print(f"Test R² Score: {metrics['test_r2']:.4f}")
+    print(f"Test MAE: {metrics['test_mae']:.4f}")
+    print(f"Test RMSE: {metrics['test_rmse']:.4f}")
     
-    return model, X_test, y_test, y_pred_test, features
+    return model, X_test, y_test, y_pred_test, features, metrics
 
-def plot_feature_importance(model, features):
-    """Plot feature importance"""
-    importances = pd.DataFrame({
-        'feature': features,
-        'importance': model.feature_importances_
-    }).sort_values('importance', ascending=False)
-    
-    plt.figure(figsize=(10, 6))
-    sns.barplot(data=importances, x='importance', y='feature', palette='rocket')
-    plt.title('Feature Importance for Score Prediction')
-    plt.xlabel('Importance')
-    plt.ylabel('Feature')
+def plot_feature_importance(importances):
+    """Plot held-out permutation importance (±1 std over repeats) next to mean |tree-path contribution|"""
+    fig, axes = plt.subplots(1, 2, figsize=(14, 6), sharey=True)
+    order = importances['feature']
+    axes[0].barh(order, importances['importance'], xerr=importances['std'], color='#C44E52', capsize=3)
+    axes[0].set_title('Permutation Importance (test MSE increase)')
+    axes[0].set_xlabel('Increase in MSE when shuffled')
+    axes[0].set_ylabel('Feature')
+    axes[0].invert_yaxis()
+    axes[1].barh(order, importances['mean_abs_contribution'], color='#4C72B0')
+    axes[1].set_title('Mean |Tree-Path Contribution|')
+    axes[1].set_xlabel('Score points')
+    fig.suptitle('Feature Importance for Score Prediction (held-out data)')
     plt.tight_layout()
     plt.savefig(os.path.join(output_dir, 'feature_importance.png'))
     plt.close()
     print("Generated feature_importance.png")
 
+def save_model(model, features, metrics):
+    """Save the trained model (joblib) and its feature list and metrics next to it"""
+    os.makedirs(model_dir, exist_ok=True)
+    path = os.path.join(model_dir, "score_model.joblib")
+    joblib.dump(model, path, compress=3)
+    with open(os.path.join(model_dir, "score_model.json"), "w") as f:
+        json.dump({'features': features, 'metrics': to_builtin(metrics)}, f, indent=2)
+    print(f"Saved {path}")
+
+def save_predictions(anime, y_test, y_pred_test):
+    """Save the held-out predictions (anime_id, title, actual, predicted, residual) next to the model"""
+    os.makedirs(model_dir, exist_ok=True)
+    predictions = anime.loc[y_test.index, ['anime_id', 'title']].assign(
+        actual=y_test.to_numpy(), predicted=y_pred_test, residual=y_pred_test - y_test.to_numpy())
+    path = os.path.join(model_dir, "predictions.csv")
+    predictions.to_csv(path, index=False)
+    print(f"Saved {path}")
+
 def plot_prediction_accuracy(y_test, y_pred_test):
     """Plot actual vs predicted scores"""
     plt.figure(figsize=(10, 6))
-    plt.scatter(y_test, y_pred_test, alpha=0.3, s=10)
+    if is_large(len(y_test)):
+        density_scatter(plt.gca(), y_test, y_pred_test, cmap='Blues', label='Test titles per bin')
+    else:
+        plt.scatter(y_test, y_pred_test, alpha=0.3, s=10)
     plt.plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 'r--', lw=2, label='Perfect Prediction')
     plt.xlabel('Actual Score')
     plt.ylabel('Predicted Score')
@@ -104,23 +161,58 @@ def plot_prediction_accuracy(y_test, y_pred_test):
     plt.close()
     print("Generated prediction_accuracy.png")
 
-def main():
+def main(tables=None, spec=None):
     print("Loading and preparing data for ML model...")
-    anime = load_and_prepare_data()
+    anime = load_and_prepare_data(tables)
     
     print(f"Dataset size: {len(anime)} anime")
     
-    model, X_test, y_test, y_pred_test, features = train_model(anime)
+    # Sequels share characters and scores; grouping by franchise keeps them out of both sides
+    group_col = None
+    if param(spec, 'franchise_split', False):
+        from franchises import franchise_labels
+        characters = tables['anime_characters'] if tables is not None else load_tables(["anime_characters"])['anime_characters']
+        anime = anime.merge(franchise_labels(anime['anime_id'], characters), on='anime_id', how='left')
+        group_col = 'franchise_id'
+    
+    synopsis = None
+    if param(spec, 'synopsis_features', False):
+        from text_features import load_synopsis_tfidf
+        synopsis = load_synopsis_tfidf()
+    
+    model, X_test, y_test, y_pred_test, features, metrics = train_model(
+        anime, years=year_window(spec, (1990, 2024)), synopsis=synopsis, group_col=group_col,
+        n_jobs=param(spec, 'n_jobs', -1))
+    
+    save_model(model, features, metrics)
+    save_predictions(anime, y_test, y_pred_test)
+    
+    print("Explaining model on held-out data...")
+    importances = explain(model, X_test, y_test, y_pred_test,
+                          n_repeats=param(spec, 'importance_repeats', N_REPEATS), workers=param(spec, 'workers', None))
+    print(importances.to_string(index=False))
     
     print("\nGenerating ML visualizations...")
-    plot_feature_importance(model, features)
+    plot_feature_importance(importances)
     plot_prediction_accuracy(y_test, y_pred_test)
     
+    save_results('ml_model', {**metrics, 'feature_importance': importances})
+    
     print("\nML model training complete!")
     print("\nKey Insights:")
-    print("- Year is likely the most important predictor")
+    print(f"- {importances['feature'].iloc[0]} is the strongest predictor on held-out data")
     print("- Genre diversity and studio presence also impact scores")
     print("- Model can predict scores with reasonable accuracy")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train the score prediction model")
+    parser.add_argument('--synopsis', action='store_true', help="add the synopsis TF-IDF text feature")
+    parser.add_argument('--franchise-split', action='store_true',
+                        help="hold out whole franchises instead of random titles")
+    parser.add_argument('--repeats', type=int, default=N_REPEATS, help="shuffles per feature for permutation importance")
+    parser.add_argument('--workers', type=int, default=None, help="processes for permutation importance")
+    add_sample_argument(parser)
+    args = parser.parse_args()
+    use_sample(args.sample)
+    main(spec={'synopsis_features': args.synopsis, 'franchise_split': args.franchise_split,
+               'importance_repeats': args.repeats, 'workers': args.workers})
@@ -1,34 +1,34 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import argparse
+
+from results import save_results
+from query import connect, sql
+from tables import add_sample_argument, use_sample
+from slices import param, year_window
+from chart_plan import planner
 
 # Settings
-input_dir = "data/cleaned"
 output_dir = "output/images"
 os.makedirs(output_dir, exist_ok=True)
 sns.set_theme(style="whitegrid")
 
-def load_data():
-    anime = pd.read_csv(os.path.join(input_dir, "anime_cleaned.csv"))
-    genres = pd.read_csv(os.path.join(input_dir, "anime_genres_cleaned.csv"))
-    companies = pd.read_csv(os.path.join(input_dir, "anime_companies_cleaned.csv"))
-    entities = pd.read_csv(os.path.join(input_dir, "entities_cleaned.csv"))
-    return anime, genres, companies, entities
+def load_data(tables=None):
+    """SQL connection over the given tables (or the cleaned files)"""
+    return connect(tables)
 
-def plot_studio_comparison(anime, companies, entities):
+def plot_studio_comparison(con, min_count=20):
     """Head-to-head studio comparison"""
     # Get top 10 studios
-    studios = companies[companies['role'] == 'Studio']
-    studios_named = studios.merge(entities[['entity_id', 'name']], left_on='company_id', right_on='entity_id')
-    studios_full = studios_named.merge(anime[['anime_id', 'score']], on='anime_id')
-    
-    studio_stats = studios_full.groupby('name').agg(
-        count=('anime_id', 'count'),
-        mean_score=('score', 'mean')
-    ).reset_index()
-    
-    top_studios = studio_stats[studio_stats['count'] > 20].sort_values('mean_score', ascending=False).head(10)
+    top_studios = sql("""
+        SELECT s.studio AS name, count(*) AS count, avg(a.score) AS mean_score
+        FROM studios s JOIN anime a USING (anime_id)
+        GROUP BY s.studio
+        HAVING count(*) > ?
+        ORDER BY mean_score DESC
+        LIMIT 10
+    """, [min_count], con=con)
     
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
     
@@ -48,18 +48,19 @@ def plot_studio_comparison(anime, companies, entities):
     plt.savefig(os.path.join(output_dir, 'studio_comparison.png'))
     plt.close()
     print("Generated studio_comparison.png")
+    return top_studios
 
-def plot_genre_mashup(anime, genres):
+def plot_genre_mashup(con):
     """Genre combination analysis"""
-    # Get anime with multiple genres
-    anime_genre_count = genres.groupby('anime_id').size().reset_index(name='genre_count')
-    anime_multi = anime.merge(anime_genre_count, on='anime_id')
-    anime_multi = anime_multi[anime_multi['genre_count'] > 1]
-    
-    # Compare single vs multi-genre
-    anime['is_multi_genre'] = anime['anime_id'].isin(anime_multi['anime_id'])
-    
-    comparison = anime.groupby('is_multi_genre')['score'].agg(['mean', 'count']).reset_index()
+    # Compare single vs multi-genre (anime with more than one genre row)
+    comparison = sql("""
+        SELECT coalesce(g.genre_count, 0) > 1 AS is_multi_genre,
+               avg(a.score) AS mean, count(a.score) AS count
+        FROM anime a
+        LEFT JOIN (SELECT anime_id, count(*) AS genre_count FROM genres GROUP BY anime_id) g USING (anime_id)
+        GROUP BY is_multi_genre
+        ORDER BY is_multi_genre
+    """, con=con)
     comparison['is_multi_genre'] = comparison['is_multi_genre'].map({True: 'Multi-Genre', False: 'Single Genre'})
     
     plt.figure(figsize=(10, 6))
@@ -77,17 +78,24 @@ def plot_genre_mashup(anime, genres):
     plt.savefig(os.path.join(output_dir, 'genre_mashup.png'))
     plt.close()
     print("Generated genre_mashup.png")
+    return comparison
 
-def plot_format_popularity(anime):
-    """Format popularity over time"""
-    anime['start_date'] = pd.to_datetime(anime['start_date'])
-    anime['year'] = anime['start_date'].dt.year
-    anime_filtered = anime[(anime['year'] >= 2000) & (anime['year'] <= 2024)]
-    
-    format_year = anime_filtered.groupby(['year', 'type']).size().reset_index(name='count')
+def plot_format_popularity(con, years=(2000, 2024), format_year=None):
+    """Format popularity over time; `format_year` may be the planner's shared (year, type) counts"""
+    if format_year is None:
+        format_year = sql("""
+            SELECT year(start_date) AS year, type, count(*) AS count
+            FROM anime
+            WHERE year(start_date) BETWEEN ? AND ?
+            GROUP BY year, type
+            ORDER BY year
+        """, list(years), con=con)
+    else:
+        format_year = format_year[format_year['year'].between(*years)].sort_values('year', kind='stable')
     
     # Get top 4 formats
-    top_formats = anime_filtered['type'].value_counts().head(4).index.tolist()
+    totals = format_year.groupby('type')['count'].sum().sort_values(ascending=False)
+    top_formats = totals.head(4).index.tolist()
     format_year = format_year[format_year['type'].isin(top_formats)]
     
     plt.figure(figsize=(14, 6))
@@ -95,7 +103,7 @@ def plot_format_popularity(anime):
         data = format_year[format_year['type'] == fmt]
         plt.plot(data['year'], data['count'], marker='o', label=fmt, linewidth=2)
     
-    plt.title('Anime Format Popularity Trends (2000-2024)')
+    plt.title(f'Anime Format Popularity Trends ({years[0]}-{years[1]})')
     plt.xlabel('Year')
     plt.ylabel('Number of Releases')
     plt.legend(title='Format')
@@ -105,16 +113,27 @@ def plot_format_popularity(anime):
     plt.close()
     print("Generated format_popularity.png")
 
-def main():
+def main(tables=None, spec=None):
     print("Loading data for comparative analysis...")
-    anime, genres, companies, entities = load_data()
+    con = load_data(tables)
     
     print("Generating comparative plots...")
-    plot_studio_comparison(anime, companies, entities)
-    plot_genre_mashup(anime, genres)
-    plot_format_popularity(anime)
+    top_studios = plot_studio_comparison(con, min_count=param(spec, 'min_studio_comparison_titles', 20))
+    genre_comparison = plot_genre_mashup(con)
+    # Shared (year, type) counts when running with the other phases; standalone, SQL is cheaper
+    shared = planner(tables).inputs('format_popularity') if tables is not None else {}
+    plot_format_popularity(con, years=year_window(spec, (2000, 2024)), **shared)
+    
+    save_results('comparative', {
+        'top_studios': top_studios,
+        'genre_mashup': genre_comparison,
+    })
     
     print("\nComparative analysis complete!")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comparative analysis figures")
+    add_sample_argument(parser)
+    args = parser.parse_args()
+    use_sample(args.sample)
     main()
@@ -0,0 +1,114 @@
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns
+import os
+import argparse
+
+from results import save_results
+from tables import add_sample_argument, load_tables, use_sample
+from slices import param
+from ranking import distinct_labels
+from careers import Careers, director_credits, voice_actor_credits, ROLLING_WINDOW, PEAK_YEARS
+
+# Settings
+output_dir = "output/images"
+os.makedirs(output_dir, exist_ok=True)
+sns.set_theme(style="whitegrid")
+
+def load_data(tables=None):
+    if tables is None:
+        tables = load_tables(["anime", "anime_staff", "anime_voice_actors", "anime_characters", "entities"])
+    anime = tables['anime'].copy()
+    anime['start_date'] = pd.to_datetime(anime['start_date'])
+    return anime, tables['anime_staff'], tables['anime_voice_actors'], tables['anime_characters'], tables['entities']
+
+def top_careers(careers, entities, min_credits, top_n=6):
+    """Best-scoring careers (mean over scored credits, at least min_credits of them) with their peak periods"""
+    summary = careers.summary().merge(careers.peak_periods(), on='person_id', how='left')
+    summary = summary[summary['n_scored'] >= min_credits]
+    top = summary.sort_values(['mean_score', 'person_id'], ascending=[False, True]).head(top_n)
+    names = entities.drop_duplicates('entity_id').set_index('entity_id')['name']
+    top.insert(1, 'name', top['person_id'].map(names).fillna(top['person_id'].astype(str)))
+    return top.reset_index(drop=True)
+
+def plot_top_careers(careers, top, kind, filename, window=ROLLING_WINDOW):
+    """Rolling average score over each top career, with its peak period shaded"""
+    credits = careers.credits_frame(window)
+    labels = distinct_labels(top['name'], top['person_id'])
+    colors = sns.color_palette('tab10', len(top))
+
+    plt.figure(figsize=(14, 7))
+    for (_, person), label, color in zip(top.iterrows(), labels, colors):
+        career = credits[credits['person_id'] == person['person_id']]
+        plt.plot(career['date'], career['rolling_mean'], color=color, linewidth=2, label=label)
+        plt.scatter(career['date'], career['score'], color=color, s=12, alpha=0.4)
+        if pd.notna(person['peak_start']):
+            plt.axvspan(person['peak_start'], person['peak_end'], color=color, alpha=0.08)
+
+    plt.title(f'Top {kind} Careers: Rolling {window}-Title Average Score (peak {PEAK_YEARS}-year period shaded)')
+    plt.xlabel('Release Date')
+    plt.ylabel('Score')
+    plt.legend(fontsize=9, loc='best')
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, filename))
+    plt.close()
+    print(f"Generated {filename}")
+
+def plot_career_cohorts(curves, min_people=10):
+    """Mean score by years since debut, per debut decade, for directors and voice actors"""
+    fig, axes = plt.subplots(1, len(curves), figsize=(16, 6), sharey=True)
+    for ax, (kind, curve) in zip(np.atleast_1d(axes), curves.items()):
+        curve = curve[curve['n_people'] >= min_people]
+        for cohort, data in curve.groupby('cohort'):
+            ax.plot(data['career_year'], data['mean_score'], marker='o', markersize=3, linewidth=1.5,
+                    label=f"{cohort}s debut")
+        ax.set_title(f'{kind}: Score by Career Year')
+        ax.set_xlabel('Years Since Debut')
+        ax.grid(True, alpha=0.3)
+        ax.legend(fontsize=8)
+    np.atleast_1d(axes)[0].set_ylabel('Average Score')
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'career_cohorts.png'))
+    plt.close()
+    print("Generated career_cohorts.png")
+
+def main(tables=None, spec=None):
+    print("Loading data for career analysis...")
+    anime, staff, voice_actors, characters, entities = load_data(tables)
+
+    print("Building career time series...")
+    careers = {
+        'Director': Careers.from_credits(director_credits(staff), anime),
+        'Voice Actor': Careers.from_credits(voice_actor_credits(voice_actors, characters), anime),
+    }
+    for kind, c in careers.items():
+        print(f"  {kind}s: {len(c):,} people, {len(c.scores):,} credits")
+
+    print("Generating career plots...")
+    top_directors = top_careers(careers['Director'], entities, param(spec, 'min_director_titles', 5))
+    plot_top_careers(careers['Director'], top_directors, 'Director', 'director_careers.png')
+    top_vas = top_careers(careers['Voice Actor'], entities, param(spec, 'min_va_roles', 15))
+    plot_top_careers(careers['Voice Actor'], top_vas, 'Voice Actor', 'voice_actor_careers.png')
+    plot_career_cohorts({kind: c.cohort_curves() for kind, c in careers.items()})
+
+    columns = ['person_id', 'name', 'n_credits', 'mean_score', 'debut_year', 'span_years',
+               'peak_start', 'peak_end', 'peak_mean']
+    save_results('careers', {
+        'n_directors': len(careers['Director']),
+        'n_voice_actors': len(careers['Voice Actor']),
+        'top_director_careers': top_directors[columns],
+        'top_voice_actor_careers': top_vas[columns],
+        'director_cohorts': careers['Director'].debut_cohorts(),
+        'voice_actor_cohorts': careers['Voice Actor'].debut_cohorts(),
+    })
+
+    print("\nCareer analysis complete!")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Career analysis figures")
+    add_sample_argument(parser)
+    args = parser.parse_args()
+    use_sample(args.sample)
+    main()
@@ -0,0 +1,333 @@
+"""
+Incrementally maintained aggregate tables.
+Per-studio, per-director, per-voice-actor and per-year score statistics
+(row count, scored count, score sum, sum of squares) that are updated from the
+changelogs written by `02_clean.py --incremental` instead of a full groupby.
+
+Every table is treated as a signed multiset (sign +1 for present rows), so joins
+and sums are linear in each input. For fact joins T1 x ... x Tk the change is
+    delta = sum_i f(T1_new, ..., T{i-1}_new, dTi, T{i+1}_old, ..., Tk_old)
+where T_old is rebuilt as T_new plus the changelog rows with their sign negated.
+
+The tables are saved with the cleaned-store versions (manifest hashes) they reflect, and
+each changelog run records the versions it produced. Tables whose versions no longer
+match the store (e.g. after a full, non-incremental clean) are rebuilt, never reused.
+
+The stored tables (data/aggregates/*_stats.csv, and --verify) stay keyed by the raw
+company/person ids, because the changelogs are. Consumers that rank or export them use
+canonical_aggregates(), which applies the entity map of entity_resolution.py.
+"""
+
+import os
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from incremental import list_runs, read_changelog, read_run_versions
+from store import load_manifest, resolve
+from tables import ENTITY_COLUMNS, merged_duplicates
+
+# Settings
+input_dir = "data/cleaned"
+output_dir = "data/aggregates"
+applied_runs_file = "applied_runs.txt"
+versions_file = "sources.json"
+
+SOURCE_COLUMNS = {
+    "anime": ["anime_id", "score", "start_date"],
+    "anime_companies": ["anime_id", "company_id", "role"],
+    "anime_staff": ["anime_id", "person_id", "role"],
+    "anime_characters": ["anime_id", "character_id"],
+    "anime_voice_actors": ["character_id", "person_id", "language"],
+}
+
+def signed_join(left, right, on):
+    """Inner join of two signed multisets; the output sign is the product of the input signs"""
+    joined = left.merge(right, on=on, suffixes=('', '_right'))
+    joined['sign'] = joined['sign'] * joined.pop('sign_right')
+    return joined
+
+
+def studio_facts(companies, anime):
+    studios = companies[companies['role'] == 'Studio'][['anime_id', 'company_id', 'sign']]
+    return signed_join(studios, anime[['anime_id', 'score', 'sign']], on='anime_id')
+
+
+def director_facts(staff, anime):
+    directors = staff[staff['role'].str.contains('Director', case=False, na=False)]
+    return signed_join(directors[['anime_id', 'person_id', 'sign']], anime[['anime_id', 'score', 'sign']], on='anime_id')
+
+
+def voice_actor_facts(voice_actors, characters, anime):
+    japanese = voice_actors[voice_actors['language'] == 'Japanese'][['character_id', 'person_id', 'sign']]
+    va_char = signed_join(japanese, characters[['character_id', 'anime_id', 'sign']], on='character_id')
+    return signed_join(va_char, anime[['anime_id', 'score', 'sign']], on='anime_id')
+
+
+def year_facts(anime):
+    facts = anime[['anime_id', 'score', 'sign']].copy()
+    facts['year'] = pd.to_datetime(anime['start_date'], errors='coerce').dt.year
+    return facts
+
+
+# Aggregate name -> (group key, source tables in join order, fact builder)
+AGGREGATES = {
+    "studio": ("company_id", ["anime_companies", "anime"], studio_facts),
+    "director": ("person_id", ["anime_staff", "anime"], director_facts),
+    "voice_actor": ("person_id", ["anime_voice_actors", "anime_characters", "anime"], voice_actor_facts),
+    "year": ("year", ["anime"], year_facts),
+}
+
+
+def summarize_facts(facts, key):
+    """Sign-weighted count / score sum / sum of squares per group"""
+    sign = facts['sign'].to_numpy()
+    score = facts['score'].to_numpy(dtype=np.float64)
+    scored = ~np.isnan(score)
+    score = np.where(scored, score, 0.0)
+    parts = pd.DataFrame({
+        key: facts[key].to_numpy(),
+        'n': sign,
+        'n_scored': sign * scored,
+        'score_sum': sign * score,
+        'score_sq_sum': sign * score ** 2,
+    })
+    return parts.groupby(key).sum()
+
+
+def source_versions():
+    """Content hash (or mtime for plain CSVs) of every source table in the cleaned store"""
+    manifest = load_manifest(input_dir)
+    return {name: manifest[name]['hash'] if name in manifest else os.path.getmtime(resolve(name, input_dir))
+            for name in SOURCE_COLUMNS}
+
+
+def stored_versions():
+    """Source versions the stored aggregate tables reflect, or None if unknown"""
+    path = os.path.join(output_dir, versions_file)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_tables():
+    """Current cleaned tables as signed multisets (every stored row has sign +1)"""
+    tables = {}
+    for name, columns in SOURCE_COLUMNS.items():
+        df = pd.read_csv(resolve(name, input_dir), usecols=columns)
+        df['sign'] = 1
+        tables[name] = df
+    return tables
+
+
+def compute_all(tables):
+    """Full recompute of every aggregate table"""
+    return {
+        name: summarize_facts(build(*[tables[t] for t in sources]), key)
+        for name, (key, sources, build) in AGGREGATES.items()
+    }
+
+
+def compute_deltas(tables, changesets):
+    """Aggregate changes implied by a changelog, given the tables after it was applied"""
+    old_tables = {}
+    for name, df in tables.items():
+        changes = changesets.get(name)
+        if changes is not None and len(changes):
+            retracted = changes[df.columns].assign(sign=-changes['sign'])
+            old_tables[name] = pd.concat([df, retracted], ignore_index=True)
+        else:
+            old_tables[name] = df
+
+    deltas = {}
+    for name, (key, sources, build) in AGGREGATES.items():
+        parts = []
+        for i, source in enumerate(sources):
+            changes = changesets.get(source)
+            if changes is None or not len(changes):
+                continue
+            args = ([tables[t] for t in sources[:i]]
+                    + [changes[tables[source].columns]]
+                    + [old_tables[t] for t in sources[i + 1:]])
+            parts.append(summarize_facts(build(*args), key))
+        if parts:
+            deltas[name] = pd.concat(parts).groupby(level=0).sum()
+    return deltas
+
+
+def apply_deltas(aggregates, deltas):
+    """Add aggregate deltas and drop groups whose row count fell to zero"""
+    updated = dict(aggregates)
+    for name, delta in deltas.items():
+        table = aggregates[name].add(delta, fill_value=0)
+        table[['n', 'n_scored']] = table[['n', 'n_scored']].round().astype(np.int64)
+        updated[name] = table[table['n'] != 0]
+    return updated
+
+
+def with_derived(table):
+    """Add mean and standard deviation columns derived from the running sums"""
+    out = table.copy()
+    n = out['n_scored'].where(out['n_scored'] > 0)
+    out['mean_score'] = out['score_sum'] / n
+    variance = (out['score_sq_sum'] / n - out['mean_score'] ** 2).clip(lower=0)
+    out['std_score'] = np.sqrt(variance * n / (n - 1).where(n > 1))
+    return out
+
+
+def leaderboard(table, entities=None, min_count=15, top=15):
+    """Top groups by mean score among those with at least min_count rows"""
+    stats = with_derived(table)
+    stats = stats[stats['n'] >= min_count].sort_values('mean_score', ascending=False).head(top)
+    if entities is not None:
+        names = entities.set_index('entity_id')['name']
+        stats.insert(0, 'name', stats.index.map(names))
+    return stats
+
+
+def canonical_aggregates(aggregates, tables, mapping):
+    """Entity aggregates keyed by canonical ids: the raw ids' statistics summed per group,
+    minus the credits the merge made identical (which the table loaders drop)"""
+    ids = mapping.set_index('entity_id')['canonical_id']
+    canonical = dict(aggregates)
+    for name, (key, sources, build) in AGGREGATES.items():
+        source = sources[0]
+        if source not in ENTITY_COLUMNS:
+            continue
+        table = aggregates[name]
+        raw = table.index.to_series()
+        summed = table.groupby(raw.map(ids).fillna(raw).astype(raw.dtype).to_numpy()).sum().rename_axis(key)
+        # Aggregates are linear in each table, so the dropped rows' facts can be subtracted
+        mapped, duplicate = merged_duplicates(tables[source], ENTITY_COLUMNS[source], mapping)
+        if duplicate.any():
+            dropped = summarize_facts(build(mapped[duplicate], *[tables[t] for t in sources[1:]]), key)
+            summed = summed.sub(dropped, fill_value=0)
+            summed[['n', 'n_scored']] = summed[['n', 'n_scored']].round().astype(np.int64)
+        canonical[name] = summed
+    return canonical
+
+
+def verify(aggregates, tables):
+    """Compare maintained aggregates with a full recompute; returns True if consistent"""
+    consistent = True
+    for name, expected in compute_all(tables).items():
+        index = expected.index.union(aggregates[name].index)
+        actual = aggregates[name].reindex(index, fill_value=0)
+        expected = expected.reindex(index, fill_value=0)
+        counts_ok = (actual[['n', 'n_scored']].to_numpy() == expected[['n', 'n_scored']].to_numpy()).all()
+        sums_ok = np.allclose(actual[['score_sum', 'score_sq_sum']].to_numpy(dtype=np.float64),
+                              expected[['score_sum', 'score_sq_sum']].to_numpy(dtype=np.float64),
+                              rtol=1e-9, atol=1e-6)
+        status = "OK" if counts_ok and sums_ok else "MISMATCH"
+        print(f"  {name}: {len(expected):,} groups {status}")
+        consistent &= counts_ok and sums_ok
+    return consistent
+
+
+def save_aggregates(aggregates, versions):
+    os.makedirs(output_dir, exist_ok=True)
+    for name, table in aggregates.items():
+        table.to_csv(os.path.join(output_dir, f"{name}_stats.csv"))
+    with open(os.path.join(output_dir, versions_file), "w") as f:
+        json.dump(versions, f, indent=2, sort_keys=True)
+
+
+def load_aggregates(current_only=False):
+    """Stored aggregate tables, or None if they have not been built yet
+    (or, with current_only, if they do not reflect the current cleaned store)"""
+    if current_only and stored_versions() != source_versions():
+        return None
+    aggregates = {}
+    for name, (key, _, _) in AGGREGATES.items():
+        path = os.path.join(output_dir, f"{name}_stats.csv")
+        if not os.path.exists(path):
+            return None
+        aggregates[name] = pd.read_csv(path, index_col=key)
+    return aggregates
+
+
+def read_applied_runs():
+    path = os.path.join(output_dir, applied_runs_file)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def mark_runs_applied(run_ids):
+    with open(os.path.join(output_dir, applied_runs_file), "a") as f:
+        for run_id in run_ids:
+            f.write(run_id + "\n")
+
+
+def rebuild(tables):
+    print("Rebuilding aggregates from the cleaned tables...")
+    aggregates = compute_all(tables)
+    save_aggregates(aggregates, source_versions())
+    # Everything already in the changelog is reflected by a full rebuild
+    open(os.path.join(output_dir, applied_runs_file), "w").close()
+    mark_runs_applied([os.path.basename(r) for r in list_runs(input_dir)])
+    return aggregates
+
+
+def apply_pending(tables, aggregates):
+    """Fold every changelog run not yet applied into the stored aggregates"""
+    applied = set(read_applied_runs())
+    pending = [r for r in list_runs(input_dir) if os.path.basename(r) not in applied]
+    if not pending:
+        print("Aggregates are up to date.")
+        return aggregates
+
+    # Consecutive changelogs add up to one changelog from the oldest state to the current one
+    combined = {}
+    for run_dir in pending:
+        for name, changes in read_changelog(run_dir).items():
+            combined.setdefault(name, []).append(changes)
+    changesets = {name: pd.concat(parts, ignore_index=True) for name, parts in combined.items()}
+
+    # The result reflects the versions the last run of each table produced
+    versions = stored_versions() or {}
+    for run_dir in pending:
+        run_versions = read_run_versions(run_dir) or {}
+        versions.update({name: version for name, version in run_versions.items() if name in SOURCE_COLUMNS})
+
+    print(f"Applying {len(pending)} changelog run(s)...")
+    deltas = compute_deltas(tables, changesets)
+    aggregates = apply_deltas(aggregates, deltas)
+    save_aggregates(aggregates, versions)
+    mark_runs_applied([os.path.basename(r) for r in pending])
+    for name, delta in deltas.items():
+        print(f"  {name}: {len(delta):,} groups touched")
+    return aggregates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain studio/director/VA/year aggregate tables")
+    parser.add_argument('--rebuild', action='store_true', help="recompute everything from the cleaned tables")
+    parser.add_argument('--verify', action='store_true', help="check the stored aggregates against a full recompute")
+    args = parser.parse_args()
+
+    tables = load_tables()
+    aggregates = None if args.rebuild else load_aggregates()
+    if aggregates is not None:
+        aggregates = apply_pending(tables, aggregates)
+        if stored_versions() != source_versions():
+            # e.g. a full clean, which writes no changelog
+            print("The cleaned tables changed outside the changelogs.")
+            aggregates = None
+    if aggregates is None:
+        aggregates = rebuild(tables)
+
+    if args.verify:
+        print("Verifying against a full recompute...")
+        if not verify(aggregates, tables):
+            raise SystemExit("Aggregate tables are inconsistent; run with --rebuild")
+
+    print("\nAggregates complete!")
+
+
+if __name__ == "__main__":
+    main()
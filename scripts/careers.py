@@ -0,0 +1,189 @@
+"""
+Career time series for directors and voice actors.
+Credits (person, anime) joined to the anime's start date, score and members are sorted
+once by (person, date) into flat arrays in CSR layout: person p's credits are rows
+indptr[p]:indptr[p+1] of dates / anime_ids / scores / members. Every per-person
+statistic is then a segmented operation over the flat arrays (prefix sums differenced
+at segment boundaries, reduceat, one searchsorted), with no per-person Python loop:
+    career curve     running mean score after each credit
+    rolling average  mean score of each person's last `window` credits
+    peak period      the `years`-long stretch of credits with the best mean score
+    debut cohorts    debut year, career span and output per person, and the mean
+                     score by career year for each debut decade
+Unscored credits count towards dates and output but not towards score means.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Settings
+ROLLING_WINDOW = 5
+PEAK_YEARS = 5
+MIN_PEAK_CREDITS = 3
+
+
+def director_credits(staff):
+    """(person_id, anime_id) for every directing credit"""
+    directors = staff[staff['role'].str.contains('Director', case=False, na=False)]
+    return directors[['person_id', 'anime_id']].drop_duplicates()
+
+
+def voice_actor_credits(voice_actors, characters, language='Japanese'):
+    """(person_id, anime_id) for every title a voice actor (Japanese cast by default) appears in"""
+    if language and 'language' in voice_actors.columns:
+        voice_actors = voice_actors[voice_actors['language'] == language]
+    credits = voice_actors[['character_id', 'person_id']].merge(characters[['character_id', 'anime_id']],
+                                                                on='character_id')
+    return credits[['person_id', 'anime_id']].drop_duplicates()
+
+
+def segment_sums(prefix, starts, stops):
+    """Sums of rows [start, stop) from a prefix-sum array with a leading zero"""
+    return prefix[stops] - prefix[starts]
+
+
+class Careers:
+    """Credits of many people in CSR layout, sorted by date within each person"""
+
+    def __init__(self, person_ids, dates, anime_ids, scores, members):
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        order = np.lexsort((anime_ids, dates, person_ids))
+        people, codes = np.unique(np.asarray(person_ids)[order], return_inverse=True)
+        self.people = people
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(people)))])
+        self.dates = dates[order]
+        self.anime_ids = np.asarray(anime_ids)[order]
+        self.scores = np.asarray(scores, dtype=np.float64)[order]
+        self.members = np.asarray(members, dtype=np.float64)[order]
+        self.segment = codes
+
+        scored = ~np.isnan(self.scores)
+        self._score_prefix = np.concatenate([[0.0], np.cumsum(np.where(scored, self.scores, 0.0))])
+        self._scored_prefix = np.concatenate([[0], np.cumsum(scored)])
+
+    @classmethod
+    def from_credits(cls, credits, anime):
+        """Careers from (person_id, anime_id) credits; titles without a start date are left out"""
+        df = credits.merge(anime[['anime_id', 'start_date', 'score', 'members']], on='anime_id')
+        df = df[df['start_date'].notna()]
+        return cls(df['person_id'].to_numpy(), pd.to_datetime(df['start_date']).to_numpy(),
+                   df['anime_id'].to_numpy(), df['score'].to_numpy(), df['members'].to_numpy())
+
+    def __len__(self):
+        return len(self.people)
+
+    @property
+    def lengths(self):
+        return np.diff(self.indptr)
+
+    def starts(self):
+        """Start row of each credit's own career"""
+        return self.indptr[self.segment]
+
+    def summary(self):
+        """One row per person: credits, scored credits, mean/best score, debut, last credit, span, output"""
+        starts, stops = self.indptr[:-1], self.indptr[1:]
+        n_scored = segment_sums(self._scored_prefix, starts, stops)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = segment_sums(self._score_prefix, starts, stops) / np.where(n_scored > 0, n_scored, np.nan)
+        best = np.fmax.reduceat(self.scores, starts) if len(self) else np.empty(0)
+        debut, last = self.dates[starts], self.dates[stops - 1]
+        span = (last - debut).astype(np.float64) / 365.25
+        return pd.DataFrame({
+            'person_id': self.people,
+            'n_credits': self.lengths,
+            'n_scored': n_scored,
+            'mean_score': mean,
+            'best_score': best,
+            'total_members': np.add.reduceat(np.nan_to_num(self.members), starts) if len(self) else np.empty(0),
+            'debut': debut,
+            'last_credit': last,
+            'debut_year': debut.astype('datetime64[Y]').astype(np.int64) + 1970,
+            'span_years': span,
+            'credits_per_year': self.lengths / np.maximum(span, 1.0),
+        })
+
+    def career_curve(self):
+        """Running mean score after each credit (NaN until the first scored credit)"""
+        rows = np.arange(len(self.scores))
+        starts = self.starts()
+        count = segment_sums(self._scored_prefix, starts, rows + 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return segment_sums(self._score_prefix, starts, rows + 1) / np.where(count > 0, count, np.nan)
+
+    def rolling_mean(self, window=ROLLING_WINDOW):
+        """Mean score of each credit and up to window - 1 earlier credits of the same person"""
+        rows = np.arange(len(self.scores))
+        lows = np.maximum(rows + 1 - window, self.starts())
+        count = segment_sums(self._scored_prefix, lows, rows + 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return segment_sums(self._score_prefix, lows, rows + 1) / np.where(count > 0, count, np.nan)
+
+    def peak_periods(self, years=PEAK_YEARS, min_credits=MIN_PEAK_CREDITS):
+        """Per person, the `years`-long window of credits (min_credits of them scored) with the best mean score"""
+        # Credits are sorted by (person, day), so one combined key finds every window's end
+        days = self.dates.astype(np.int64)
+        span = int(round(years * 365.25))
+        offset = days.max() - days.min() + span + 1 if len(days) else 1
+        key = self.segment * offset + (days - (days.min() if len(days) else 0))
+        # Windows start at the first credit of a day and end before day + span
+        rows = np.searchsorted(key, key, side='left')
+        stops = np.searchsorted(key, key + span, side='left')
+        count = segment_sums(self._scored_prefix, rows, stops)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = segment_sums(self._score_prefix, rows, stops) / np.where(count > 0, count, np.nan)
+        valid = count >= min_credits
+
+        # Best window per person: sort by (person, -mean) and keep each person's first valid row
+        candidates = np.flatnonzero(valid)
+        order = candidates[np.lexsort((-mean[candidates], self.segment[candidates]))]
+        _, first = np.unique(self.segment[order], return_index=True)
+        best = order[first]
+        return pd.DataFrame({
+            'person_id': self.people[self.segment[best]],
+            'peak_start': self.dates[rows[best]],
+            'peak_end': self.dates[stops[best] - 1],
+            'peak_mean': mean[best],
+            'peak_credits': count[best],
+        })
+
+    def credits_frame(self, window=ROLLING_WINDOW):
+        """Flat per-credit frame: person, date, anime, score, career position, running and rolling means"""
+        return pd.DataFrame({
+            'person_id': self.people[self.segment],
+            'date': self.dates,
+            'anime_id': self.anime_ids,
+            'score': self.scores,
+            'members': self.members,
+            'position': np.arange(len(self.scores)) - self.starts(),
+            'career_mean': self.career_curve(),
+            'rolling_mean': self.rolling_mean(window),
+        })
+
+    def cohort_curves(self, cohort_years=10, max_career_years=30):
+        """Mean score and people active by career year (years since debut) for each debut cohort"""
+        year = self.dates.astype('datetime64[Y]').astype(np.int64) + 1970
+        debut_year = year[self.starts()]
+        frame = pd.DataFrame({
+            'cohort': debut_year // cohort_years * cohort_years,
+            'career_year': year - debut_year,
+            'person': self.segment,
+            'score': self.scores,
+        })
+        frame = frame[frame['career_year'] <= max_career_years]
+        grouped = frame.groupby(['cohort', 'career_year'])
+        return pd.DataFrame({
+            'mean_score': grouped['score'].mean(),
+            'n_people': grouped['person'].nunique(),
+        }).reset_index()
+
+    def debut_cohorts(self, cohort_years=5):
+        """Per debut cohort: people, median span, mean output and mean career score"""
+        summary = self.summary()
+        summary['cohort'] = summary['debut_year'] // cohort_years * cohort_years
+        return summary.groupby('cohort').agg(
+            n_people=('person_id', 'size'),
+            median_span_years=('span_years', 'median'),
+            mean_credits=('n_credits', 'mean'),
+            mean_score=('mean_score', 'mean'),
+        ).reset_index()
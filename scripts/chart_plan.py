@@ -0,0 +1,168 @@
+"""
+Chart-spec registry and aggregate planner.
+Every chart declares the aggregates it reads in CHARTS; every aggregate declares the
+tables and the other aggregates it is derived from in AGGREGATES. A Planner computes
+each aggregate at most once per run (memoized over the dependency graph) and hands
+renderers their inputs, so charts that share a groupby share its result:
+    year_type   anime grouped by (release year, type): n, n_scored, score sum and
+                sum of squares; yearly score trends and format popularity are both
+                derived from it, and every year window is a filter of the full table
+    genre_counts genre frequencies, from which each chart takes its top N
+Aggregates cover the whole (possibly sliced) data set; renderers apply their own windows.
+Phase scripts share one Planner per tables dict, so a batch run (run_slices.py) computes
+each aggregate once across all phases.
+
+Usage:
+    python scripts/chart_plan.py          # show the plan: charts, aggregates and sharing
+    python scripts/chart_plan.py --run    # also compute every planned aggregate, timed
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from tables import load_tables
+
+
+def year_of(tables):
+    """Release year per anime row"""
+    return pd.to_datetime(tables['anime']['start_date']).dt.year
+
+
+def year_type(tables, years):
+    """Score moments per (year, type), the base of every yearly chart"""
+    anime = tables['anime']
+    score = anime['score']
+    frame = pd.DataFrame({'year': years, 'type': anime['type'].fillna('Unknown'),
+                          'n_scored': score.notna(), 'score_sum': score.fillna(0), 'score_sq_sum': score.fillna(0) ** 2})
+    grouped = frame.groupby(['year', 'type'])
+    moments = grouped[['n_scored', 'score_sum', 'score_sq_sum']].sum()
+    moments.insert(0, 'n', grouped.size())
+    return moments.reset_index()
+
+
+def yearly(tables, year_type):
+    """Per-year release count and score mean/std (summed over types)"""
+    totals = year_type.groupby('year')[['n', 'n_scored', 'score_sum', 'score_sq_sum']].sum()
+    mean = totals['score_sum'] / totals['n_scored'].where(totals['n_scored'] > 0)
+    variance = (totals['score_sq_sum'] - totals['n_scored'] * mean ** 2) / (totals['n_scored'] - 1).where(totals['n_scored'] > 1)
+    return pd.DataFrame({'count': totals['n'], 'mean_score': mean, 'std_score': np.sqrt(variance.clip(lower=0))})
+
+
+def format_year(tables, year_type):
+    """(year, type, count) releases"""
+    return year_type[['year', 'type', 'n']].rename(columns={'n': 'count'})
+
+
+def genre_counts(tables):
+    """Genre frequencies, most common first (ties by name)"""
+    counts = tables['anime_genres']['genre'].value_counts()
+    return counts.rename_axis('genre').reset_index().sort_values(
+        ['count', 'genre'], ascending=[False, True]).set_index('genre')['count']
+
+
+# name -> (function, tables read, aggregates it is derived from)
+AGGREGATES = {
+    'years': (year_of, ['anime'], []),
+    'year_type': (year_type, ['anime'], ['years']),
+    'yearly': (yearly, [], ['year_type']),
+    'format_year': (format_year, [], ['year_type']),
+    'genre_counts': (genre_counts, ['anime_genres'], []),
+}
+
+# chart -> (phase script, renderer, {renderer argument: aggregate})
+CHARTS = {
+    'trends_over_time': ('03_analyze', 'plot_trends_over_time', {'yearly': 'yearly'}),
+    'score_inflation': ('07_temporal', 'plot_score_inflation', {'yearly': 'yearly'}),
+    'format_popularity': ('09_comparative', 'plot_format_popularity', {'format_year': 'format_year'}),
+    'seasonal_genres': ('04_seasonal', 'plot_seasonal_genres', {'genre_counts': 'genre_counts'}),
+    'studio_genre_heatmap': ('06_networks', 'plot_studio_genre_heatmap', {'genre_counts': 'genre_counts'}),
+    'genre_evolution': ('07_temporal', 'plot_genre_evolution', {'genre_counts': 'genre_counts'}),
+}
+
+
+class Planner:
+    """Memoized aggregates over one set of tables"""
+
+    def __init__(self, tables=None):
+        self.tables = dict(tables or {})
+        self.results = {}
+        self.timings = {}
+
+    def table(self, name):
+        if name not in self.tables:
+            self.tables[name] = load_tables([name])[name]
+        return self.tables[name]
+
+    def get(self, name):
+        """An aggregate, computing it (and what it derives from) on first request"""
+        if name not in self.results:
+            function, table_names, dependencies = AGGREGATES[name]
+            inputs = [self.get(dependency) for dependency in dependencies]
+            start = time.time()
+            self.results[name] = function({t: self.table(t) for t in table_names}, *inputs)
+            self.timings[name] = time.time() - start
+        return self.results[name]
+
+    def inputs(self, chart):
+        """Keyword arguments for a chart's renderer"""
+        return {argument: self.get(aggregate) for argument, aggregate in CHARTS[chart][2].items()}
+
+
+# One planner per tables dict passed to the phases (kept only while that dict is in use)
+_shared = {}
+
+
+def planner(tables=None, **frames):
+    """The Planner shared by every phase given this tables dict; standalone runs pass their own frames"""
+    if tables is None:
+        return Planner(frames)
+    key = id(tables)
+    if key not in _shared or _shared[key][0] is not tables:
+        _shared.clear()
+        _shared[key] = (tables, Planner(tables))
+    return _shared[key][1]
+
+
+def plan(charts=None):
+    """Aggregates needed by the charts, in dependency order, with the charts reading each"""
+    order, readers = [], {}
+
+    def visit(name):
+        if name in order:
+            return
+        for dependency in AGGREGATES[name][2]:
+            visit(dependency)
+        order.append(name)
+
+    for chart in charts or CHARTS:
+        for aggregate in CHARTS[chart][2].values():
+            readers.setdefault(aggregate, []).append(chart)
+            visit(aggregate)
+    return order, readers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show (and optionally run) the shared aggregate plan")
+    parser.add_argument('--run', action='store_true', help="compute every planned aggregate")
+    args = parser.parse_args()
+
+    order, readers = plan()
+    naive = sum(len(plan([chart])[0]) for chart in CHARTS)
+    print(f"{len(CHARTS)} charts computed separately would need {naive} aggregations; "
+          f"the plan computes {len(order)}:")
+    for name in order:
+        print(f"  {name:<14} <- {', '.join(AGGREGATES[name][2] + AGGREGATES[name][1])}"
+              f"{'   used by ' + ', '.join(readers[name]) if name in readers else ''}")
+
+    if args.run:
+        shared = Planner()
+        for name in order:
+            shared.get(name)
+            print(f"  computed {name} in {shared.timings[name]:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
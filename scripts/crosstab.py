@@ -0,0 +1,115 @@
+"""
+Sparse cross-tabulation of anime relationships.
+Each anime -> X relationship (studios, directors, genres, voice actors, seasons...) is
+a sparse incidence matrix A_X (anime x X). Any X x Y table is then one sparse product,
+A_X.T @ diag(w) @ A_Y, with w = 1 for counts or the anime scores for score sums, instead
+of joining relationship rows (which multiplies rows by genres per anime) and pivoting.
+Duplicate credits keep their multiplicity, so counts equal those of the joined rows.
+Top-N rows/columns are chosen from the margins and cells from the product itself.
+Studios, directors and voice actors are keyed by canonical entity id, so namesakes stay
+apart; entity_names attaches their names only for display.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+def anime_index(*frames):
+    """Row order shared by the incidence matrices: every anime_id in the given frames"""
+    return pd.Index(pd.concat([f['anime_id'] for f in frames]).drop_duplicates())
+
+
+def entity_pairs(relation, id_col, entities):
+    """(anime_id, entity_id) pairs for a relationship keyed by entity id, for entities with a record"""
+    known = relation[id_col].isin(entities['entity_id'])
+    return relation.loc[known, ['anime_id', id_col]].rename(columns={id_col: 'entity_id'})
+
+
+def entity_names(ids, entities):
+    """Display names of entity ids"""
+    names = entities.drop_duplicates('entity_id').set_index('entity_id')['name']
+    return names.reindex(np.asarray(ids)).to_numpy(dtype=object)
+
+
+def studio_pairs(companies, entities):
+    return entity_pairs(companies[companies['role'] == 'Studio'], 'company_id', entities)
+
+
+def director_pairs(staff, entities):
+    return entity_pairs(staff[staff['role'].str.contains('Director', case=False, na=False)], 'person_id', entities)
+
+
+def voice_actor_pairs(voice_actors, characters, entities, language='Japanese'):
+    """Japanese (by default) VA credits reached through the characters they voice"""
+    if language and 'language' in voice_actors.columns:
+        voice_actors = voice_actors[voice_actors['language'] == language]
+    credits = voice_actors[['character_id', 'person_id']].merge(characters[['character_id', 'anime_id']],
+                                                                 on='character_id')
+    return entity_pairs(credits, 'person_id', entities)
+
+
+def incidence(pairs, index, key='entity_id', binary=False):
+    """(anime x label sparse matrix, labels) from (anime_id, key) rows.
+    Repeated pairs add up unless binary, which counts each anime once per label."""
+    rows = index.get_indexer(pairs['anime_id'])
+    known = rows >= 0
+    codes, labels = pd.factorize(pairs[key].to_numpy()[known])
+    matrix = sparse.csr_matrix((np.ones(len(codes)), (rows[known], codes)), shape=(len(index), len(labels)))
+    if binary:
+        matrix.data[:] = 1.0
+    return matrix, np.asarray(labels, dtype=object)
+
+
+def crosstab(row, col, weights=None):
+    """X x Y sparse product of two incidences, optionally weighting each anime (e.g. by score)"""
+    (A, row_labels), (B, col_labels) = row, col
+    if weights is not None:
+        B = sparse.diags(np.asarray(weights, dtype=np.float64)) @ B
+    return (A.T @ B).tocsr(), row_labels, col_labels
+
+
+def crosstab_mean(row, col, scores):
+    """(mean score, scored-title count) crosstabs of two incidences"""
+    scores = np.asarray(scores, dtype=np.float64)
+    scored = ~np.isnan(scores)
+    total, row_labels, col_labels = crosstab(row, col, np.where(scored, scores, 0.0))
+    count, _, _ = crosstab(row, col, scored)
+    mean = total.multiply(count.power(-1)).tocsr()
+    return (mean, row_labels, col_labels), (count, row_labels, col_labels)
+
+
+def top_labels(inc, n):
+    """Positions of the n most frequent labels (ties by label), from the incidence margin"""
+    matrix, labels = inc
+    totals = np.asarray(matrix.sum(axis=0)).ravel()
+    return np.lexsort((labels.astype(str), -totals))[:n]
+
+
+def label_positions(inc, labels):
+    """Positions of the given labels (in that order) among an incidence's labels, skipping absent ones"""
+    positions = pd.Index(inc[1]).get_indexer(list(labels))
+    return positions[positions >= 0]
+
+
+def pivot(table, rows=None, cols=None):
+    """Dense DataFrame of selected rows and columns of a crosstab result"""
+    product, row_labels, col_labels = table
+    rows = np.arange(len(row_labels)) if rows is None else rows
+    cols = np.arange(len(col_labels)) if cols is None else cols
+    return pd.DataFrame(product[rows][:, cols].toarray(), index=row_labels[rows], columns=col_labels[cols])
+
+
+def top_cells(table, n, value='count'):
+    """The n largest cells as (row, col, value) rows, ties broken by labels"""
+    product, row_labels, col_labels = table
+    cells = product.tocoo()
+    frame = pd.DataFrame({'row': row_labels[cells.row], 'col': col_labels[cells.col], value: cells.data})
+    frame = frame[frame[value] != 0]
+    return frame.sort_values([value, 'row', 'col'], ascending=[False, True, True]).head(n).reset_index(drop=True)
+
+
+def long_format(frame, row_name, col_name, value='count'):
+    """(row, col, value) rows of a pivot's non-zero cells"""
+    stacked = frame.rename_axis(index=row_name, columns=col_name).stack().reset_index(name=value)
+    return stacked[stacked[value] != 0].reset_index(drop=True)
@@ -0,0 +1,133 @@
+"""
+Data validation for the cleaning stage.
+Vectorized referential-integrity, range and duplicate-key checks over the cleaned tables,
+summarized as a quality report with one row per check.
+"""
+
+import numpy as np
+import pandas as pd
+
+from schema import PRIMARY_KEYS, FOREIGN_KEYS, VALUE_RANGES
+
+
+def sorted_keys(values):
+    """Sorted unique non-null key array used as the lookup side of FK checks"""
+    values = pd.Series(values).dropna().to_numpy()
+    return np.unique(values)
+
+
+def find_orphans(child_values, parent_keys):
+    """Boolean mask of child values that have no match in the sorted parent keys.
+    Null child values are not orphans (they are counted separately)."""
+    child = pd.Series(child_values)
+    is_null = child.isna().to_numpy()
+    values = child.to_numpy()
+
+    if pd.api.types.is_numeric_dtype(child) and np.issubdtype(parent_keys.dtype, np.number):
+        # Binary search against the sorted parent array: O(n log m), no hashing
+        parent = parent_keys
+        if not (np.issubdtype(values.dtype, np.integer) and np.issubdtype(parent.dtype, np.integer)):
+            values = values.astype(np.float64)
+            parent = parent.astype(np.float64)
+        if len(parent) == 0:
+            return ~is_null
+        idx = np.searchsorted(parent, values)
+        idx[idx == len(parent)] = 0
+        found = parent[idx] == values
+    else:
+        found = pd.Series(values).isin(parent_keys).to_numpy()
+
+    return ~found & ~is_null
+
+
+def check_foreign_keys(dfs):
+    """Count orphaned rows for every relationship in FOREIGN_KEYS"""
+    rows = []
+    parent_cache = {}
+    for child, column, parent, parent_column in FOREIGN_KEYS:
+        if child not in dfs or parent not in dfs:
+            continue
+        key = (parent, parent_column)
+        if key not in parent_cache:
+            parent_cache[key] = sorted_keys(dfs[parent][parent_column])
+
+        values = dfs[child][column]
+        orphans = find_orphans(values, parent_cache[key])
+        rows.append({
+            'check': 'foreign_key',
+            'table': child,
+            'column': column,
+            'reference': f"{parent}.{parent_column}",
+            'rows_checked': len(values),
+            'nulls': int(values.isna().sum()),
+            'violations': int(orphans.sum()),
+        })
+    return rows
+
+
+def check_ranges(dfs):
+    """Count values outside the allowed [min, max] range of each column in VALUE_RANGES"""
+    rows = []
+    for table, columns in VALUE_RANGES.items():
+        if table not in dfs:
+            continue
+        for column, (lo, hi) in columns.items():
+            if column not in dfs[table].columns:
+                continue
+            values = pd.to_numeric(dfs[table][column], errors='coerce').to_numpy(dtype=np.float64)
+            out_of_range = np.zeros(len(values), dtype=bool)
+            if lo is not None:
+                out_of_range |= values < lo
+            if hi is not None:
+                out_of_range |= values > hi
+            rows.append({
+                'check': 'range',
+                'table': table,
+                'column': column,
+                'reference': f"[{'-inf' if lo is None else lo}, {'inf' if hi is None else hi}]",
+                'rows_checked': len(values),
+                'nulls': int(np.isnan(values).sum()),
+                'violations': int(out_of_range.sum()),
+            })
+    return rows
+
+
+def check_duplicates(dfs):
+    """Count exact duplicate rows and conflicting rows that share a primary key"""
+    rows = []
+    for table, keys in PRIMARY_KEYS.items():
+        if table not in dfs:
+            continue
+        df = dfs[table]
+        exact = df.duplicated()
+        conflicting = df[~exact].duplicated(subset=keys)
+        for check, mask in [('duplicate_row', exact), ('duplicate_key', conflicting)]:
+            rows.append({
+                'check': check,
+                'table': table,
+                'column': ', '.join(keys),
+                'reference': '',
+                'rows_checked': len(df),
+                'nulls': int(df[keys].isna().any(axis=1).sum()),
+                'violations': int(mask.sum()),
+            })
+    return rows
+
+
+def validate_tables(dfs):
+    """Run all checks and return the quality report as a DataFrame"""
+    rows = check_foreign_keys(dfs) + check_ranges(dfs) + check_duplicates(dfs)
+    report = pd.DataFrame(rows, columns=['check', 'table', 'column', 'reference',
+                                         'rows_checked', 'nulls', 'violations'])
+    report['violation_pct'] = (100 * report['violations'] / report['rows_checked'].clip(lower=1)).round(3)
+    return report
+
+
+def print_report(report):
+    """Print the checks that found problems"""
+    failed = report[report['violations'] > 0]
+    print(f"  {len(report)} checks run, {len(failed)} with violations")
+    for _, row in failed.iterrows():
+        target = f" -> {row['reference']}" if row['reference'] else ''
+        print(f"  [{row['check']}] {row['table']}.{row['column']}{target}: "
+              f"{row['violations']:,} rows ({row['violation_pct']}%)")
@@ -0,0 +1,295 @@
+"""
+Entity resolution for studios and people in the entities table.
+The same studio or person can appear under several ids (alias spellings, romanization
+variants, "Studio X" vs "X"), while distinct people can share one name. Resolution:
+    blocking    candidate pairs only come from shared keys, never from all pairs:
+                the normalized name (accents, case, punctuation, corporate suffixes and
+                token order removed) and MinHash LSH over its character trigrams
+                (NUM_PERM hashes in BANDS bands), within each entity kind (company/person)
+    scoring     trigram Jaccard of the normalized names, and co-credit overlap: the
+                cosine similarity of the two entities' co-credited crew (studios and
+                staff), each crew member weighted by rarity (log inverse credit count),
+                so neither prolific crew nor a prolific namesake inflates it
+    merging     pairs with similar names and enough co-credit overlap are linked (a pair
+                whose names differ only if each is the other's best match, so fuzzy
+                links cannot chain), and the groups are the connected components (the
+                union-find of franchises.py); same-name entities without shared crew,
+                or with fewer than MIN_CREDITS credits, stay apart
+The canonical id of a group is its most credited member. The map is written to
+tables.entity_map_path, and the table loaders apply it on read.
+
+Usage:
+    python scripts/entity_resolution.py              # build the canonical id map
+    python scripts/entity_resolution.py --show 20    # also print the largest merged groups
+    python scripts/entity_resolution.py --check-namesakes   # random namesakes must stay apart
+"""
+
+import argparse
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from franchises import connected_components
+from tables import entity_map_path, read_table
+
+# Settings
+NGRAM = 3
+NUM_PERM = 32
+BANDS = 8
+MAX_BLOCK = 100            # larger blocks/buckets (very common names or n-grams) yield no candidates
+MIN_NAME_SIMILARITY = 0.7  # trigram Jaccard for candidates whose normalized names differ
+MIN_OVERLAP = 0.2          # rarity-weighted co-credit cosine needed to merge
+MIN_SHARED_CREW = 2        # and at least this many shared co-credited studios/staff
+MIN_CREDITS = 2            # credits both entities need before co-credits can link them
+NAMESAKE_GROUP = 6         # entities per name in the namesake check
+MAX_NAMESAKE_LINKS = 0.01  # share of random same-name pairs the check tolerates linking
+PAIR_CHUNK = 20000
+SEED = 42
+
+STOPWORDS = {'co', 'ltd', 'inc', 'corp', 'corporation', 'llc', 'kk', 'company', 'studio', 'studios'}
+
+
+def normalize(names):
+    """Blocking key: accents stripped, casefolded, punctuation and corporate suffixes removed, tokens sorted"""
+    text = (names.fillna('').astype(str).str.normalize('NFKD')
+            .str.replace('[\u0300-\u036f]', '', regex=True).str.casefold()
+            .str.replace(r'[\W_]+', ' ', regex=True))
+    return text.str.split().map(lambda tokens: ' '.join(sorted(set(tokens) - STOPWORDS)))
+
+
+def entity_kinds(tables):
+    """Kind of every credited entity: company, or person (staff and voice actors)"""
+    companies = tables['anime_companies']['company_id'].unique()
+    people = np.union1d(tables['anime_staff']['person_id'].unique(), tables['anime_voice_actors']['person_id'].unique())
+    kinds = pd.Series('person', index=pd.Index(people, name='entity_id'))
+    kinds = pd.concat([kinds, pd.Series('company', index=pd.Index(companies, name='entity_id'))])
+    return kinds[~kinds.index.duplicated(keep='last')]
+
+
+def shingles(keys):
+    """(entity position, trigram id) rows of the padded normalized names"""
+    rows, grams = [], []
+    for position, key in enumerate(keys):
+        padded = f" {key} "
+        for gram in sorted({padded[i:i + NGRAM] for i in range(max(len(padded) - NGRAM + 1, 1))}):
+            rows.append(position)
+            grams.append(gram)
+    codes, _ = pd.factorize(pd.Series(grams, dtype=object))
+    return np.asarray(rows, dtype=np.int64), codes.astype(np.int64)
+
+
+def minhash(rows, codes, n, num_perm=NUM_PERM, seed=SEED):
+    """(n x num_perm) MinHash signatures from position-sorted (position, trigram id) rows"""
+    prime = (1 << 31) - 1
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, prime, size=num_perm)
+    b = rng.integers(0, prime, size=num_perm)
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    signatures = np.full((n, num_perm), prime, dtype=np.int64)
+    for k in range(num_perm):
+        signatures[rows[starts], k] = np.minimum.reduceat((codes * a[k] + b[k]) % prime, starts)
+    return signatures
+
+
+def block_pairs(blocks):
+    """(u, v) position pairs, u < v, sharing a block of 2..MAX_BLOCK members (blocks: key columns + position)"""
+    by = [column for column in blocks.columns if column != 'position']
+    sizes = blocks.groupby(by)['position'].transform('size')
+    blocks = blocks[(sizes > 1) & (sizes <= MAX_BLOCK)]
+    pairs = blocks.merge(blocks, on=by)
+    pairs = pairs[pairs['position_x'] < pairs['position_y']]
+    return pairs[['position_x', 'position_y']].to_numpy()
+
+
+def candidate_pairs(keys, kinds, rows, codes):
+    """Pairs sharing a normalized name or an LSH band, with whether the names matched exactly"""
+    positions = np.arange(len(keys))
+    named = keys != ''
+    exact = block_pairs(pd.DataFrame({'kind': kinds, 'key': keys, 'position': positions})[named])
+
+    signatures = minhash(rows, codes, len(keys)).astype(np.uint64)
+    width = NUM_PERM // BANDS
+    bands = []
+    for band in range(BANDS):
+        # Fold the band's rows into one 64-bit key (wrapping multiply-add)
+        key = np.zeros(len(keys), dtype=np.uint64)
+        for column in signatures[:, band * width:(band + 1) * width].T:
+            key = key * np.uint64(1_000_003) + column
+        bands.append(pd.DataFrame({'kind': kinds, 'band': band, 'key': key, 'position': positions})[named])
+    lsh = block_pairs(pd.concat(bands, ignore_index=True))
+
+    pairs = pd.DataFrame(np.vstack([exact, lsh]), columns=['u', 'v']).drop_duplicates(ignore_index=True)
+    pairs['exact'] = keys[pairs['u']] == keys[pairs['v']]
+    # Names that differ in their numbers ("Studio 3" / "Studio 4") are never aliases
+    digits = pd.Series(keys).str.replace(r'\D', '', regex=True).to_numpy(dtype=object)
+    pairs['same_numbers'] = digits[pairs['u']] == digits[pairs['v']]
+    return pairs, len(exact), len(lsh)
+
+
+def credits(tables):
+    """(entity_id, anime_id) credits of companies, staff and voice actors (through characters)"""
+    voice_actors = tables['anime_voice_actors'][['character_id', 'person_id']].merge(
+        tables['anime_characters'][['character_id', 'anime_id']], on='character_id')
+    crew = pd.concat([
+        tables['anime_companies'][['company_id', 'anime_id']].rename(columns={'company_id': 'entity_id'}),
+        tables['anime_staff'][['person_id', 'anime_id']].rename(columns={'person_id': 'entity_id'}),
+    ]).drop_duplicates()
+    cast = voice_actors[['person_id', 'anime_id']].rename(columns={'person_id': 'entity_id'}).drop_duplicates()
+    return crew, pd.concat([crew, cast]).drop_duplicates()
+
+
+def row_overlap(A, B, u, v):
+    """Per pair |A[u] & B[v]| for binary sparse row sets, in chunks of pairs"""
+    out = np.empty(len(u))
+    for start in range(0, len(u), PAIR_CHUNK):
+        stop = start + PAIR_CHUNK
+        out[start:stop] = np.asarray(A[u[start:stop]].multiply(B[v[start:stop]]).sum(axis=1)).ravel()
+    return out
+
+
+def score_pairs(pairs, shingle_matrix, crew, everyone, index):
+    """Trigram Jaccard, rarity-weighted co-credit cosine and credit counts of each candidate pair"""
+    u, v = pairs['u'].to_numpy(), pairs['v'].to_numpy()
+    sizes = np.asarray(shingle_matrix.sum(axis=1)).ravel()
+    shared = row_overlap(shingle_matrix, shingle_matrix, u, v)
+    pairs['name_similarity'] = shared / (sizes[u] + sizes[v] - shared)
+
+    # Co-credited crew: entity x anime incidence times the crew's anime x entity incidence
+    anime = pd.Index(everyone['anime_id'].unique())
+    rows = pd.Index(index).get_indexer(everyone['entity_id'])
+    known = rows >= 0
+    E = sparse.csr_matrix((np.ones(known.sum()), (rows[known], anime.get_indexer(everyone['anime_id'][known]))),
+                          shape=(len(index), len(anime)))
+    crew_rows = pd.Index(index).get_indexer(crew['entity_id'])
+    crew_known = crew_rows >= 0
+    C = sparse.csr_matrix((np.ones(crew_known.sum()), (anime.get_indexer(crew['anime_id'][crew_known]),
+                                                      crew_rows[crew_known])), shape=(len(anime), len(index)))
+    involved = np.unique(np.concatenate([u, v]))
+    neighbours = (E[involved] @ C).tocsr()
+    neighbours.data[:] = 1.0
+    # An entity is not its own co-credit
+    own = sparse.csr_matrix((np.ones(len(involved)), (np.arange(len(involved)), involved)), shape=neighbours.shape)
+    neighbours = (neighbours - neighbours.multiply(own)).tocsr()
+    neighbours.eliminate_zeros()
+
+    local = pd.Index(involved)
+    iu, iv = local.get_indexer(u), local.get_indexer(v)
+    pairs['shared_crew'] = row_overlap(neighbours, neighbours, iu, iv).astype(np.int64)
+    # Cosine over crew weighted by rarity: prolific crew is co-credited with nearly everyone
+    crew_credits = np.asarray(C.sum(axis=0)).ravel()
+    rarity = np.log((len(anime) + 1) / (crew_credits + 1))
+    weighted = (neighbours @ sparse.diags(rarity)).tocsr()
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+    dot = row_overlap(weighted, weighted, iu, iv)
+    pairs['co_credit_overlap'] = dot / np.maximum(norms[iu] * norms[iv], 1e-12)
+    n_credits = np.asarray(E.sum(axis=1)).ravel()
+    pairs['credits_x'], pairs['credits_y'] = n_credits[u].astype(np.int64), n_credits[v].astype(np.int64)
+    return pairs
+
+
+def link(pairs):
+    """Whether each scored pair is merged: same name or mutual best fuzzy match, with shared crew"""
+    credited = ((pairs['co_credit_overlap'] >= MIN_OVERLAP) & (pairs['shared_crew'] >= MIN_SHARED_CREW)
+                & (np.minimum(pairs['credits_x'], pairs['credits_y']) >= MIN_CREDITS))
+    fuzzy = pairs[credited & ~pairs['exact'] & pairs['same_numbers'] & (pairs['name_similarity'] >= MIN_NAME_SIMILARITY)]
+    score = fuzzy['name_similarity'] + fuzzy['co_credit_overlap']
+    ends = pd.DataFrame({'entity': np.concatenate([fuzzy['u'], fuzzy['v']]), 'score': np.concatenate([score, score]),
+                         'pair': np.concatenate([fuzzy.index, fuzzy.index])})
+    best = ends.sort_values(['entity', 'score', 'pair'], ascending=[True, False, True]).drop_duplicates('entity')
+    mutual = best['pair'].value_counts()
+    return (credited & pairs['exact']) | pairs.index.isin(mutual[mutual == 2].index)
+
+
+def resolve_entities(tables):
+    """Canonical id map of merged entities and the scored candidate pairs"""
+    entities = tables['entities'].drop_duplicates('entity_id')
+    kinds = entity_kinds(tables)
+    entities = entities[entities['entity_id'].isin(kinds.index)].sort_values('entity_id', ignore_index=True)
+    index = pd.Index(entities['entity_id'])
+    keys = normalize(entities['name']).to_numpy(dtype=object)
+    entity_kind = kinds.reindex(index).to_numpy()
+
+    print(f"Blocking {len(entities):,} studios and people...")
+    rows, codes = shingles(keys)
+    shingle_matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, codes)), shape=(len(keys), codes.max() + 1))
+    pairs, n_exact, n_lsh = candidate_pairs(keys, entity_kind, rows, codes)
+    print(f"  {n_exact:,} same-name and {n_lsh:,} LSH candidate pairs ({len(pairs):,} distinct)")
+
+    crew, everyone = credits(tables)
+    pairs = score_pairs(pairs, shingle_matrix, crew, everyone, index)
+    pairs['merged'] = link(pairs)
+    merged = pairs[pairs['merged']]
+
+    labels = connected_components(merged['u'].to_numpy(), merged['v'].to_numpy(), len(index))
+    n_credits = everyone['entity_id'].value_counts().reindex(index, fill_value=0).to_numpy()
+    groups = pd.DataFrame({'entity_id': index, 'name': entities['name'], 'group': labels, 'credits': n_credits})
+    groups = groups[groups.groupby('group')['entity_id'].transform('size') > 1]
+    # The most credited member (then the smallest id) names the group
+    leaders = groups.sort_values(['group', 'credits', 'entity_id'], ascending=[True, False, True]).drop_duplicates('group')
+    leaders = leaders.set_index('group')
+    mapping = pd.DataFrame({
+        'entity_id': groups['entity_id'].to_numpy(),
+        'canonical_id': leaders.loc[groups['group'], 'entity_id'].to_numpy(),
+        'canonical_name': leaders.loc[groups['group'], 'name'].to_numpy(),
+    }).sort_values(['canonical_id', 'entity_id'], ignore_index=True)
+
+    pairs[['u', 'v']] = np.column_stack([index[pairs['u']], index[pairs['v']]])
+    pairs = pairs.rename(columns={'u': 'entity_id_x', 'v': 'entity_id_y'})
+    return mapping, pairs
+
+
+def namesake_check(tables, seed=SEED):
+    """Share of same-name pairs linked after giving random groups of NAMESAKE_GROUP entities one name"""
+    entities = tables['entities'].drop_duplicates('entity_id')
+    order = np.random.default_rng(seed).permutation(len(entities))
+    names = pd.Series("Name " + (order // NAMESAKE_GROUP).astype(str), index=entities.index)
+    _, pairs = resolve_entities({**tables, 'entities': entities.assign(name=names)})
+    same_name = pairs[pairs['exact']]
+    return same_name['merged'].sum(), len(same_name)
+
+
+def save_map(mapping):
+    os.makedirs(os.path.dirname(entity_map_path), exist_ok=True)
+    tmp_path = f"{entity_map_path}.{os.getpid()}.tmp"
+    mapping.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, entity_map_path)
+    print(f"Saved {entity_map_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve duplicate studios and people to canonical ids")
+    parser.add_argument('--show', type=int, default=0, help="print the N largest merged groups")
+    parser.add_argument('--check-namesakes', action='store_true',
+                        help="give random entities shared names and fail if they get merged; writes no map")
+    args = parser.parse_args()
+
+    names = ["anime_characters", "anime_companies", "anime_staff", "anime_voice_actors", "entities"]
+    tables = {name: read_table(name, canonical=False) for name in names}
+    if args.check_namesakes:
+        linked, total = namesake_check(tables)
+        print(f"  {linked:,} of {total:,} random same-name pairs linked")
+        if linked > MAX_NAMESAKE_LINKS * total:
+            raise SystemExit(f"Namesake check failed: more than {MAX_NAMESAKE_LINKS:.0%} of random namesakes merged")
+        print("Namesake check passed")
+        return
+    mapping, pairs = resolve_entities(tables)
+
+    n_groups = mapping['canonical_id'].nunique()
+    same_name_apart = (pairs['exact'] & ~pairs['merged']).sum()
+    print(f"  {pairs['merged'].sum():,} pairs linked: {len(mapping) - n_groups:,} ids merged into {n_groups:,} entities")
+    print(f"  {same_name_apart:,} same-name pairs kept apart (too few credits or too little shared crew)")
+    save_map(mapping)
+
+    if args.show:
+        sizes = mapping.groupby('canonical_id').size().sort_values(ascending=False).head(args.show)
+        for canonical_id in sizes.index:
+            members = mapping[mapping['canonical_id'] == canonical_id]['entity_id']
+            aliases = tables['entities'].set_index('entity_id').loc[members, 'name']
+            print(f"  {canonical_id}: " + " | ".join(re.sub(r'\s+', ' ', str(a)) for a in aliases))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Explanations for the score model, computed on held-out data.
+Permutation importance: each feature's test column is shuffled N_REPEATS times and its
+importance is the mean increase in test MSE over the baseline predictions train_model
+already made (the baseline is never recomputed). Unlike impurity importance it is not
+inflated for high-cardinality features such as year and episodes. Features are spread
+over a process pool: the test matrix is saved once as a .npy that every worker keeps
+memory-mapped read-only instead of receiving it pickled with every task, and the model is
+sent once per worker by the pool initializer, so a task is just a column index and a seed.
+Predictions are made on CHUNK_ROWS-row working copies with the permuted column swapped in,
+so a worker's private memory does not grow with the size of the test matrix.
+
+Tree-path contributions (Saabas): along every decision path, the change in node mean
+at each split is credited to the split feature, so each prediction is the forest's
+root mean plus one additive contribution per feature. All trees are handled with one
+sparse product of the decision-path indicator and a node -> (feature, delta) matrix.
+"""
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Settings
+N_REPEATS = 10
+CHUNK_ROWS = 8192
+MAX_CONTRIBUTION_ROWS = 5000
+
+# Model and test matrix held by each permutation worker process
+_model = None
+_features = None
+_X = None
+_y = None
+_baseline_loss = None
+
+
+def _init_worker(model, features, matrix_path, y, baseline_loss, single_thread=True):
+    global _model, _features, _X, _y, _baseline_loss
+    if single_thread:
+        # The pool already uses every core; threaded predict would oversubscribe them
+        model.set_params(n_jobs=1)
+    # Every worker shares the same read-only memory-mapped file
+    _model, _features, _X = model, features, np.load(matrix_path, mmap_mode='r')
+    _y, _baseline_loss = y, baseline_loss
+
+
+def _permuted_loss(column, permuted):
+    """Test MSE with `column` replaced by `permuted`, predicted one row chunk at a time"""
+    squared = 0.0
+    for start in range(0, len(_X), CHUNK_ROWS):
+        stop = start + CHUNK_ROWS
+        chunk = np.array(_X[start:stop])
+        chunk[:, column] = permuted[start:stop]
+        # The model was fitted on a DataFrame; keep the feature names sklearn checks
+        pred = _model.predict(pd.DataFrame(chunk, columns=_features, copy=False))
+        squared += np.sum((_y[start:stop] - pred) ** 2)
+    return squared / len(_X)
+
+
+def _permuted_losses(args):
+    column, n_repeats, seed = args
+    rng = np.random.default_rng([seed, column])
+    original = np.array(_X[:, column])
+    increases = np.empty(n_repeats)
+    for r in range(n_repeats):
+        increases[r] = _permuted_loss(column, rng.permutation(original)) - _baseline_loss
+    return column, increases
+
+
+def permutation_importance(model, X_test, y_test, baseline_pred, n_repeats=N_REPEATS, workers=None, seed=42):
+    """Mean and std increase in test MSE when each feature is shuffled, across a process pool"""
+    features = list(X_test.columns)
+    X = X_test.to_numpy(dtype=np.float64)
+    y = np.asarray(y_test, dtype=np.float64)
+    baseline_loss = np.mean((y - np.asarray(baseline_pred)) ** 2)
+    workers = min(workers or os.cpu_count(), len(features))
+    tasks = [(column, n_repeats, seed) for column in range(len(features))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        matrix_path = os.path.join(tmp, "X_test.npy")
+        np.save(matrix_path, X)
+        if workers <= 1:
+            _init_worker(model, features, matrix_path, y, baseline_loss, single_thread=False)
+            results = list(map(_permuted_losses, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model, features, matrix_path, y, baseline_loss)) as pool:
+                results = list(pool.map(_permuted_losses, tasks))
+
+    increases = np.vstack([r for _, r in sorted(results, key=lambda item: item[0])])
+    return pd.DataFrame({
+        'feature': features,
+        'importance': increases.mean(axis=1),
+        'std': increases.std(axis=1),
+    }).sort_values('importance', ascending=False, ignore_index=True)
+
+
+def tree_contributions(model, X):
+    """(bias, rows x features contributions) with prediction = bias + contributions.sum(axis=1)"""
+    # Keep the feature names of a DataFrame, which the model was fitted on
+    columns = X.columns if isinstance(X, pd.DataFrame) else None
+    X = pd.DataFrame(np.asarray(X, dtype=np.float32), columns=columns)
+    indicator, offsets = model.decision_path(X)
+    node_rows, node_features, deltas = [], [], []
+    bias = 0.0
+    for offset, estimator in zip(offsets, model.estimators_):
+        tree = estimator.tree_
+        value = tree.value[:, 0, 0]
+        split = np.flatnonzero(tree.children_left >= 0)
+        parent = np.full(tree.node_count, -1)
+        parent[tree.children_left[split]] = split
+        parent[tree.children_right[split]] = split
+        child = np.flatnonzero(parent >= 0)
+        node_rows.append(offset + child)
+        node_features.append(tree.feature[parent[child]])
+        deltas.append(value[child] - value[parent[child]])
+        bias += value[0]
+
+    n_trees = len(model.estimators_)
+    node_to_feature = sparse.csr_matrix(
+        (np.concatenate(deltas), (np.concatenate(node_rows), np.concatenate(node_features))),
+        shape=(offsets[-1], X.shape[1]))
+    contributions = (indicator @ node_to_feature).toarray() / n_trees
+    return bias / n_trees, contributions
+
+
+def mean_abs_contributions(model, X_test, max_rows=MAX_CONTRIBUTION_ROWS, seed=42):
+    """Mean |tree-path contribution| per feature over (a sample of) the test rows"""
+    if len(X_test) > max_rows:
+        X_test = X_test.sample(max_rows, random_state=seed)
+    _, contributions = tree_contributions(model, X_test)
+    return pd.Series(np.abs(contributions).mean(axis=0), index=X_test.columns, name='mean_abs_contribution')
+
+
+def explain(model, X_test, y_test, baseline_pred, n_repeats=N_REPEATS, workers=None):
+    """Permutation importance with impurity importance and mean |contribution| alongside"""
+    importances = permutation_importance(model, X_test, y_test, baseline_pred, n_repeats, workers)
+    impurity = pd.Series(model.feature_importances_, index=X_test.columns)
+    contributions = mean_abs_contributions(model, X_test)
+    return importances.assign(impurity=importances['feature'].map(impurity).to_numpy(),
+                              mean_abs_contribution=importances['feature'].map(contributions).to_numpy())
@@ -0,0 +1,257 @@
+"""
+SQLite export of the analytic results for downstream consumers.
+Writes every computed aggregate into one indexed SQLite file, so leaderboards, yearly
+and seasonal stats, genre cross-tabs and model predictions can be queried without pandas:
+    studio_stats, director_stats,   per-entity and per-year score statistics (from the
+    voice_actor_stats, year_stats   incremental aggregates in data/aggregates/, by
+                                    canonical entity id)
+    studio_genre, genre_year        cross-tabs: title count and mean score per cell
+                                    (studios by canonical id, with their names)
+    predictions                     held-out score predictions of the model (data/models/)
+    <phase>_<table>                 every table in the phase results (output/results/)
+    metrics                         every scalar in the phase results (phase, name, value)
+
+The export is incremental: each table's content hash is kept in export_tables, and only
+tables whose content changed are rewritten (dropped, bulk-inserted with executemany and
+re-indexed in one explicit BEGIN ... COMMIT, rolled back on failure). The database runs in WAL mode so readers are never
+blocked by an export.
+
+Usage:
+    python scripts/export_sqlite.py
+    python scripts/export_sqlite.py --full       # rewrite every table
+    sqlite3 data/export/anime_results.sqlite "SELECT name, mean_score FROM studio_stats
+                                              WHERE n_scored >= 10 ORDER BY mean_score DESC LIMIT 10"
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+from crosstab import anime_index, crosstab, crosstab_mean, entity_names, incidence, studio_pairs
+from results import load_results
+from store import content_hash
+from tables import entity_map, load_tables
+
+# Settings
+database_path = "data/export/anime_results.sqlite"
+predictions_path = "data/models/predictions.csv"
+
+# Columns indexed wherever they appear, and composite indexes per table
+INDEXED_COLUMNS = ['anime_id', 'name', 'studio', 'genre', 'year', 'season', 'mean_score', 'phase']
+INDEXES = {
+    'studio_genre': [['studio_id', 'genre'], ['genre', 'count']],
+    'genre_year': [['genre', 'year']],
+    'metrics': [['phase', 'name']],
+}
+
+# Aggregate name -> (id column in the export, whether the id is an entity to name)
+STATS = {
+    'studio': ('studio_id', True),
+    'director': ('director_id', True),
+    'voice_actor': ('voice_actor_id', True),
+    'year': ('year', False),
+}
+
+
+def stats_tables(entities):
+    """Per-studio/director/VA/year statistics with names, mean and standard deviation"""
+    # Stale stored tables (the cleaned store changed since they were built) are recomputed
+    stored = aggregates.load_aggregates(current_only=True)
+    sources = aggregates.load_tables()
+    if stored is None:
+        stored = aggregates.compute_all(sources)
+    # The stored aggregates are keyed by raw ids; export them by canonical id, as the loaders read
+    mapping = entity_map()
+    if mapping is not None:
+        stored = aggregates.canonical_aggregates(stored, sources, mapping)
+    names = entities.set_index('entity_id')['name']
+    exported = {}
+    for name, (id_col, is_entity) in STATS.items():
+        table = stored[name]
+        table = table[table['n'] > 0].rename_axis(id_col).reset_index()
+        n_scored = table['n_scored'].where(table['n_scored'] > 0)
+        table['mean_score'] = table['score_sum'] / n_scored
+        variance = (table['score_sq_sum'] - n_scored * table['mean_score'] ** 2) / (n_scored - 1).where(n_scored > 1)
+        table['std_score'] = np.sqrt(variance.clip(lower=0))
+        if is_entity:
+            table.insert(1, 'name', table[id_col].map(names))
+        exported[f"{name}_stats"] = table
+    return exported
+
+
+def crosstab_tables(tables):
+    """Studio x genre and genre x year counts with mean scores, non-empty cells only"""
+    anime, genres = tables['anime'], tables['anime_genres']
+    studios = studio_pairs(tables['anime_companies'], tables['entities'])
+    index = anime_index(anime, genres, studios)
+    scores = anime.set_index('anime_id')['score'].reindex(index).to_numpy(dtype=np.float64)
+    years = pd.DataFrame({'anime_id': anime['anime_id'], 'year': pd.to_datetime(anime['start_date']).dt.year})
+
+    genre_inc = incidence(genres, index, key='genre')
+    studio_inc = incidence(studios, index)
+    year_inc = incidence(years.dropna(), index, key='year')
+    # Studios are keyed by canonical id; the name is only a label
+    studio_genre = cells(crosstab(studio_inc, genre_inc), crosstab_mean(studio_inc, genre_inc, scores)[0],
+                         'studio_id', 'genre').astype({'studio_id': np.int64})
+    studio_genre.insert(1, 'studio', entity_names(studio_genre['studio_id'], tables['entities']))
+    return {
+        'studio_genre': studio_genre,
+        'genre_year': cells(crosstab(genre_inc, year_inc), crosstab_mean(genre_inc, year_inc, scores)[0],
+                            'genre', 'year'),
+    }
+
+
+def cells(counts, means, row_name, col_name):
+    """(row, col, count, mean_score) rows of a count crosstab and the matching mean crosstab"""
+    count, row_labels, col_labels = counts
+    count = count.tocoo()
+    mean = means[0].tocsr()
+    frame = pd.DataFrame({
+        row_name: row_labels[count.row],
+        col_name: col_labels[count.col],
+        'count': count.data.astype(np.int64),
+        'mean_score': np.asarray(mean[count.row, count.col]).ravel(),
+    })
+    frame['mean_score'] = frame['mean_score'].where(frame['mean_score'] > 0)
+    return frame.sort_values([row_name, col_name]).reset_index(drop=True)
+
+
+def results_tables():
+    """Tables of the phase results (<phase>_<key>) and one metrics table of their scalars"""
+    exported, metrics = {}, []
+    for phase, results in load_results().items():
+        for key, value in results.items():
+            if key == 'generated':
+                continue
+            if isinstance(value, list) and value and isinstance(value[0], dict):
+                exported[f"{phase}_{key}"] = pd.DataFrame(value)
+            elif isinstance(value, dict):
+                exported[f"{phase}_{key}"] = pd.DataFrame({'name': list(value), 'value': list(value.values())})
+            elif not isinstance(value, list):
+                metrics.append({'phase': phase, 'name': key, 'value': value})
+    exported['metrics'] = pd.DataFrame(metrics, columns=['phase', 'name', 'value'])
+    return exported
+
+
+def collect_tables():
+    """Every table to export, as {name: DataFrame}"""
+    tables = load_tables(["anime", "anime_companies", "anime_genres", "entities"])
+    exported = {**stats_tables(tables['entities']), **crosstab_tables(tables), **results_tables()}
+    if os.path.exists(predictions_path):
+        exported['predictions'] = pd.read_csv(predictions_path)
+    return exported
+
+
+def sql_type(series):
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(series):
+        return "REAL"
+    return "TEXT" if series.map(lambda v: v is None or isinstance(v, str)).all() else ""
+
+
+def rows(df):
+    """Rows as tuples of plain Python values, NaN as NULL"""
+    columns = []
+    for name in df.columns:
+        column = df[name]
+        if pd.api.types.is_datetime64_any_dtype(column):
+            column = column.dt.strftime('%Y-%m-%d')
+        values = column.astype(object).where(column.notna(), None).tolist()
+        columns.append(values)
+    return list(zip(*columns))
+
+
+def table_hash(df):
+    return content_hash(df.to_csv(index=False).encode())
+
+
+def quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def write_table(con, name, df, digest):
+    """Replace one table (data, indexes and its export_tables entry) in a single transaction"""
+    columns = ", ".join(f"{quote(c)} {sql_type(df[c])}".rstrip() for c in df.columns)
+    placeholders = ", ".join("?" for _ in df.columns)
+    # The connection is in autocommit mode, so DROP/CREATE are only transactional inside
+    # this explicit BEGIN; readers see the old table until COMMIT, and a failure leaves it
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        con.execute(f"DROP TABLE IF EXISTS {quote(name)}")
+        con.execute(f"CREATE TABLE {quote(name)} ({columns})")
+        con.executemany(f"INSERT INTO {quote(name)} VALUES ({placeholders})", rows(df))
+        indexes = [[c] for c in INDEXED_COLUMNS if c in df.columns] + INDEXES.get(name, [])
+        for index_columns in indexes:
+            index_name = quote(f"idx_{name}_{'_'.join(index_columns)}")
+            con.execute(f"CREATE INDEX {index_name} ON {quote(name)} ({', '.join(map(quote, index_columns))})")
+        con.execute("INSERT OR REPLACE INTO export_tables VALUES (?, ?, ?, ?)",
+                    (name, digest, len(df), datetime.now().isoformat(timespec='seconds')))
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+    con.execute("COMMIT")
+
+
+def drop_table(con, name):
+    """Drop a table no longer produced, with its export_tables entry, in one transaction"""
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        con.execute(f"DROP TABLE IF EXISTS {quote(name)}")
+        con.execute("DELETE FROM export_tables WHERE name = ?", (name,))
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+    con.execute("COMMIT")
+
+
+def connect(path=None):
+    """Connection to the export database in WAL mode, with its export_tables bookkeeping"""
+    path = path or database_path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Autocommit; write_table and drop_table manage their own transactions
+    con = sqlite3.connect(path, isolation_level=None)
+    con.execute("PRAGMA journal_mode = WAL")
+    con.execute("PRAGMA synchronous = NORMAL")
+    con.execute("CREATE TABLE IF NOT EXISTS export_tables "
+                "(name TEXT PRIMARY KEY, hash TEXT, n_rows INTEGER, exported TEXT)")
+    return con
+
+
+def export(path=None, full=False):
+    """Write every changed table (all of them with full=True) and drop tables no longer produced"""
+    exported = collect_tables()
+    con = connect(path)
+    try:
+        stored = dict(con.execute("SELECT name, hash FROM export_tables").fetchall())
+        written = 0
+        for name, df in exported.items():
+            digest = table_hash(df)
+            if not full and stored.get(name) == digest:
+                continue
+            write_table(con, name, df, digest)
+            written += 1
+            print(f"  wrote {name} ({len(df):,} rows)")
+        for name in set(stored) - set(exported):
+            drop_table(con, name)
+            print(f"  dropped {name}")
+        print(f"{written} of {len(exported)} table(s) changed; database at {path or database_path}")
+    finally:
+        con.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the analytic results to an indexed SQLite database")
+    parser.add_argument('--db', default=database_path, help="database file")
+    parser.add_argument('--full', action='store_true', help="rewrite every table, changed or not")
+    args = parser.parse_args()
+    export(args.db, full=args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,24 +4,153 @@ Generates a professional academic-style PDF report with proper formatting and fi
 """
 
 from fpdf import FPDF
+from PIL import Image
+import argparse
+import hashlib
 import os
+from datetime import datetime
+
+from results import load_results
 
 # Get the script directory and project root
 script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(script_dir)
 images_dir = os.path.join(project_root, "output", "images")
 reports_dir = os.path.join(project_root, "output", "reports")
+results_dir = os.path.join(project_root, "output", "results")
+image_cache_dir = os.path.join(project_root, "output", ".image_cache")
+
+# Figures are resampled to their placed width at this resolution before embedding
+TARGET_DPI = 200
+# 'png' = optimized 256-color palette PNG (sharp text/lines), 'jpeg' = smaller, lossy
+IMAGE_FORMAT = 'png'
+JPEG_QUALITY = 85
+
+
+def prepare_image(image_path, width_mm, dpi=TARGET_DPI, fmt=IMAGE_FORMAT):
+    """Downsample a figure to its placed width and re-encode it, cached by source content hash"""
+    with open(image_path, 'rb') as f:
+        data = f.read()
+    
+    params = f"{width_mm}:{dpi}:{fmt}:{JPEG_QUALITY}".encode()
+    key = hashlib.sha256(data + params).hexdigest()[:24]
+    cached_path = os.path.join(image_cache_dir, f"{key}.{'jpg' if fmt == 'jpeg' else 'png'}")
+    if os.path.exists(cached_path):
+        return cached_path
+    
+    os.makedirs(image_cache_dir, exist_ok=True)
+    with Image.open(image_path) as img:
+        img.load()
+        # Flatten transparency onto white; the page background is white anyway
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, 'white')
+            background.paste(img, mask=img.split()[3])
+            img = background
+        else:
+            img = img.convert('RGB')
+        
+        target_px = round(width_mm / 25.4 * dpi)
+        if img.width > target_px:
+            target_height = round(img.height * target_px / img.width)
+            img = img.resize((target_px, target_height), Image.LANCZOS)
+        
+        tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+        if fmt == 'jpeg':
+            img.save(tmp_path, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        else:
+            img = img.quantize(colors=256, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+            img.save(tmp_path, 'PNG', optimize=True)
+    os.replace(tmp_path, cached_path)
+    return cached_path
+
+class MissingResultsError(RuntimeError):
+    """Phase results the report quotes are missing"""
+
+
+def result(results, path, missing):
+    """Look up 'phase.key' in the loaded results; a missing value is recorded in `missing`"""
+    phase, key = path.split('.', 1)
+    value = results.get(phase, {}).get(key)
+    if value is None:
+        print(f"  [MISSING RESULT] {path}")
+        missing.append(path)
+    return value
+
+
+def number(value, spec):
+    return 'n/a' if value is None else format(value, spec)
+
+
+def analysis_date(results):
+    """Month and year of the most recent phase results"""
+    stamps = [phase.get('generated') for phase in results.values() if isinstance(phase, dict)]
+    stamps = [stamp for stamp in stamps if stamp]
+    return datetime.fromisoformat(max(stamps)).strftime('%B %Y') if stamps else None
+
+
+def report_values(results):
+    """Format every number quoted in the report text from the phase results;
+    returns the values ('n/a' where a result is missing) and the missing result paths"""
+    missing = []
+    get = lambda path: result(results, path, missing)
+    v = {}
+    v['n_titles'] = number(get('analysis.total_anime'), ',')
+    v['n_characters'] = number(get('analysis.unique_characters'), ',')
+    year_min, year_max = get('analysis.year_min'), get('analysis.year_max')
+    v['year_span'] = 'n/a' if year_min is None or year_max is None else f"{year_min:.0f}-{year_max:.0f}"
+    v['avg_score'] = number(get('analysis.average_score'), '.1f')
+    v['median_score'] = number(get('analysis.median_score'), '.1f')
+    
+    top_genres = get('analysis.top_genres')
+    v['top_genre'] = top_genres[0]['genre'] if top_genres else 'n/a'
+    v['top_genre_count'] = number(top_genres[0]['count'] if top_genres else None, ',')
+    
+    v.update(growth='n/a', growth_base_year='n/a', peak_count='n/a', peak_year='n/a', yearly_score_range='n/a')
+    yearly = get('analysis.yearly_stats')
+    if yearly:
+        counts = {row['year']: row['count'] for row in yearly}
+        means = [row['mean_score'] for row in yearly if row['mean_score'] is not None]
+        base_year = 2005 if 2005 in counts else min(counts)
+        peak_year = max(counts, key=counts.get)
+        v['growth'] = f"{counts[peak_year] / counts[base_year]:.1f}x"
+        v['growth_base_year'] = f"{base_year:.0f}"
+        v['peak_count'] = f"{counts[peak_year]:,}"
+        v['peak_year'] = f"{peak_year:.0f}"
+        if means:
+            v['yearly_score_range'] = f"{min(means):.1f}-{max(means):.1f}"
+    
+    popularity = get('analysis.popularity_groups')
+    if popularity:
+        v['popularity_rows'] = [[f"{row['popularity_group']} members",
+                                 '-' if row['score'] is None else f"{row['score']:.2f}"] for row in popularity]
+    else:
+        v['popularity_rows'] = [['n/a', 'n/a']]
+    
+    v['train_r2'] = number(get('ml_model.train_r2'), '.2f')
+    v['test_r2'] = number(get('ml_model.test_r2'), '.2f')
+    v['test_mae'] = number(get('ml_model.test_mae'), '.2f')
+    v['test_rmse'] = number(get('ml_model.test_rmse'), '.2f')
+    
+    date = analysis_date(results)
+    if date is None:
+        missing.append('generated')
+    v['analysis_date'] = date or 'n/a'
+    return v, missing
+
 
 class IEEEReportPDF(FPDF):
-    def __init__(self):
+    def __init__(self, year_span='1980-2024', images_dir=images_dir):
         super().__init__()
         self.figure_count = 0
+        self.year_span = year_span
+        self.images_dir = images_dir
     
     def header(self):
         if self.page_no() > 1:  # Skip header on title page
             self.set_font('Helvetica', 'I', 8)
             self.set_text_color(128, 128, 128)
-            self.cell(0, 8, 'A Comprehensive Data-Driven Analysis of the Anime Industry (1980-2024)', border=False, align='C')
+            self.cell(0, 8, f'A Comprehensive Data-Driven Analysis of the Anime Industry ({self.year_span})', border=False, align='C')
             self.ln(12)  # Increased gap after header
     
     def footer(self):
@@ -30,14 +159,14 @@ class IEEEReportPDF(FPDF):
         self.set_text_color(128, 128, 128)
         self.cell(0, 10, f'Page {self.page_no()}', align='C')
 
-    def title_page(self):
+    def title_page(self, n_titles, analysis_date):
         self.add_page()
         self.ln(40)
         
         # Main title
         self.set_font('Helvetica', 'B', 22)
         self.set_text_color(0, 51, 102)  # Dark blue
-        self.multi_cell(0, 12, 'A Comprehensive Data-Driven Analysis\nof the Anime Industry (1980-2024)', align='C')
+        self.multi_cell(0, 12, f'A Comprehensive Data-Driven Analysis\nof the Anime Industry ({self.year_span})', align='C')
         
         self.ln(20)
         
@@ -56,7 +185,7 @@ class IEEEReportPDF(FPDF):
         self.set_font('Helvetica', '', 11)
         self.set_text_color(51, 51, 51)
         self.cell(0, 8, 'Dataset: MyAnimeList Anime Dataset', ln=True, align='C')
-        self.cell(0, 8, '9,999 Titles | 25+ Visualizations | ML Modeling', ln=True, align='C')
+        self.cell(0, 8, f'{n_titles} Titles | 25+ Visualizations | ML Modeling', ln=True, align='C')
         
         self.ln(30)
         
@@ -64,7 +193,7 @@ class IEEEReportPDF(FPDF):
         self.set_font('Helvetica', 'I', 10)
         self.set_text_color(128, 128, 128)
         self.cell(0, 8, 'Data Source: MyAnimeList (https://myanimelist.net)', ln=True, align='C')
-        self.cell(0, 8, 'Analysis Date: January 2026', ln=True, align='C')
+        self.cell(0, 8, f'Analysis Date: {analysis_date}', ln=True, align='C')
 
     def section_heading(self, number, title):
         """IEEE-style section heading (e.g., I. INTRODUCTION)"""
@@ -95,14 +224,14 @@ class IEEEReportPDF(FPDF):
         self.set_x(15)
         self.multi_cell(180, 5, '  * ' + safe_text)
 
-    def add_figure(self, filename, caption, w=150):
+    def add_figure(self, filename, caption, w=150, fmt=IMAGE_FORMAT):
         """Add a figure with IEEE-style caption"""
         self.figure_count += 1
-        image_path = os.path.join(images_dir, filename)
+        image_path = os.path.join(self.images_dir, filename)
         
         if os.path.exists(image_path):
             x = (210 - w) / 2
-            self.image(image_path, x=x, w=w)
+            self.image(prepare_image(image_path, w, fmt=fmt), x=x, w=w)
             self.ln(3)
             # Caption
             self.set_font('Helvetica', 'I', 9)
@@ -134,16 +263,24 @@ class IEEEReportPDF(FPDF):
         self.ln(5)
 
 
-def generate_ieee_report():
+def generate_ieee_report(results=None, images_dir=images_dir, output_pdf_path=None, allow_missing=False):
+    """Build the PDF; missing results fail the build unless allow_missing, which prints them as n/a"""
     print("=" * 60)
     print("IEEE-Style Anime Research Report Generator")
     print("=" * 60)
     
-    pdf = IEEEReportPDF()
+    if results is None:
+        results = load_results(results_dir)
+    v, missing = report_values(results)
+    if missing and not allow_missing:
+        raise MissingResultsError(f"{len(missing)} result(s) missing ({', '.join(missing)}); run the phases "
+                                  f"that produce them, or allow missing results to print them as n/a")
+    
+    pdf = IEEEReportPDF(year_span=v['year_span'], images_dir=images_dir)
     pdf.set_auto_page_break(auto=True, margin=15)
     
     # ==================== TITLE PAGE ====================
-    pdf.title_page()
+    pdf.title_page(v['n_titles'], v['analysis_date'])
     
     # ==================== ABSTRACT ====================
     pdf.add_page()
@@ -151,18 +288,18 @@ def generate_ieee_report():
     pdf.body_text(
         'The global anime industry has experienced rapid expansion over the past two decades, '
         'driven by streaming platforms, international audiences, and evolving production models. '
-        'This study presents a comprehensive data-driven analysis of 9,999 anime titles sourced from MyAnimeList, '
-        'covering releases from 1980 to 2024. Using descriptive analytics, temporal trend analysis, '
+        f'This study presents a comprehensive data-driven analysis of {v["n_titles"]} anime titles sourced from MyAnimeList, '
+        f'covering releases from {v["year_span"].replace("-", " to ")}. Using descriptive analytics, temporal trend analysis, '
         'people-centric evaluation, and machine learning techniques, this research examines whether '
         'large-scale growth has impacted content quality and identifies the factors most strongly associated '
         'with highly rated anime.'
     )
     pdf.body_text(
-        'Results show that average user scores have remained stable at approximately 7.0 for over thirty years, '
-        'indicating no observable score inflation despite a nearly fivefold increase in production volume. '
+        f'Results show that average user scores have remained stable at approximately {v["avg_score"]} for over thirty years, '
+        f'indicating no observable score inflation despite a {v["growth"]} increase in production volume. '
         'Popularity exhibits a strong positive correlation with ratings, while directors and voice actors '
         'emerge as consistent quality signals. Machine learning models demonstrate very low predictive power '
-        '(R-squared = 0.02), highlighting the inherently subjective and creative nature of anime quality. '
+        f'(R-squared = {v["test_r2"]}), highlighting the inherently subjective and creative nature of anime quality. '
         'These findings suggest that while data can guide strategic decisions, creative success in anime '
         'remains fundamentally resistant to algorithmic prediction.'
     )
@@ -212,8 +349,8 @@ def generate_ieee_report():
     
     pdf.subsection_heading('A', 'Data Source')
     pdf.body_text(
-        'The dataset consists of 9,999 anime entries obtained from MyAnimeList (MAL), one of the largest '
-        'anime databases, supported by millions of user ratings and reviews. The data includes titles released between 1980 and 2024.'
+        f'The dataset consists of {v["n_titles"]} anime entries obtained from MyAnimeList (MAL), one of the largest '
+        f'anime databases, supported by millions of user ratings and reviews. The data includes titles released between {v["year_span"].replace("-", " and ")}.'
     )
     
     pdf.subsection_heading('B', 'Data Components')
@@ -226,7 +363,7 @@ def generate_ieee_report():
             ['anime_companies.csv', 'Studio and producer relationships'],
             ['anime_staff.csv', 'Staff credits including directors'],
             ['anime_voice_actors.csv', 'Voice actor casting information'],
-            ['anime_characters.csv', 'Character data (39,871 unique characters)'],
+            ['anime_characters.csv', f'Character data ({v["n_characters"]} unique characters)'],
         ]
     )
     
@@ -254,7 +391,7 @@ def generate_ieee_report():
         'Extremely low and extremely high scores are rare, indicating a balanced and credible rating system.'
     )
     pdf.add_figure('score_distribution.png', 
-                   'Distribution of anime scores across 9,999 titles. The distribution is centered around 6.8-7.0 with a slight positive skew.')
+                   f'Distribution of anime scores across {v["n_titles"]} titles. The distribution is centered around {v["median_score"]} with a slight positive skew.')
     
     pdf.body_text(
         'Longitudinal analysis confirms that average scores have remained stable for more than three decades, '
@@ -267,14 +404,14 @@ def generate_ieee_report():
     pdf.add_page()
     pdf.subsection_heading('B', 'Production Growth Versus Quality')
     pdf.body_text(
-        'Annual anime production increased nearly fivefold after 2005, surpassing 1,000 releases per year by 2020. '
+        f'Annual anime production increased {v["growth"]} after {v["growth_base_year"]}, peaking at {v["peak_count"]} releases in {v["peak_year"]}. '
         'Despite this growth, average user scores remained consistent, demonstrating that increased output did not lead to a decline in overall quality.'
     )
     pdf.add_figure('trends_over_time.png',
-                   'Dual-axis visualization comparing production volume (bars) and average scores (line) over time. Quality remains stable despite 5x growth.')
+                   f'Dual-axis visualization comparing production volume (bars) and average scores (line) over time. Quality remains stable despite {v["growth"]} growth.')
     
-    pdf.bullet_point('EXPLOSIVE GROWTH: 5x increase in annual production volume since 2005')
-    pdf.bullet_point('QUALITY MAINTAINED: Average scores hover around 6.5-7.0 throughout')
+    pdf.bullet_point(f'EXPLOSIVE GROWTH: {v["growth"]} increase in annual production volume since {v["growth_base_year"]}')
+    pdf.bullet_point(f'QUALITY MAINTAINED: Average scores hover around {v["yearly_score_range"]} throughout')
     pdf.bullet_point('NO RACE TO BOTTOM: Industry scaling did not sacrifice quality')
     pdf.ln(3)
     
@@ -286,7 +423,7 @@ def generate_ieee_report():
         'appear less frequently but often achieve higher average ratings.'
     )
     pdf.add_figure('top_genres.png',
-                   'Top 15 anime genres by frequency. Action leads with 3,000+ entries.')
+                   f'Top 15 anime genres by frequency. {v["top_genre"]} leads with {v["top_genre_count"]} entries.')
     
     pdf.add_figure('format_comparison.png',
                    'Comparison of average scores across different anime formats (TV, Movie, OVA, Special, etc.).')
@@ -303,12 +440,7 @@ def generate_ieee_report():
     
     pdf.add_table(
         ['Popularity Group', 'Average Score'],
-        [
-            ['<10k members', '~6.5'],
-            ['10k-100k members', '~6.8'],
-            ['100k-1M members', '~7.5'],
-            ['>1M members', '~8.0+'],
-        ]
+        v['popularity_rows']
     )
     
     # ==================== V. PEOPLE AND TALENT ANALYSIS ====================
@@ -337,6 +469,18 @@ def generate_ieee_report():
     pdf.bullet_point('Voice acting talent is a genuine quality differentiator')
     pdf.ln(3)
     
+    pdf.add_page()
+    pdf.subsection_heading('C', 'Career Trajectories')
+    pdf.body_text(
+        'Following each director and voice actor through their credits shows how scores evolve over a career: '
+        'the rolling average of their recent titles, the five-year period in which they peaked, and how '
+        'cohorts debuting in different decades fare as their careers progress.'
+    )
+    pdf.add_figure('director_careers.png',
+                   'Rolling five-title average score over the careers of the top directors; shaded bands mark each peak period.')
+    pdf.add_figure('career_cohorts.png',
+                   'Average score by years since debut, for directors and voice actors grouped by debut decade.')
+    
     # ==================== VI. ADVANCED ANALYTICS ====================
     pdf.add_page()
     pdf.section_heading('VI', 'Advanced Analytics')
@@ -361,15 +505,15 @@ def generate_ieee_report():
         'A Random Forest regression model was trained to predict anime scores using available metadata.'
     )
     pdf.add_figure('feature_importance.png',
-                   'Feature importance from Random Forest model trained to predict anime scores.')
+                   'Held-out permutation importance and mean tree-path contributions for the Random Forest score model.')
     
     pdf.add_table(
         ['Metric', 'Value'],
         [
-            ['Train R-squared Score', '0.12'],
-            ['Test R-squared Score', '0.02'],
-            ['Test MAE', '0.50'],
-            ['Test RMSE', '0.61'],
+            ['Train R-squared Score', v['train_r2']],
+            ['Test R-squared Score', v['test_r2']],
+            ['Test MAE', v['test_mae']],
+            ['Test RMSE', v['test_rmse']],
         ]
     )
     
@@ -448,10 +592,11 @@ def generate_ieee_report():
     pdf.set_text_color(128, 128, 128)
     pdf.cell(0, 6, '---', align='C', ln=True)
     pdf.cell(0, 6, 'Report generated using Python, Pandas, Seaborn, Matplotlib, and Scikit-learn', align='C', ln=True)
-    pdf.cell(0, 6, 'Total Visualizations: 15 | Analysis Date: January 2026', align='C', ln=True)
+    pdf.cell(0, 6, f'Total Visualizations: {pdf.figure_count} | Analysis Date: {v["analysis_date"]}', align='C', ln=True)
     
     # Save PDF
-    output_pdf_path = os.path.join(reports_dir, 'IEEE_Anime_Research_Report.pdf')
+    if output_pdf_path is None:
+        output_pdf_path = os.path.join(reports_dir, 'IEEE_Anime_Research_Report.pdf')
     pdf.output(output_pdf_path)
     
     print(f"\n{'=' * 60}")
@@ -464,4 +609,18 @@ def generate_ieee_report():
 
 
 if __name__ == "__main__":
-    generate_ieee_report()
+    parser = argparse.ArgumentParser(description="Generate the IEEE-style PDF report from the phase results")
+    parser.add_argument('--allow-missing', action='store_true',
+                        help="print missing results as n/a instead of failing")
+    parser.add_argument('--root', default=project_root,
+                        help="directory whose output/results and output/images are reported (default: the project)")
+    args = parser.parse_args()
+    output = os.path.join(args.root, "output")
+    os.makedirs(os.path.join(output, "reports"), exist_ok=True)
+    try:
+        generate_ieee_report(results=load_results(os.path.join(output, "results")),
+                             images_dir=os.path.join(output, "images"),
+                             output_pdf_path=os.path.join(output, "reports", "IEEE_Anime_Research_Report.pdf"),
+                             allow_missing=args.allow_missing)
+    except MissingResultsError as e:
+        raise SystemExit(str(e))
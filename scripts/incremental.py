@@ -0,0 +1,177 @@
+"""
+Delta ingestion for weekly dataset refreshes.
+Diffs a freshly cleaned drop against the previous cleaned store by primary key,
+applies the resulting inserts/updates/deletes, and reads/writes the changelog
+that downstream aggregates consume instead of rebuilding from scratch.
+
+Changelog format (one CSV per table per run): the table's own columns plus
+  op   - 'insert', 'update' or 'delete'
+  sign - +1 for a row image that enters the table, -1 for one that leaves it
+An update is written as two rows: the old image (sign -1) and the new image (sign +1),
+so any additive aggregate can be maintained by summing sign-weighted contributions.
+
+Schema changes: row images are always in the new table's columns. A column the new
+drop adds is empty in the old images (rows that fill it become updates); a column it
+drops is left out of both. Key columns must exist in both versions.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+changelog_dirname = "changelog"
+versions_filename = "versions.json"
+
+
+def row_hash(df):
+    """64-bit hash of each row's values (index excluded)"""
+    if df.shape[1] == 0:
+        return np.zeros(len(df), dtype=np.uint64)
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def occurrence(hashes):
+    """Number each repeat of the same hash 0, 1, 2, ... so duplicate rows stay distinguishable"""
+    return pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+
+
+def _keyed(df, keys, value_cols):
+    """Key columns + occurrence number + value hash, with the original row position"""
+    keyed = df[keys].copy()
+    keyed['_hash'] = row_hash(df[value_cols])
+    keyed['_row'] = np.arange(len(df))
+    # Sort duplicates of a key by content so the occurrence number doesn't depend on row order
+    keyed = keyed.sort_values(keys + ['_hash'], kind='stable')
+    keyed['_occ'] = keyed.groupby(keys, dropna=False).cumcount()
+    return keyed
+
+
+def schema_change(old, new):
+    """(added, removed) column names between two versions of a table"""
+    return ([c for c in new.columns if c not in old.columns],
+            [c for c in old.columns if c not in new.columns])
+
+
+def align_schema(old, new, keys):
+    """The old table in the new table's columns: added columns empty, removed columns dropped"""
+    missing = [k for k in keys if k not in old.columns or k not in new.columns]
+    if missing:
+        raise ValueError(f"Primary key column(s) {missing} missing from one version of the table; "
+                         f"a key change needs a full (non-incremental) clean")
+    return old.reindex(columns=new.columns)
+
+
+def diff_table(old, new, keys):
+    """Compare two versions of a table by primary key and return the changelog"""
+    cols = list(new.columns)
+    old = align_schema(old, new, keys)
+    value_cols = [c for c in cols if c not in keys]
+
+    merged = _keyed(old, keys, value_cols).merge(
+        _keyed(new, keys, value_cols),
+        on=keys + ['_occ'], how='outer', suffixes=('_old', '_new'), indicator=True
+    )
+    both = merged['_merge'] == 'both'
+    changed = both & (merged['_hash_old'] != merged['_hash_new'])
+
+    def rows(frame, positions, op, sign):
+        out = frame.iloc[positions.astype(np.int64)].copy()
+        out['op'] = op
+        out['sign'] = sign
+        return out
+
+    changes = pd.concat([
+        rows(new, merged.loc[merged['_merge'] == 'right_only', '_row_new'], 'insert', 1),
+        rows(old, merged.loc[changed, '_row_old'], 'update', -1),
+        rows(new, merged.loc[changed, '_row_new'], 'update', 1),
+        rows(old, merged.loc[merged['_merge'] == 'left_only', '_row_old'], 'delete', -1),
+    ], ignore_index=True)
+    return changes
+
+
+def summarize_changes(changes):
+    """Count inserted, updated and deleted rows in a changelog"""
+    return {
+        'inserts': int((changes['op'] == 'insert').sum()),
+        'updates': int(((changes['op'] == 'update') & (changes['sign'] > 0)).sum()),
+        'deletes': int((changes['op'] == 'delete').sum()),
+    }
+
+
+def apply_changes(store, changes):
+    """Apply a changelog to a stored table: remove the retracted row images, append the new ones.
+    The result has the changelog's columns (the new schema when the table's columns changed)."""
+    cols = [c for c in changes.columns if c not in ('op', 'sign')]
+    store = store.reindex(columns=cols)
+    retracted = changes.loc[changes['sign'] < 0, cols]
+    asserted = changes.loc[changes['sign'] > 0, cols]
+
+    # Multiset difference: match each retracted image to one stored copy by (hash, occurrence)
+    # Hashed together so both sides share dtypes (an added column is all-NaN in the store)
+    hashes = row_hash(pd.concat([store, retracted], ignore_index=True))
+    store_hash, retract_hash = hashes[:len(store)], hashes[len(store):]
+    store_id = pd.MultiIndex.from_arrays([store_hash, occurrence(store_hash)])
+    retract_id = pd.MultiIndex.from_arrays([retract_hash, occurrence(retract_hash)])
+    keep = ~store_id.isin(retract_id)
+
+    return pd.concat([store[keep], asserted], ignore_index=True)
+
+
+def new_run_dir(output_dir):
+    """Create a new timestamped changelog directory for this ingest run (never reusing one)"""
+    run_id = datetime.now().strftime("%Y%m%dT%H%M%S.%f")
+    root = os.path.join(output_dir, changelog_dirname)
+    os.makedirs(root, exist_ok=True)
+    for attempt in range(100):
+        # Run ids sort in creation order; a counter separates runs started in the same microsecond
+        run_dir = os.path.join(root, run_id if attempt == 0 else f"{run_id}-{attempt:02d}")
+        try:
+            os.makedirs(run_dir, exist_ok=False)
+            return run_dir
+        except FileExistsError:
+            continue
+    raise RuntimeError(f"Could not create a new changelog directory under {root}")
+
+
+def write_changelog(run_dir, changesets, versions=None):
+    """Save one changelog CSV per changed table plus a summary.csv for the run, and the
+    store versions (manifest hashes) the run produced"""
+    if versions is not None:
+        with open(os.path.join(run_dir, versions_filename), "w") as f:
+            json.dump(versions, f, indent=2, sort_keys=True)
+    summary = []
+    for name, changes in changesets.items():
+        if len(changes):
+            changes.to_csv(os.path.join(run_dir, f"{name}.csv"), index=False)
+        summary.append({'table': name, **summarize_changes(changes)})
+    pd.DataFrame(summary).to_csv(os.path.join(run_dir, "summary.csv"), index=False)
+
+
+def list_runs(output_dir):
+    """Changelog run directories, oldest first"""
+    root = os.path.join(output_dir, changelog_dirname)
+    if not os.path.isdir(root):
+        return []
+    return [os.path.join(root, d) for d in sorted(os.listdir(root))
+            if os.path.isdir(os.path.join(root, d))]
+
+
+def read_run_versions(run_dir):
+    """Store versions recorded by a run, or None for runs written before they were recorded"""
+    path = os.path.join(run_dir, versions_filename)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_changelog(run_dir):
+    """Load the changed tables of one run as {table_name: changes}"""
+    changesets = {}
+    for file in sorted(os.listdir(run_dir)):
+        if file.endswith(".csv") and file != "summary.csv":
+            changesets[file[:-4]] = pd.read_csv(os.path.join(run_dir, file))
+    return changesets
@@ -0,0 +1,352 @@
+"""
+Asynchronous ingestion from a MyAnimeList/Jikan-compatible HTTP API into data/raw.
+Fetches the top-anime listing, then every title's characters (with voice actors) and
+staff, through one pooled aiohttp session with bounded concurrency, a token-bucket
+rate limit, retries with backoff and an on-disk response cache (ETag revalidation once
+an entry is older than the TTL). Output follows the data/raw CSV schemas; MAL ids of
+characters, people and companies map to stable entity_ids via entity_registry.csv.
+Entities not yet in the registry keep the id they already have in data/raw when their
+(kind, name) matches, so the first ingest over an existing snapshot does not renumber
+every company, person and character (which would read downstream as a full delete+insert).
+
+Usage:
+    python scripts/ingest.py --pages 400
+    python scripts/ingest.py --base-url http://localhost:8080/v4 --pages 2   # local stub API
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from urllib.parse import urlencode
+
+import aiohttp
+import pandas as pd
+
+from schema import RAW_COLUMNS
+
+# Settings
+BASE_URL = "https://api.jikan.moe/v4"
+output_dir = "data/raw"
+cache_dir = "data/cache/http"
+MAX_CONCURRENCY = 8
+RATE_PER_SECOND = 3.0
+RATE_BURST = 3
+MAX_RETRIES = 5
+CACHE_TTL_HOURS = 24 * 7
+REQUEST_TIMEOUT = 30
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = "Anime-Data_analysis ingest"
+
+# Raw relationship columns holding entity ids, by entity kind
+ENTITY_KINDS = {
+    'company': [('anime_companies', 'company_id')],
+    'character': [('anime_characters', 'character_id')],
+    'person': [('anime_staff', 'person_id'), ('anime_voice_actors', 'person_id')],
+}
+
+GENRE_FIELDS = ['genres', 'explicit_genres', 'themes', 'demographics']
+COMPANY_FIELDS = [('studios', 'Studio'), ('producers', 'Producer'), ('licensors', 'Licensor')]
+
+
+class TokenBucket:
+    """At most `rate` requests per second on average, with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def cache_path(url):
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, digest[:2], f"{digest}.json")
+
+
+def read_cache(url):
+    path = cache_path(url)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_cache(url, etag, body):
+    path = cache_path(url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({'url': url, 'etag': etag, 'fetched_at': time.time(), 'body': body}, f)
+    os.replace(tmp_path, path)
+
+
+class ApiClient:
+    """Cached, rate-limited GETs over a shared session; failed URLs are collected, not raised"""
+
+    def __init__(self, session, base_url, concurrency, rate, ttl_hours):
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, max(RATE_BURST, 1))
+        self.ttl = ttl_hours * 3600
+        self.stats = {'requests': 0, 'cache_hits': 0, 'not_modified': 0, 'retries': 0}
+        self.failed = []
+
+    async def get(self, path, params=None):
+        """Decoded JSON body for base_url/path, or None when missing (404) or failed"""
+        url = f"{self.base_url}/{path}" + (f"?{urlencode(params)}" if params else "")
+        cached = read_cache(url)
+        if cached is not None and time.time() - cached['fetched_at'] < self.ttl:
+            self.stats['cache_hits'] += 1
+            return cached['body']
+        headers = {'If-None-Match': cached['etag']} if cached is not None and cached['etag'] else {}
+
+        async with self.semaphore:
+            for attempt in range(MAX_RETRIES + 1):
+                await self.bucket.acquire()
+                self.stats['requests'] += 1
+                retry_after = None
+                try:
+                    async with self.session.get(url, headers=headers) as response:
+                        if response.status == 304 and cached is not None:
+                            self.stats['not_modified'] += 1
+                            write_cache(url, cached['etag'], cached['body'])
+                            return cached['body']
+                        if response.status == 200:
+                            body = await response.json()
+                            write_cache(url, response.headers.get('ETag'), body)
+                            return body
+                        if response.status == 404:
+                            return None
+                        if response.status not in RETRY_STATUSES:
+                            break
+                        retry_after = response.headers.get('Retry-After')
+                except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+                    pass
+                if attempt == MAX_RETRIES:
+                    break
+                self.stats['retries'] += 1
+                if retry_after is not None and retry_after.isdigit():
+                    delay = float(retry_after)
+                else:
+                    delay = min(60, 2 ** attempt) * (0.5 + random.random())
+                await asyncio.sleep(delay)
+
+        self.failed.append(url)
+        return None
+
+
+def existing_entities(directory=None):
+    """{(kind, name): [entity_id, ...]} for the entities already in the data/raw tables"""
+    directory = directory or output_dir
+    path = os.path.join(directory, "entities.csv")
+    if not os.path.exists(path):
+        return {}
+    names = pd.read_csv(path, keep_default_na=False).set_index('entity_id')['name']
+    existing = {}
+    for kind, sources in ENTITY_KINDS.items():
+        ids = set()
+        for table, column in sources:
+            table_path = os.path.join(directory, f"{table}.csv")
+            if os.path.exists(table_path):
+                ids.update(pd.read_csv(table_path, usecols=[column])[column].dropna().astype(int))
+        for entity_id in sorted(ids):
+            if entity_id in names.index:
+                existing.setdefault((kind, names[entity_id]), []).append(entity_id)
+    return existing
+
+
+class EntityRegistry:
+    """Stable entity_id per (kind, MAL id); characters, people and companies share one id space"""
+
+    def __init__(self, path, existing=None):
+        self.path = path
+        self.ids = {}
+        self.names = {}
+        self.used = set()
+        if os.path.exists(path):
+            registry = pd.read_csv(path, keep_default_na=False)
+            for kind, mal_id, entity_id, name in registry[['kind', 'mal_id', 'entity_id', 'name']].itertuples(index=False):
+                self.ids[(kind, int(mal_id))] = int(entity_id)
+                self.names[int(entity_id)] = name
+        # Unregistered ids of the raw snapshot, claimed by (kind, name); namesakes in id order
+        registered = set(self.ids.values())
+        self.existing = {key: [i for i in ids if i not in registered] for key, ids in (existing or {}).items()}
+        known = [i for ids in self.existing.values() for i in ids]
+        self.next_id = max([*self.ids.values(), *known], default=0) + 1
+
+    def id(self, kind, mal_id, name):
+        key = (kind, int(mal_id))
+        if key not in self.ids:
+            unclaimed = self.existing.get((kind, name))
+            if unclaimed:
+                self.ids[key] = unclaimed.pop(0)
+            else:
+                self.ids[key] = self.next_id
+                self.next_id += 1
+        entity_id = self.ids[key]
+        self.names[entity_id] = name
+        self.used.add(entity_id)
+        return entity_id
+
+    def entities(self):
+        """entities.csv rows for every entity referenced in this ingest"""
+        rows = [(entity_id, self.names[entity_id]) for entity_id in sorted(self.used)]
+        return pd.DataFrame(rows, columns=RAW_COLUMNS['entities'])
+
+    def save(self):
+        rows = [(kind, mal_id, entity_id, self.names.get(entity_id, ""))
+                for (kind, mal_id), entity_id in sorted(self.ids.items(), key=lambda item: item[1])]
+        pd.DataFrame(rows, columns=['kind', 'mal_id', 'entity_id', 'name']).to_csv(self.path, index=False)
+
+
+async def fetch_top_anime(client, pages):
+    """Anime records from the first `pages` pages of the top listing, de-duplicated by MAL id"""
+    first = await client.get("top/anime", {'page': 1})
+    if first is None:
+        return []
+    last_page = min(pages, first['pagination']['last_visible_page'])
+    rest = await asyncio.gather(*(client.get("top/anime", {'page': page}) for page in range(2, last_page + 1)))
+
+    records, seen = [], set()
+    for page in [first, *rest]:
+        for record in (page or {}).get('data', []):
+            if record['mal_id'] not in seen:
+                seen.add(record['mal_id'])
+                records.append(record)
+    return records
+
+
+async def fetch_credits(client, mal_id):
+    characters, staff = await asyncio.gather(
+        client.get(f"anime/{mal_id}/characters"),
+        client.get(f"anime/{mal_id}/staff"),
+    )
+    return mal_id, (characters or {}).get('data', []), (staff or {}).get('data', [])
+
+
+async def crawl(base_url, pages, concurrency, rate, ttl_hours, limit=None):
+    """Fetch the listing and every title's credits; returns (records, {mal_id: credits}, client)"""
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     headers={'User-Agent': USER_AGENT}) as session:
+        client = ApiClient(session, base_url, concurrency, rate, ttl_hours)
+        records = await fetch_top_anime(client, pages)
+        if limit:
+            records = records[:limit]
+        print(f"  {len(records):,} anime listed; fetching characters and staff...")
+
+        credits = {}
+        tasks = [fetch_credits(client, record['mal_id']) for record in records]
+        for done, future in enumerate(asyncio.as_completed(tasks), 1):
+            mal_id, characters, staff = await future
+            credits[mal_id] = (characters, staff)
+            if done % 250 == 0 or done == len(tasks):
+                print(f"  {done:,}/{len(tasks):,} titles")
+    return records, credits, client
+
+
+def date_part(timestamp):
+    """ISO date from an ISO-8601 timestamp ('2009-04-05T00:00:00+00:00' -> '2009-04-05')"""
+    return timestamp[:10] if timestamp else None
+
+
+def build_tables(records, credits, registry):
+    """Rows for every data/raw table from the API records"""
+    rows = {name: [] for name in RAW_COLUMNS if name != 'entities'}
+    for record in records:
+        anime_id = record['mal_id']
+        aired = record.get('aired') or {}
+        rows['anime'].append((anime_id, record.get('title'), record.get('score'), record.get('members'),
+                              record.get('episodes'), record.get('type'), date_part(aired.get('from')),
+                              record.get('synopsis'), date_part(aired.get('to'))))
+        for field in GENRE_FIELDS:
+            for genre in record.get(field) or []:
+                rows['anime_genres'].append((anime_id, genre['name']))
+        for field, role in COMPANY_FIELDS:
+            for company in record.get(field) or []:
+                company_id = registry.id('company', company['mal_id'], company['name'])
+                rows['anime_companies'].append((anime_id, company_id, role))
+
+        characters, staff = credits.get(anime_id, ([], []))
+        for entry in characters:
+            character = entry['character']
+            character_id = registry.id('character', character['mal_id'], character['name'])
+            rows['anime_characters'].append((anime_id, character_id, entry.get('role')))
+            for voice in entry.get('voice_actors') or []:
+                person_id = registry.id('person', voice['person']['mal_id'], voice['person']['name'])
+                rows['anime_voice_actors'].append((character_id, person_id, voice.get('language')))
+        for entry in staff:
+            person_id = registry.id('person', entry['person']['mal_id'], entry['person']['name'])
+            rows['anime_staff'].append((anime_id, person_id, ", ".join(entry.get('positions') or [])))
+
+    tables = {name: pd.DataFrame(table_rows, columns=RAW_COLUMNS[name]) for name, table_rows in rows.items()}
+    # A character appears under every anime it is in; its voice actors are one set of rows
+    tables['anime_voice_actors'] = tables['anime_voice_actors'].drop_duplicates()
+    tables['entities'] = registry.entities()
+    return tables
+
+
+def write_tables(tables):
+    """Replace each data/raw CSV atomically"""
+    os.makedirs(output_dir, exist_ok=True)
+    for name, df in tables.items():
+        path = os.path.join(output_dir, f"{name}.csv")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        print(f"  Saved {path} ({len(df):,} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch MyAnimeList data into data/raw")
+    parser.add_argument('--base-url', default=BASE_URL, help="Jikan-compatible API root")
+    parser.add_argument('--pages', type=int, default=400, help="top-anime pages to fetch (25 titles each)")
+    parser.add_argument('--limit', type=int, help="only ingest the first N listed titles")
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENCY, help="requests in flight")
+    parser.add_argument('--rate', type=float, default=RATE_PER_SECOND, help="requests per second")
+    parser.add_argument('--ttl-hours', type=float, default=CACHE_TTL_HOURS,
+                        help="serve cached responses younger than this without revalidating")
+    args = parser.parse_args()
+
+    print(f"Ingesting from {args.base_url} ...")
+    start = time.time()
+    records, credits, client = asyncio.run(
+        crawl(args.base_url, args.pages, args.concurrency, args.rate, args.ttl_hours, args.limit))
+    stats = client.stats
+    print(f"  {stats['requests']:,} requests, {stats['cache_hits']:,} cache hits, "
+          f"{stats['not_modified']:,} not modified, {stats['retries']:,} retries "
+          f"in {time.time() - start:.1f}s")
+
+    # A partial snapshot would look like mass deletions downstream; successful responses
+    # are cached, so a re-run only refetches what failed
+    if client.failed:
+        for url in client.failed[:10]:
+            print(f"  FAILED {url}")
+        raise SystemExit(f"{len(client.failed)} request(s) failed; data/raw left unchanged. Re-run to resume.")
+
+    registry = EntityRegistry(os.path.join(output_dir, "entity_registry.csv"), existing_entities())
+    write_tables(build_tables(records, credits, registry))
+    registry.save()
+    print("\nIngestion complete!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Lazy execution backend (Polars) for the heavier phase aggregations.
+Each computation is a LazyFrame query plan over Parquet scans of the cleaned tables,
+so Polars pushes column projections and filters into the scan, runs joins and group-bys
+multithreaded and collects with the streaming engine instead of materializing every
+intermediate frame. The results have the same shape as the pandas path in the phase
+scripts, which stays the default; select this one with `--engine polars`.
+
+Parquet copies are written once per stored table version to data/parquet/.
+Preloaded pandas tables (e.g. a slice, or the preview sample) are wrapped as LazyFrames instead.
+Scans apply the canonical entity map (see tables.py) as a join in the query plan.
+"""
+
+import os
+
+import polars as pl
+
+from store import load_manifest, resolve
+from tables import ENTITY_COLUMNS, entity_map, input_dir, sample_tables
+
+# Settings
+parquet_dir = "data/parquet"
+
+
+def parquet_path(name):
+    """Parquet copy of a cleaned table, converted (streaming) on first use of each version"""
+    entry = load_manifest(input_dir).get(name)
+    source = resolve(name, input_dir)
+    version = entry['hash'][:16] if entry else str(int(os.path.getmtime(source)))
+    path = os.path.join(parquet_dir, f"{name}-{version}.parquet")
+    if not os.path.exists(path):
+        os.makedirs(parquet_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pl.scan_csv(source, infer_schema_length=None).sink_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+def scan(name, tables=None):
+    """LazyFrame over a preloaded pandas table if given, else over its Parquet copy"""
+    if tables is None:
+        tables = sample_tables()
+    if tables is not None and name in tables:
+        return pl.from_pandas(tables[name]).lazy()
+    return canonical(name, pl.scan_parquet(parquet_path(name)))
+
+
+def canonical(name, frame):
+    """Scan with merged entities mapped to their canonical ids and names, as in tables.read_table"""
+    mapping = entity_map()
+    if mapping is None:
+        return frame
+    mapping = pl.from_pandas(mapping).lazy()
+    if name in ENTITY_COLUMNS:
+        column = ENTITY_COLUMNS[name]
+        ids = mapping.select(pl.col("entity_id").alias(column), "canonical_id")
+        columns = frame.collect_schema().names()
+        # As in tables.canonicalize: only rows the merge made identical are collapsed
+        remapped = pl.col("canonical_id").is_not_null() & (pl.col("canonical_id") != pl.col(column))
+        return (frame.join(ids, on=column, how="left", maintain_order="left")
+                .with_columns(pl.when(remapped).then(pl.col(column)).otherwise(-1).alias("_source"),
+                              pl.coalesce("canonical_id", column).alias(column))
+                .filter(pl.col("_source") == pl.col("_source").min().over(columns))
+                .drop("canonical_id", "_source"))
+    if name == "entities":
+        names = mapping.select("entity_id", "canonical_name")
+        return (frame.join(names, on="entity_id", how="left", maintain_order="left")
+                .with_columns(pl.coalesce("canonical_name", "name").alias("name"))
+                .drop("canonical_name"))
+    return frame
+
+
+def start_year():
+    """Release year expression; start_date is text when wrapped from pandas, a date when scanned"""
+    return pl.col("start_date").cast(pl.String).str.slice(0, 10).str.to_date(strict=False).dt.year()
+
+
+def collect(plan):
+    return plan.collect(engine="streaming").to_pandas()
+
+
+def voice_actor_stats(tables=None):
+    """Japanese VA credits joined to anime scores: per-VA stats and (person_id, score, m) multiplicities.
+    Matches plot_top_voice_actors: count = distinct anime, mean over every credit row."""
+    credits = (
+        scan("anime_voice_actors", tables)
+        .filter(pl.col("language") == "Japanese")
+        .join(scan("anime_characters", tables).select("character_id", "anime_id"), on="character_id")
+        .join(scan("anime", tables).select("anime_id", "score"), on="anime_id")
+        .join(scan("entities", tables).select(pl.col("entity_id").alias("person_id"), "name"), on="person_id")
+    )
+    stats = credits.group_by("person_id").agg(
+        pl.col("name").first(),
+        pl.col("anime_id").n_unique().alias("count"),
+        pl.col("score").mean().alias("mean_score"),
+    )
+    # Same row order as the pandas groupby, so the bootstrap draws match
+    score_counts = (credits.drop_nulls("score").group_by("person_id", "score").agg(pl.len().alias("m"))
+                    .sort("person_id", "score"))
+    stats, score_counts = pl.collect_all([stats, score_counts], engine="streaming")
+    return stats.to_pandas(), score_counts.to_pandas()
+
+
+def studio_genre_counts(tables=None, n_studios=10, n_genres=10):
+    """(company_id, name, genre, count) for the most prolific studios x most common genres.
+    As in the pandas path, credits count only for titles in the anime table, studios are
+    ranked by id (ties by the id as text, like crosstab.top_labels) and named for display."""
+    anime_ids = scan("anime", tables).select("anime_id")
+    entities = scan("entities", tables).select(pl.col("entity_id").alias("company_id"), "name")
+    studios = (
+        scan("anime_companies", tables)
+        .filter(pl.col("role") == "Studio")
+        .join(anime_ids, on="anime_id")
+        .join(entities.select("company_id"), on="company_id", how="semi")
+        .select("anime_id", "company_id")
+    )
+    genres = scan("anime_genres", tables).join(anime_ids, on="anime_id")
+    top_studios = (studios.group_by("company_id").len()
+                   .sort([pl.col("len"), pl.col("company_id").cast(pl.String)], descending=[True, False])
+                   .head(n_studios))
+    top_genres = genres.group_by("genre").len().sort(["len", "genre"], descending=[True, False]).head(n_genres)
+
+    plan = (
+        studios.join(top_studios.select("company_id"), on="company_id")
+        .join(genres.join(top_genres.select("genre"), on="genre"), on="anime_id")
+        .group_by("company_id", "genre")
+        .agg(pl.len().alias("count"))
+        .join(entities.unique("company_id", keep="first", maintain_order=True), on="company_id")
+        .select("company_id", "name", "genre", "count")
+        .sort("name", "company_id", "genre")
+    )
+    return collect(plan)
+
+
+def genre_decade_counts(tables=None, decades=(1980, 2020), n_genres=5):
+    """(decade, genre, count) for the most common genres, plus those genres in rank order"""
+    genres = scan("anime_genres", tables)
+    top_genres = collect(genres.group_by("genre").len().sort(["len", "genre"], descending=[True, False])
+                         .head(n_genres))['genre'].tolist()
+
+    plan = (
+        scan("anime", tables)
+        .select("anime_id", (start_year() // 10 * 10).alias("decade"))
+        .filter(pl.col("decade").is_between(decades[0], decades[1]))
+        .join(genres.filter(pl.col("genre").is_in(top_genres)), on="anime_id")
+        .group_by("decade", "genre")
+        .agg(pl.len().alias("count"))
+        .sort("decade", "genre")
+    )
+    return collect(plan), top_genres
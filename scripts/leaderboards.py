@@ -0,0 +1,181 @@
+"""
+Time-windowed leaderboards.
+For studios, directors and voice actors, keeps per-entity prefix sums over release
+years of the same statistics as aggregates.py (row count, scored count, score sum,
+sum of squares). Any [y0, y1] window is then the difference of two prefix columns,
+so a windowed ranking costs O(entities) and never touches the relationship rows.
+Entities are keyed by canonical id (the entity map of entity_resolution.py is applied
+to the relationship tables before the prefix sums are built).
+
+Usage:
+    python scripts/leaderboards.py studio 2010 2015
+    python scripts/leaderboards.py director 1990 1999 --min-count 3
+    python scripts/leaderboards.py voice_actor --animate --window 5      # rolling-window GIF
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation, PillowWriter
+
+from aggregates import AGGREGATES, load_tables, leaderboard, source_versions
+from tables import ENTITY_COLUMNS, canonicalize, entity_map, entity_map_hash, read_table
+
+# Settings
+output_dir = "data/aggregates"
+images_dir = "output/images"
+LEADERBOARDS = ["studio", "director", "voice_actor"]
+STATS = ['n', 'n_scored', 'score_sum', 'score_sq_sum']
+
+
+def source_signature():
+    """Content hash (or mtime for plain CSVs) of every source table and of the entity map,
+    to detect stale prefix sums"""
+    signature = source_versions()
+    signature['entity_map'] = entity_map_hash()
+    return signature
+
+
+def build_prefix(facts, key, years):
+    """Entity keys, first year and (stat, entity, year + 1) prefix-sum array from signed fact rows"""
+    facts = facts.assign(year=facts['anime_id'].map(years)).dropna(subset=['year'])
+    codes, keys = pd.factorize(facts[key])
+    year_index = facts['year'].to_numpy(dtype=np.int64)
+    first_year = year_index.min()
+    n_years = year_index.max() - first_year + 1
+    cells = codes * n_years + (year_index - first_year)
+
+    sign = facts['sign'].to_numpy(dtype=np.float64)
+    score = facts['score'].to_numpy(dtype=np.float64)
+    scored = ~np.isnan(score)
+    score = np.where(scored, score, 0.0)
+    weights = [sign, sign * scored, sign * score, sign * score ** 2]
+
+    prefix = np.zeros((len(STATS), len(keys), n_years + 1))
+    for i, w in enumerate(weights):
+        per_year = np.bincount(cells, weights=w, minlength=len(keys) * n_years).reshape(len(keys), n_years)
+        prefix[i, :, 1:] = np.cumsum(per_year, axis=1)
+    return np.asarray(keys), int(first_year), prefix
+
+
+def build_all():
+    """Prefix sums for every leaderboard, saved next to the aggregate tables"""
+    tables = load_tables()
+    mapping = entity_map()
+    if mapping is not None:
+        for name in ENTITY_COLUMNS:
+            tables[name] = canonicalize(name, tables[name], mapping)
+    anime = tables['anime']
+    years = pd.Series(pd.to_datetime(anime['start_date'], errors='coerce').dt.year.to_numpy(), index=anime['anime_id'])
+    years = years[~years.index.duplicated()]
+
+    os.makedirs(output_dir, exist_ok=True)
+    for name in LEADERBOARDS:
+        key, sources, build = AGGREGATES[name]
+        keys, first_year, prefix = build_prefix(build(*[tables[t] for t in sources]), key, years)
+        np.savez(os.path.join(output_dir, f"{name}_prefix.npz"), keys=keys, first_year=first_year, prefix=prefix)
+        print(f"  {name}: {prefix.shape[1]:,} entities x {prefix.shape[2] - 1} years")
+    with open(os.path.join(output_dir, "prefix_sources.json"), "w") as f:
+        json.dump(source_signature(), f)
+
+
+def load_prefix(name, rebuild=False):
+    """(keys, first_year, prefix) for a leaderboard, rebuilding all of them if the sources changed"""
+    meta_path = os.path.join(output_dir, "prefix_sources.json")
+    stale = rebuild or not os.path.exists(meta_path)
+    if not stale:
+        with open(meta_path) as f:
+            stale = json.load(f) != source_signature()
+    if stale:
+        print("Building per-year prefix sums...")
+        build_all()
+    data = np.load(os.path.join(output_dir, f"{name}_prefix.npz"), allow_pickle=True)
+    return data['keys'], int(data['first_year']), data['prefix']
+
+
+def window_stats(keys, first_year, prefix, y0, y1):
+    """Per-entity statistics for releases in [y0, y1], in O(entities)"""
+    n_years = prefix.shape[2] - 1
+    lo = int(np.clip(y0 - first_year, 0, n_years))
+    hi = int(np.clip(y1 - first_year + 1, 0, n_years))
+    window = prefix[:, :, max(hi, lo)] - prefix[:, :, lo]
+    table = pd.DataFrame(window.T, index=keys, columns=STATS)
+    table[['n', 'n_scored']] = table[['n', 'n_scored']].round().astype(np.int64)
+    return table[table['n'] > 0]
+
+
+def top_in_window(name, y0, y1, min_count=5, top=15, entities=None, prefix_data=None):
+    """Top entities by mean score among those with at least min_count credits in [y0, y1]"""
+    keys, first_year, prefix = prefix_data or load_prefix(name)
+    return leaderboard(window_stats(keys, first_year, prefix, y0, y1), entities, min_count, top)
+
+
+def animate_rolling(name, width=5, step=1, min_count=5, top=10, entities=None, years=None):
+    """GIF of the top entities over a rolling window of `width` years"""
+    keys, first_year, prefix = prefix_data = load_prefix(name)
+    last_year = first_year + prefix.shape[2] - 2
+    start, stop = years or (first_year, last_year)
+    windows = [(y, y + width - 1) for y in range(start, stop - width + 2, step)]
+
+    fig, ax = plt.subplots(figsize=(12, 7))
+
+    def draw(i):
+        y0, y1 = windows[i]
+        board = top_in_window(name, y0, y1, min_count, top, entities, prefix_data)
+        labels = board['name'] if 'name' in board else board.index.astype(str)
+        ax.clear()
+        ax.barh(range(len(board)), board['mean_score'], color='#4ECDC4')
+        ax.set_yticks(range(len(board)), labels)
+        ax.invert_yaxis()
+        ax.set_xlim(5, 10)
+        ax.set_xlabel('Average Score')
+        ax.set_title(f"Top {top} {name.replace('_', ' ')}s, {y0}-{y1} (>={min_count} credits)")
+        fig.tight_layout()
+
+    animation = FuncAnimation(fig, draw, frames=len(windows))
+    os.makedirs(images_dir, exist_ok=True)
+    path = os.path.join(images_dir, f"rolling_{name}_leaderboard.gif")
+    animation.save(path, writer=PillowWriter(fps=2))
+    plt.close(fig)
+    print(f"Generated {path} ({len(windows)} windows)")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leaderboards for a range of release years")
+    parser.add_argument('board', choices=LEADERBOARDS)
+    parser.add_argument('start_year', type=int, nargs='?')
+    parser.add_argument('end_year', type=int, nargs='?')
+    parser.add_argument('--min-count', type=int, default=5, help="credits required inside the window")
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--rebuild', action='store_true', help="rebuild the prefix sums")
+    parser.add_argument('--animate', action='store_true', help="render a rolling-window GIF")
+    parser.add_argument('--window', type=int, default=5, help="rolling window width in years")
+    args = parser.parse_intermixed_args()
+
+    if args.rebuild:
+        load_prefix(args.board, rebuild=True)
+    entities = read_table("entities")
+
+    if args.animate:
+        years = (args.start_year, args.end_year) if args.end_year is not None else None
+        animate_rolling(args.board, args.window, min_count=args.min_count, top=min(args.top, 10),
+                        entities=entities, years=years)
+        return
+
+    # No years: all time; one year: just that year
+    start_year = args.start_year if args.start_year is not None else 1900
+    end_year = args.end_year if args.end_year is not None else (args.start_year or 2100)
+    board = top_in_window(args.board, start_year, end_year, args.min_count, args.top, entities)
+    print(f"\nTop {args.board.replace('_', ' ')}s, {start_year}-{end_year}:")
+    print(board[['name', 'n', 'mean_score', 'std_score']].to_string())
+
+
+if __name__ == "__main__":
+    main()
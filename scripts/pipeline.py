@@ -0,0 +1,238 @@
+"""
+Checkpointed, resumable pipeline runner.
+Runs every stage, from cleaning to the PDF report, as its own process. A stage that
+succeeds writes a completion marker data/checkpoints/<stage>.json recording:
+    kind         checkpoint type: tables, aggregates, entities, index, figures, model, export or report
+    fingerprint  hash of the stage's command, the source of its script and of the local
+                 modules it imports, the outputs of the stages it depends on and, for
+                 cleaning, the raw files' sizes and modification times
+    outputs      content hash of every output file the stage declares (for figure stages,
+                 the results file and the PNG files named in the phase script)
+With --resume a stage is skipped while its fingerprint is unchanged and its outputs are
+intact, so after a late failure the run restarts at the failed stage, and stages whose
+inputs did not change (e.g. re-cleaning produced the same tables) are not redone.
+
+Usage:
+    python scripts/pipeline.py                    # run every stage
+    python scripts/pipeline.py --resume           # skip completed, unchanged stages
+    python scripts/pipeline.py --resume --force model report
+    python scripts/pipeline.py --status
+"""
+
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from store import content_hash, load_manifest, resolve
+
+# Settings
+scripts_dir = os.path.dirname(os.path.abspath(__file__))
+checkpoint_dir = "data/checkpoints"
+raw_dir = "data/raw"
+cleaned_dir = "data/cleaned"
+images_dir = "output/images"
+
+# Figure stages are named after the results file their phase saves
+FIGURE_PHASES = {
+    'analysis': '03_analyze',
+    'seasonal': '04_seasonal',
+    'characters': '05_characters',
+    'networks': '06_networks',
+    'temporal': '07_temporal',
+    'comparative': '09_comparative',
+    'careers': '10_careers',
+}
+
+
+def declared_images(script):
+    """The images a phase script saves: every string in its source that is a bare PNG file name"""
+    with open(os.path.join(scripts_dir, script)) as f:
+        tree = ast.parse(f.read())
+    names = {node.value for node in ast.walk(tree)
+             if isinstance(node, ast.Constant) and isinstance(node.value, str)
+             and re.fullmatch(r"[\w-]+\.png", node.value)}
+    return [os.path.join(images_dir, name) for name in sorted(names)]
+
+
+# name -> kind, command (script and arguments), stages it reads from, output files; in run order
+STAGES = {
+    'clean': {'kind': 'tables', 'command': ['02_clean.py'], 'after': [],
+              'outputs': [os.path.join(cleaned_dir, "manifest.json")]},
+    'aggregates': {'kind': 'aggregates', 'command': ['aggregates.py', '--rebuild'], 'after': ['clean'],
+                   'outputs': [*(f"data/aggregates/{name}_stats.csv"
+                                 for name in ['studio', 'director', 'voice_actor', 'year']),
+                               "data/aggregates/sources.json"]},
+    'entities': {'kind': 'entities', 'command': ['entity_resolution.py'], 'after': ['clean'],
+                 'outputs': ["data/entities/canonical_ids.csv"]},
+    'index': {'kind': 'index', 'command': ['similarity.py', '--build'], 'after': ['clean', 'entities'],
+              'outputs': ["data/index/similarity_vectors.npz", "data/index/similarity_anime_ids.npy"]},
+    **{stage: {'kind': 'figures', 'command': [f"{script}.py"], 'after': ['clean', 'entities'],
+               'outputs': [*declared_images(f"{script}.py"), f"output/results/{stage}.json"]}
+       for stage, script in FIGURE_PHASES.items()},
+    'model': {'kind': 'model', 'command': ['08_ml_model.py'], 'after': ['clean', 'entities'],
+              'outputs': ["data/models/score_model.joblib", "data/models/score_model.json", "data/models/predictions.csv",
+                          *declared_images("08_ml_model.py"), "output/results/ml_model.json"]},
+    'export': {'kind': 'export', 'command': ['export_sqlite.py'],
+               'after': ['aggregates', 'entities', *FIGURE_PHASES, 'model'],
+               'outputs': ["data/export/anime_results.sqlite"]},
+    # --root . makes the report read and write under the working directory, like every other stage
+    'report': {'kind': 'report', 'command': ['generate_ieee_pdf.py', '--root', '.'], 'after': [*FIGURE_PHASES, 'model'],
+               'outputs': ["output/reports/IEEE_Anime_Research_Report.pdf"]},
+}
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return content_hash(f.read())
+
+
+def local_sources(script):
+    """The script and every scripts/ module it imports, transitively"""
+    seen, pending = set(), [script]
+    while pending:
+        name = pending.pop()
+        path = os.path.join(scripts_dir, name)
+        if name in seen or not os.path.exists(path):
+            continue
+        seen.add(name)
+        with open(path) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending += [f"{alias.name}.py" for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(f"{node.module}.py")
+            elif (isinstance(node, ast.Call) and getattr(node.func, 'attr', None) == 'import_module'
+                  and node.args and isinstance(node.args[0], ast.Constant)):
+                pending.append(f"{node.args[0].value}.py")
+    return sorted(seen)
+
+
+def raw_signature():
+    """Sizes and modification times of the raw input files"""
+    if not os.path.isdir(raw_dir):
+        return {}
+    return {name: [os.path.getsize(os.path.join(raw_dir, name)), os.path.getmtime(os.path.join(raw_dir, name))]
+            for name in sorted(os.listdir(raw_dir))}
+
+
+def marker_path(stage):
+    return os.path.join(checkpoint_dir, f"{stage}.json")
+
+
+def read_marker(stage):
+    path = marker_path(stage)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def fingerprint(stage):
+    """Hash of everything the stage's result depends on (None if an upstream stage is incomplete)"""
+    spec = STAGES[stage]
+    upstream = {}
+    for dependency in spec['after']:
+        marker = read_marker(dependency)
+        if marker is None:
+            return None
+        upstream[dependency] = marker['outputs']
+    inputs = {
+        'command': spec['command'],
+        'sources': {name: file_hash(os.path.join(scripts_dir, name)) for name in local_sources(spec['command'][0])},
+        'upstream': upstream,
+        'raw': raw_signature() if stage == 'clean' else None,
+    }
+    return content_hash(json.dumps(inputs, sort_keys=True).encode())
+
+
+def checkpoint_intact(marker):
+    """Every recorded output still has its recorded content (and a tables checkpoint all its objects)"""
+    for path, digest in marker['outputs'].items():
+        if not os.path.exists(path) or file_hash(path) != digest:
+            return False
+    if marker['kind'] == 'tables':
+        return all(os.path.exists(resolve(name, cleaned_dir)) for name in load_manifest(cleaned_dir))
+    return True
+
+
+def status(stage):
+    """'done', 'stale' (inputs changed or outputs damaged) or 'missing'"""
+    marker = read_marker(stage)
+    if marker is None:
+        return 'missing'
+    if marker['fingerprint'] != fingerprint(stage) or not checkpoint_intact(marker):
+        return 'stale'
+    return 'done'
+
+
+def run_stage(stage):
+    """Run one stage and write its completion marker; returns True on success"""
+    spec = STAGES[stage]
+    if os.path.exists(marker_path(stage)):
+        os.remove(marker_path(stage))
+    start = time.time()
+    script, *args = spec['command']
+    result = subprocess.run([sys.executable, os.path.join(scripts_dir, script), *args])
+    if result.returncode != 0:
+        return False
+
+    missing = [path for path in spec['outputs'] if not os.path.exists(path)]
+    if missing:
+        print(f"  {stage}: expected outputs missing: {', '.join(missing)}")
+        return False
+    marker = {
+        'stage': stage,
+        'kind': spec['kind'],
+        'fingerprint': fingerprint(stage),
+        'outputs': {path: file_hash(path) for path in spec['outputs']},
+        'finished': datetime.now().isoformat(timespec='seconds'),
+        'seconds': round(time.time() - start, 1),
+    }
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    tmp_path = f"{marker_path(stage)}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(marker, f, indent=2)
+    os.replace(tmp_path, marker_path(stage))
+    return True
+
+
+def run(stages=None, resume=False, force=()):
+    """Run the stages in order, skipping up-to-date ones when resuming; stops at the first failure"""
+    for stage in stages or STAGES:
+        if resume and stage not in force and status(stage) == 'done':
+            print(f"[{stage}] up to date, skipped")
+            continue
+        print(f"\n[{stage}] running {' '.join(STAGES[stage]['command'])}")
+        if not run_stage(stage):
+            raise SystemExit(f"Stage '{stage}' failed; fix it and rerun with --resume to continue from here")
+    print("\nPipeline complete!")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the full pipeline with resumable checkpoints")
+    parser.add_argument('--resume', action='store_true', help="skip stages whose checkpoints are up to date")
+    parser.add_argument('--force', nargs='+', default=[], choices=list(STAGES), help="rerun these stages anyway")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), help="run only these stages (in pipeline order)")
+    parser.add_argument('--status', action='store_true', help="show each stage's checkpoint status and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        for stage, spec in STAGES.items():
+            marker = read_marker(stage)
+            finished = f"  (finished {marker['finished']}, {marker['seconds']}s)" if marker else ""
+            print(f"  {stage:<12} {spec['kind']:<10} {status(stage)}{finished}")
+        return
+
+    stages = [stage for stage in STAGES if stage in args.stages] if args.stages else None
+    run(stages, resume=args.resume, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
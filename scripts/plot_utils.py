@@ -0,0 +1,59 @@
+"""
+Plot helpers for large datasets.
+Above LARGE_N_THRESHOLD points, scatter plots are drawn as a hexbin density raster
+and trend lines use a closed-form OLS fit with an analytic confidence band
+instead of seaborn's bootstrapped regplot.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+from scipy import stats
+
+# Point count above which scatter plots switch to binned rendering
+LARGE_N_THRESHOLD = 20000
+
+
+def is_large(n):
+    return n > LARGE_N_THRESHOLD
+
+
+def ols_fit(x, y):
+    """Closed-form simple linear regression; returns the pieces needed for confidence bands"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+
+    n = len(x)
+    x_mean, y_mean = x.mean(), y.mean()
+    sxx = ((x - x_mean) ** 2).sum()
+    slope = ((x - x_mean) * (y - y_mean)).sum() / sxx
+    intercept = y_mean - slope * x_mean
+    residuals = y - (intercept + slope * x)
+    sigma = np.sqrt((residuals ** 2).sum() / (n - 2))
+    return {'n': n, 'slope': slope, 'intercept': intercept, 'sigma': sigma, 'x_mean': x_mean, 'sxx': sxx}
+
+
+def ols_band(fit, grid, level=0.95):
+    """Fitted line and confidence band for the mean response at each grid point"""
+    t = stats.t.ppf(0.5 + level / 2, fit['n'] - 2)
+    se = fit['sigma'] * np.sqrt(1 / fit['n'] + (grid - fit['x_mean']) ** 2 / fit['sxx'])
+    line = fit['intercept'] + fit['slope'] * grid
+    return line, line - t * se, line + t * se
+
+
+def density_scatter(ax, x, y, gridsize=60, cmap='Purples', label='Titles per bin'):
+    """Hexbin density raster in place of a point-per-row scatter"""
+    hb = ax.hexbin(x, y, gridsize=gridsize, bins='log', mincnt=1, cmap=cmap, linewidths=0)
+    plt.colorbar(hb, ax=ax, label=f'{label} (log)')
+    return hb
+
+
+def draw_ols_fit(ax, x, y, color='black', level=0.95):
+    """Closed-form OLS trend line with its analytic confidence band"""
+    fit = ols_fit(x, y)
+    grid = np.linspace(np.nanmin(x), np.nanmax(x), 200)
+    line, lower, upper = ols_band(fit, grid, level)
+    ax.plot(grid, line, color=color, linewidth=2)
+    ax.fill_between(grid, lower, upper, color=color, alpha=0.15, linewidth=0)
+    return fit
@@ -0,0 +1,154 @@
+"""
+Embedded SQL layer over the cleaned tables (DuckDB, all local).
+Every cleaned table is exposed under its own name, plus joined convenience views:
+    studios       anime_id, studio_id, studio
+    directors     anime_id, director_id, director, role
+    genres        anime_id, genre
+    characters    anime_id, character_id, character, role
+    voice_actors  anime_id, character_id, va_id, voice_actor, language
+
+Usage:
+    python scripts/query.py "SELECT type, avg(score) FROM anime GROUP BY type"
+    python scripts/query.py -f question.sql --output answer.csv
+    python scripts/query.py            # interactive prompt
+
+From Python:
+    from query import sql
+    sql("SELECT * FROM studios WHERE studio = ?", ["Madhouse"])
+"""
+
+import argparse
+import sys
+
+import duckdb
+
+from tables import ENTITY_COLUMNS, entity_map, input_dir, sample_tables, TABLE_NAMES
+from store import resolve
+
+VIEWS = {
+    'studios': """
+        SELECT c.anime_id, c.company_id AS studio_id, e.name AS studio
+        FROM anime_companies c JOIN entities e ON e.entity_id = c.company_id
+        WHERE c.role = 'Studio'
+    """,
+    'directors': """
+        SELECT s.anime_id, s.person_id AS director_id, e.name AS director, s.role
+        FROM anime_staff s JOIN entities e ON e.entity_id = s.person_id
+        WHERE s.role ILIKE '%director%'
+    """,
+    'genres': """
+        SELECT anime_id, genre FROM anime_genres
+    """,
+    'characters': """
+        SELECT c.anime_id, c.character_id, e.name AS character, c.role
+        FROM anime_characters c LEFT JOIN entities e ON e.entity_id = c.character_id
+    """,
+    'voice_actors': """
+        SELECT c.anime_id, va.character_id, va.person_id AS va_id, e.name AS voice_actor, va.language
+        FROM anime_voice_actors va
+        JOIN (SELECT DISTINCT character_id, anime_id FROM anime_characters) c USING (character_id)
+        JOIN entities e ON e.entity_id = va.person_id
+    """,
+}
+
+# Connection over the files in input_dir, opened on first use of sql()
+_default = None
+
+
+def connect(tables=None):
+    """In-memory DuckDB connection with a view per cleaned table and the convenience VIEWS.
+    Tables passed as {name: DataFrame} (e.g. a slice, or the preview sample) are queried in place of the files."""
+    con = duckdb.connect()
+    tables = tables or sample_tables() or {}
+    mapping = entity_map()
+    if mapping is not None:
+        con.register("entity_map", mapping)
+    for name in TABLE_NAMES:
+        if name in tables:
+            con.register(f"{name}_frame", tables[name])
+            con.execute(f"CREATE VIEW {name} AS SELECT * FROM {name}_frame")
+            continue
+        path = resolve(name, input_dir).replace("'", "''")
+        # Explicit quoting: sniffing can miss quoted commas that first appear deep in a file
+        source = f"read_csv('{path}', header = true, quote = '\"', escape = '\"')"
+        if mapping is not None and name in ENTITY_COLUMNS:
+            column = ENTITY_COLUMNS[name]
+            columns = ", ".join(row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall())
+            # As in tables.canonicalize: only rows the merge made identical are collapsed
+            con.execute(f"CREATE VIEW {name} AS SELECT * EXCLUDE (_source) FROM ("
+                        f"SELECT t.* REPLACE (coalesce(m.canonical_id, t.{column}) AS {column}), "
+                        f"CASE WHEN m.canonical_id <> t.{column} THEN t.{column} ELSE -1 END AS _source "
+                        f"FROM {source} t LEFT JOIN entity_map m ON m.entity_id = t.{column}) "
+                        f"QUALIFY _source = min(_source) OVER (PARTITION BY {columns})")
+        elif mapping is not None and name == "entities":
+            con.execute(f"CREATE VIEW {name} AS SELECT t.* REPLACE (coalesce(m.canonical_name, t.name) AS name) "
+                        f"FROM {source} t LEFT JOIN entity_map m ON m.entity_id = t.entity_id")
+        else:
+            con.execute(f"CREATE VIEW {name} AS SELECT * FROM {source}")
+    for name, definition in VIEWS.items():
+        con.execute(f"CREATE VIEW {name} AS {definition}")
+    return con
+
+
+def sql(query, params=None, con=None):
+    """Run a query and return the result as a DataFrame"""
+    global _default
+    if con is None:
+        if _default is None:
+            _default = connect()
+        con = _default
+    return con.execute(query, params or []).df()
+
+
+def repl(con):
+    """Minimal interactive prompt; statements end with ';', .tables lists views, .quit exits"""
+    print("SQL over the cleaned tables. End statements with ';'. Type .tables or .quit")
+    buffer = []
+    while True:
+        try:
+            line = input("sql> " if not buffer else "...> ")
+        except EOFError:
+            break
+        if not buffer and line.strip() == ".quit":
+            break
+        if not buffer and line.strip() == ".tables":
+            print(", ".join(TABLE_NAMES + list(VIEWS)))
+            continue
+        buffer.append(line)
+        if line.rstrip().endswith(";"):
+            try:
+                print(sql("\n".join(buffer), con=con).to_string(index=False))
+            except duckdb.Error as e:
+                print(f"Error: {e}")
+            buffer = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run SQL against the cleaned tables")
+    parser.add_argument('query', nargs='?', help="SQL statement (omit for an interactive prompt)")
+    parser.add_argument('-f', '--file', help="read the statement from a .sql file")
+    parser.add_argument('--output', help="write the result to this CSV instead of printing it")
+    args = parser.parse_args()
+
+    con = connect()
+    query = args.query
+    if args.file:
+        with open(args.file) as f:
+            query = f.read()
+    if query is None:
+        repl(con)
+        return
+
+    try:
+        result = sql(query, con=con)
+    except duckdb.Error as e:
+        sys.exit(f"Error: {e}")
+    if args.output:
+        result.to_csv(args.output, index=False)
+        print(f"Saved {args.output} ({len(result):,} rows)")
+    else:
+        print(result.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Leaderboard ranking with bootstrap uncertainty.
+Confidence intervals for every group's mean score are computed at once with a Poisson
+bootstrap: each resample is a row of Poisson(1) weights, and grouped weighted sums for
+all resamples come from a single np.bincount over (resample, group) offsets.
+Identical (group, score) rows are collapsed first: the sum of m Poisson(1) weights is
+Poisson(m), so drawing one Poisson(m) weight per distinct row is an exact shortcut.
+Per-resample rankings then give each group's probability of landing in the top N.
+"""
+
+import numpy as np
+import pandas as pd
+
+N_BOOT = 1000
+CI_LEVEL = 0.95
+# Upper bound on weights drawn per chunk of resamples (bounds memory, not a per-resample loop)
+MAX_CHUNK_CELLS = 5_000_000
+
+
+def bootstrap_group_means(codes, values, n_groups, multiplicity=None, n_boot=N_BOOT, seed=42):
+    """(n_boot x n_groups) matrix of resampled group means; NaN where a group drew no rows"""
+    rng = np.random.default_rng(seed)
+    n = len(values)
+    rate = 1.0 if multiplicity is None else multiplicity
+    chunk = max(1, min(n_boot, MAX_CHUNK_CELLS // max(n, 1)))
+    means = np.empty((n_boot, n_groups))
+
+    for start in range(0, n_boot, chunk):
+        b = min(chunk, n_boot - start)
+        weights = rng.poisson(rate, size=(b, n)).astype(np.float64)
+        offsets = (np.arange(b)[:, None] * n_groups + codes[None, :]).ravel()
+        sums = np.bincount(offsets, weights=(weights * values).ravel(), minlength=b * n_groups)
+        counts = np.bincount(offsets, weights=weights.ravel(), minlength=b * n_groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[start:start + b] = (sums / counts).reshape(b, n_groups)
+    return means
+
+
+def rank_groups(frame, key, value='score', eligible=None, top_n=15, n_boot=N_BOOT, level=CI_LEVEL, seed=42,
+                weight=None):
+    """Mean, bootstrap CI, median bootstrap rank and P(top N) for each eligible group.
+    `weight` names a row-multiplicity column when the frame is already collapsed."""
+    frame = frame[[key, value] + ([weight] if weight else [])].dropna()
+    if eligible is not None:
+        frame = frame[frame[key].isin(eligible)]
+    if weight:
+        distinct = frame.groupby([key, value], sort=False)[weight].sum().reset_index(name='m')
+    else:
+        distinct = frame.groupby([key, value], sort=False).size().reset_index(name='m')
+    codes, groups = pd.factorize(distinct[key])
+    values = distinct[value].to_numpy(dtype=np.float64)
+    multiplicity = distinct['m'].to_numpy(dtype=np.float64)
+
+    observed = (np.bincount(codes, weights=values * multiplicity, minlength=len(groups))
+                / np.bincount(codes, weights=multiplicity, minlength=len(groups)))
+    boot = bootstrap_group_means(codes, values, len(groups), multiplicity, n_boot, seed)
+
+    alpha = (1 - level) / 2
+    ci_low, ci_high = np.nanquantile(boot, [alpha, 1 - alpha], axis=0)
+
+    # Rank within each resample (0 = best); groups with no draws rank last
+    ranks = np.argsort(np.argsort(-np.nan_to_num(boot, nan=-np.inf), axis=1), axis=1)
+
+    return pd.DataFrame({
+        key: groups,
+        'mean_score': observed,
+        'ci_low': ci_low,
+        'ci_high': ci_high,
+        'median_rank': np.median(ranks, axis=0) + 1,
+        'p_top': (ranks < top_n).mean(axis=0),
+    }).sort_values('mean_score', ascending=False, ignore_index=True)
+
+
+def draw_error_bars(ax, ranked):
+    """Horizontal CI error bars over a bar chart drawn in the same row order"""
+    ax.errorbar(
+        ranked['mean_score'], np.arange(len(ranked)),
+        xerr=[ranked['mean_score'] - ranked['ci_low'], ranked['ci_high'] - ranked['mean_score']],
+        fmt='none', ecolor='black', elinewidth=1, capsize=3,
+    )
+
+
+def distinct_labels(names, ids):
+    """Display names, with the id appended where different groups share a name"""
+    names = pd.Series(list(names), dtype=object)
+    ids = pd.Series(list(ids))
+    shared = names.duplicated(keep=False)
+    return names.where(~shared, names + " [" + ids.astype(str) + "]").tolist()
+
+
+def label_with_stability(names, p_top, top_n):
+    """Axis labels annotated with each group's probability of staying in the top N"""
+    return [f"{name}  (P top{top_n}: {p:.0%})" for name, p in zip(names, p_top)]
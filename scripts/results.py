@@ -0,0 +1,57 @@
+"""
+Machine-readable results artifacts.
+Each analysis phase saves its key metrics and small tables as JSON in output/results/,
+and the report generator reads them back instead of hardcoding numbers.
+"""
+
+import json
+import math
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+results_dir = "output/results"
+
+
+def to_builtin(value):
+    """Convert numpy/pandas values (and NaN) into JSON-safe Python values"""
+    if isinstance(value, dict):
+        return {str(k): to_builtin(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_builtin(v) for v in value]
+    if isinstance(value, pd.DataFrame):
+        return to_builtin(value.to_dict(orient='records'))
+    if isinstance(value, pd.Series):
+        return to_builtin(value.to_dict())
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def save_results(phase, results, directory=None):
+    """Write one phase's results to <results_dir>/<phase>.json"""
+    directory = directory or results_dir
+    os.makedirs(directory, exist_ok=True)
+    payload = {'generated': datetime.now().isoformat(timespec='seconds'), **to_builtin(results)}
+    path = os.path.join(directory, f"{phase}.json")
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, allow_nan=False)
+    print(f"Saved results to {path}")
+
+
+def load_results(directory=None):
+    """Load every phase's results as {phase: results}"""
+    directory = directory or results_dir
+    results = {}
+    if os.path.isdir(directory):
+        for file in sorted(os.listdir(directory)):
+            if file.endswith(".json"):
+                with open(os.path.join(directory, file)) as f:
+                    results[file[:-5]] = json.load(f)
+    return results
@@ -0,0 +1,116 @@
+"""
+Batch slice runner.
+Loads the cleaned tables once, then generates the full figure set, results and
+IEEE report for every slice spec in parallel, each in its own output directory:
+    output/slices/<slice name>/images/
+    output/slices/<slice name>/results/
+    output/slices/<slice name>/IEEE_Anime_Research_Report.pdf
+
+Usage:
+    python scripts/run_slices.py slices.json --workers 4
+
+With more than one worker, each slice trains and explains its model on a single
+core (spec keys `n_jobs` and `workers`) so the slices do not oversubscribe the CPUs.
+"""
+
+import argparse
+import importlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use("Agg")
+
+import results
+from tables import add_sample_argument, load_tables
+from slices import load_slice_specs, apply_slice
+from generate_ieee_pdf import generate_ieee_report
+
+# Settings
+output_root = "output/slices"
+
+PHASES = [
+    "03_analyze",
+    "04_seasonal",
+    "05_characters",
+    "06_networks",
+    "07_temporal",
+    "08_ml_model",
+    "09_comparative",
+    "10_careers",
+]
+
+# Tables shared by every slice in this worker process
+_tables = None
+
+
+def _init_worker(tables):
+    global _tables
+    _tables = tables
+
+
+def run_slice(spec, phases=PHASES):
+    """Run every phase and build the report for one slice; returns (name, seconds)"""
+    start = time.time()
+    slice_dir = os.path.join(output_root, spec['name'])
+    slice_images = os.path.join(slice_dir, "images")
+    os.makedirs(slice_images, exist_ok=True)
+    results.results_dir = os.path.join(slice_dir, "results")
+
+    tables = apply_slice(_tables, spec)
+    print(f"[{spec['name']}] {len(tables['anime']):,} anime")
+
+    for name in phases:
+        phase = importlib.import_module(name)
+        # Phase plot functions save into their module-level output_dir
+        phase.output_dir = slice_images
+        if hasattr(phase, 'model_dir'):
+            phase.model_dir = os.path.join(slice_dir, "model")
+        phase.main(tables, spec)
+
+    generate_ieee_report(
+        results=results.load_results(results.results_dir),
+        images_dir=slice_images,
+        output_pdf_path=os.path.join(slice_dir, "IEEE_Anime_Research_Report.pdf"),
+    )
+    return spec['name'], time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate figures and reports for many data slices")
+    parser.add_argument('specs', help="JSON file with a list of slice specs")
+    parser.add_argument('--workers', type=int, default=1, help="parallel worker processes")
+    parser.add_argument('--only', nargs='+', help="run only the named slices")
+    add_sample_argument(parser)
+    args = parser.parse_args()
+
+    specs = load_slice_specs(args.specs)
+    if args.only:
+        specs = [spec for spec in specs if spec['name'] in args.only]
+    if args.workers > 1:
+        # The worker pool already uses the cores; keep each slice's model and explainer single-threaded
+        specs = [{'n_jobs': 1, 'workers': 1, **spec} for spec in specs]
+
+    print("Loading cleaned tables...")
+    tables = load_tables(sample=args.sample)
+
+    print(f"Running {len(specs)} slice(s) on {args.workers} worker(s)...")
+    failed = []
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(tables,)) as pool:
+        futures = {pool.submit(run_slice, spec): spec['name'] for spec in specs}
+        for future in as_completed(futures):
+            try:
+                name, seconds = future.result()
+                print(f"  Finished {name} in {seconds:.1f}s")
+            except Exception as e:
+                failed.append(futures[future])
+                print(f"  FAILED {futures[future]}: {e}")
+
+    if failed:
+        raise SystemExit(f"{len(failed)} slice(s) failed: {', '.join(failed)}")
+    print(f"\nAll slices written to {output_root}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Table schema for the normalized MyAnimeList dataset.
+Primary keys and foreign-key relationships shared by the cleaning and validation stages.
+"""
+
+# Table name -> columns of the raw CSV files in data/raw, in file order
+RAW_COLUMNS = {
+    "anime": ["anime_id", "title", "score", "members", "episodes", "type", "start_date", "synopsis", "end_date"],
+    "entities": ["entity_id", "name"],
+    "anime_characters": ["anime_id", "character_id", "role"],
+    "anime_companies": ["anime_id", "company_id", "role"],
+    "anime_genres": ["anime_id", "genre"],
+    "anime_staff": ["anime_id", "person_id", "role"],
+    "anime_voice_actors": ["character_id", "person_id", "language"],
+}
+
+# Table name -> columns that uniquely identify a row
+PRIMARY_KEYS = {
+    "anime": ["anime_id"],
+    "entities": ["entity_id"],
+    "anime_characters": ["anime_id", "character_id"],
+    "anime_companies": ["anime_id", "company_id", "role"],
+    "anime_genres": ["anime_id", "genre"],
+    "anime_staff": ["anime_id", "person_id"],
+    "anime_voice_actors": ["character_id", "person_id", "language"],
+}
+
+# (child table, child column, parent table, parent column)
+FOREIGN_KEYS = [
+    ("anime_characters", "anime_id", "anime", "anime_id"),
+    ("anime_characters", "character_id", "entities", "entity_id"),
+    ("anime_companies", "anime_id", "anime", "anime_id"),
+    ("anime_companies", "company_id", "entities", "entity_id"),
+    ("anime_genres", "anime_id", "anime", "anime_id"),
+    ("anime_staff", "anime_id", "anime", "anime_id"),
+    ("anime_staff", "person_id", "entities", "entity_id"),
+    ("anime_voice_actors", "character_id", "anime_characters", "character_id"),
+    ("anime_voice_actors", "person_id", "entities", "entity_id"),
+]
+
+# Table -> {column: (min, max)}; None means unbounded on that side
+VALUE_RANGES = {
+    "anime": {
+        "score": (1, 10),
+        "episodes": (1, None),
+        "members": (0, None),
+    },
+}
@@ -0,0 +1,243 @@
+"""
+Content-based similar-anime recommender.
+Each anime becomes a sparse TF-IDF vector over its genres, studios, directors and
+voice actors (one block per relationship), rows are L2-normalized so a dot product
+is the cosine similarity, and the matrix is saved as a nearest-neighbor index.
+
+Queries:
+    python scripts/similarity.py --build [--synopsis-weight 0.5]
+    python scripts/similarity.py --similar 5114 -k 10
+    python scripts/similarity.py --all-pairs -k 10 --workers 4 [--approximate]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from tables import load_tables
+
+# Settings
+index_dir = "data/index"
+BLOCK_WEIGHTS = {'genre': 1.0, 'studio': 1.0, 'director': 1.0, 'va': 1.0}
+QUERY_BLOCK_ROWS = 256
+# Approximate mode: random-projection dimension and exact re-ranking pool per query
+PROJECTION_DIM = 128
+RERANK_FACTOR = 5
+
+
+def incidence_block(anime_ids, pair_anime_ids, pair_keys, prefix):
+    """Binary anime x feature matrix for one relationship (duplicate pairs collapse to 1)"""
+    rows = pd.Index(anime_ids).get_indexer(pair_anime_ids)
+    keep = rows >= 0
+    codes, uniques = pd.factorize(pd.Series(pair_keys)[keep])
+    matrix = sparse.csr_matrix(
+        (np.ones(keep.sum(), dtype=np.float32), (rows[keep], codes)),
+        shape=(len(anime_ids), len(uniques)),
+    )
+    matrix.data[:] = 1.0  # duplicates were summed on construction
+    names = [f"{prefix}:{u}" for u in uniques]
+    return matrix, names
+
+
+def tfidf_weight(matrix):
+    """Scale each feature column by its smoothed inverse document frequency"""
+    n = matrix.shape[0]
+    df = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log((1 + n) / (1 + df)) + 1
+    return matrix @ sparse.diags(idf.astype(np.float32))
+
+
+def relationship_blocks(tables):
+    """(name, anime_ids, keys) for each relationship that feeds the vectors"""
+    companies = tables['anime_companies']
+    staff = tables['anime_staff']
+    characters = tables['anime_characters']
+    voice_actors = tables['anime_voice_actors']
+    genres = tables['anime_genres']
+
+    studios = companies[companies['role'] == 'Studio']
+    directors = staff[staff['role'].str.contains('Director', case=False, na=False)]
+    va_anime = voice_actors[voice_actors['language'] == 'Japanese'].merge(
+        characters[['character_id', 'anime_id']].drop_duplicates(), on='character_id')
+
+    return [
+        ('genre', genres['anime_id'], genres['genre']),
+        ('studio', studios['anime_id'], studios['company_id']),
+        ('director', directors['anime_id'], directors['person_id']),
+        ('va', va_anime['anime_id'], va_anime['person_id']),
+    ]
+
+
+def build_vectors(tables, weights=BLOCK_WEIGHTS, extra_blocks=()):
+    """L2-normalized TF-IDF matrix (anime x features) and its row anime_ids / feature names"""
+    anime_ids = tables['anime']['anime_id'].to_numpy()
+    blocks, names = [], []
+    for name, pair_anime_ids, keys in relationship_blocks(tables):
+        if weights.get(name, 0) == 0:
+            continue
+        matrix, feature_names = incidence_block(anime_ids, pair_anime_ids.to_numpy(), keys.to_numpy(), name)
+        blocks.append(weights[name] * normalize(tfidf_weight(matrix)))
+        names.extend(feature_names)
+    for name, matrix, weight in extra_blocks:
+        blocks.append(weight * normalize(matrix))
+        names.extend(f"{name}:{i}" for i in range(matrix.shape[1]))
+    vectors = normalize(sparse.hstack(blocks, format='csr', dtype=np.float32))
+    return vectors, anime_ids, names
+
+
+def save_index(vectors, anime_ids):
+    os.makedirs(index_dir, exist_ok=True)
+    sparse.save_npz(os.path.join(index_dir, "similarity_vectors.npz"), vectors)
+    np.save(os.path.join(index_dir, "similarity_anime_ids.npy"), anime_ids)
+
+
+def load_index():
+    vectors = sparse.load_npz(os.path.join(index_dir, "similarity_vectors.npz")).tocsr()
+    anime_ids = np.load(os.path.join(index_dir, "similarity_anime_ids.npy"))
+    return vectors, anime_ids
+
+
+def project(vectors, dim=PROJECTION_DIM, seed=42):
+    """Gaussian random projection to a small dense space (approximately preserves cosine)"""
+    rng = np.random.default_rng(seed)
+    projection = rng.standard_normal((vectors.shape[1], dim)).astype(np.float32) / np.sqrt(dim)
+    return normalize(vectors @ projection)
+
+
+def top_k(scores, k, exclude=None):
+    """Column indices of the k largest scores per row, best first"""
+    scores = np.array(scores, dtype=np.float32, copy=True)
+    if exclude is not None:
+        scores[np.arange(len(exclude)), exclude] = -np.inf
+    k = min(k, scores.shape[1] - 1)
+    part = np.argpartition(-scores, k, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def exact_rerank(vectors, rows, candidates, k):
+    """Exact cosine scores for each row's candidate pool, keeping the top k"""
+    repeated = np.repeat(rows, candidates.shape[1])
+    exact = np.asarray(vectors[repeated].multiply(vectors[candidates.ravel()]).sum(axis=1)).reshape(candidates.shape)
+    order = np.argsort(-exact, axis=1)[:, :k]
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(exact, order, axis=1)
+
+
+def query_block(vectors, rows, k, projected=None):
+    """Top-k neighbours for a block of row positions (exact, or projected + re-ranked)"""
+    if projected is None:
+        scores = (vectors[rows] @ vectors.T).toarray()
+        return top_k(scores, k, exclude=rows)
+    scores = projected[rows] @ projected.T
+    candidates, _ = top_k(scores, k * RERANK_FACTOR, exclude=rows)
+    return exact_rerank(vectors, rows, candidates, k)
+
+
+def similar(anime_id, k=10, vectors=None, anime_ids=None):
+    """The k most similar anime to anime_id as a DataFrame of (anime_id, similarity)"""
+    if vectors is None:
+        vectors, anime_ids = load_index()
+    position = np.flatnonzero(anime_ids == anime_id)
+    if len(position) == 0:
+        raise KeyError(f"anime_id {anime_id} is not in the similarity index")
+    neighbours, scores = query_block(vectors, position, k)
+    return pd.DataFrame({'anime_id': anime_ids[neighbours[0]], 'similarity': scores[0]})
+
+
+# Index shared by every all-pairs worker process
+_vectors = None
+_projected = None
+
+
+def _init_worker(vectors, projected):
+    global _vectors, _projected
+    _vectors, _projected = vectors, projected
+
+
+def _query_rows(args):
+    start, stop, k = args
+    rows = np.arange(start, stop)
+    return start, query_block(_vectors, rows, k, _projected)
+
+
+def all_pairs_top_k(vectors, anime_ids, k=10, workers=None, approximate=False):
+    """Top-k neighbour table for every anime, computed in row blocks across a process pool"""
+    projected = project(vectors) if approximate else None
+    tasks = [(start, min(start + QUERY_BLOCK_ROWS, vectors.shape[0]), k)
+             for start in range(0, vectors.shape[0], QUERY_BLOCK_ROWS)]
+
+    parts = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(vectors, projected)) as pool:
+        for start, (neighbours, scores) in pool.map(_query_rows, tasks):
+            n_rows, n_cols = neighbours.shape
+            parts.append(pd.DataFrame({
+                'anime_id': np.repeat(anime_ids[start:start + n_rows], n_cols),
+                'rank': np.tile(np.arange(1, n_cols + 1), n_rows),
+                'similar_anime_id': anime_ids[neighbours.ravel()],
+                'similarity': scores.ravel(),
+            }))
+    return pd.concat(parts, ignore_index=True)
+
+
+def build_index(synopsis_weight=0.0):
+    print("Loading data for similarity index...")
+    tables = load_tables(["anime", "anime_genres", "anime_companies", "anime_staff",
+                          "anime_characters", "anime_voice_actors"])
+    start = time.time()
+    extra_blocks = []
+    if synopsis_weight > 0:
+        from text_features import load_synopsis_tfidf, align_rows
+        matrix, matrix_ids = load_synopsis_tfidf()
+        extra_blocks.append(('synopsis', align_rows(matrix, matrix_ids, tables['anime']['anime_id']), synopsis_weight))
+    vectors, anime_ids, names = build_vectors(tables, extra_blocks=extra_blocks)
+    save_index(vectors, anime_ids)
+    print(f"Built {vectors.shape[0]:,} x {vectors.shape[1]:,} index ({vectors.nnz:,} non-zeros) "
+          f"in {time.time() - start:.1f}s")
+    return vectors, anime_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Similar-anime recommender")
+    parser.add_argument('--build', action='store_true', help="(re)build the similarity index")
+    parser.add_argument('--similar', type=int, metavar='ANIME_ID', help="print the most similar anime")
+    parser.add_argument('--all-pairs', action='store_true', help="write the top-k table for every anime")
+    parser.add_argument('-k', type=int, default=10, help="neighbours per anime")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--synopsis-weight', type=float, default=0.0,
+                        help="weight of the synopsis TF-IDF block when building (0 = off)")
+    parser.add_argument('--approximate', action='store_true',
+                        help="random-projection candidates with exact re-ranking for --all-pairs")
+    args = parser.parse_args()
+
+    index_exists = os.path.exists(os.path.join(index_dir, "similarity_vectors.npz"))
+    if args.build or not index_exists:
+        vectors, anime_ids = build_index(args.synopsis_weight)
+    else:
+        vectors, anime_ids = load_index()
+
+    if args.similar is not None:
+        anime = load_tables(["anime"])['anime'][['anime_id', 'title']]
+        start = time.time()
+        result = similar(args.similar, args.k, vectors, anime_ids)
+        elapsed = (time.time() - start) * 1000
+        title = anime.loc[anime['anime_id'] == args.similar, 'title'].iloc[0]
+        print(f"\nMost similar to {title} ({elapsed:.1f} ms):")
+        print(result.merge(anime, on='anime_id', how='left').to_string(index=False))
+
+    if args.all_pairs:
+        start = time.time()
+        table = all_pairs_top_k(vectors, anime_ids, args.k, args.workers, args.approximate)
+        path = os.path.join(index_dir, "similar_anime_top_k.csv")
+        table.to_csv(path, index=False)
+        print(f"Saved {path} ({len(table):,} rows) in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Slice specs for per-edition analysis runs.
+A slice spec is a dict such as
+    {"name": "tv_2010_2024", "years": [2010, 2024], "types": ["TV"]}
+with optional filters on the anime table ("years", "types", "studios") and optional
+overrides of the phase parameters (e.g. "min_studio_titles": 5). Filters are applied
+to anime and semi-joined into every relationship table so the slice stays consistent.
+"""
+
+import json
+
+import numpy as np
+
+from tables import semi_join
+
+
+def load_slice_specs(path):
+    """Read a JSON list of slice specs"""
+    with open(path) as f:
+        specs = json.load(f)
+    names = [spec['name'] for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Slice names must be unique: {names}")
+    return specs
+
+
+def param(spec, key, default):
+    """Phase parameter from the slice spec, or the script's default"""
+    if spec and spec.get(key) is not None:
+        return spec[key]
+    return default
+
+
+def year_window(spec, default):
+    """Year range for trend charts: the slice's years if it has them, else the default window"""
+    if spec and spec.get('years'):
+        return tuple(spec['years'])
+    return default
+
+
+def decade_window(spec, default):
+    """Decade range for decade charts: the slice's years with the start rounded down to its decade"""
+    start, end = year_window(spec, default)
+    return start // 10 * 10, end
+
+
+def apply_slice(tables, spec):
+    """Filter anime by the slice spec and semi-join the relationship tables to it"""
+    anime = tables['anime']
+    mask = np.ones(len(anime), dtype=bool)
+
+    if spec.get('years'):
+        first, last = spec['years']
+        years = anime['start_date'].dt.year
+        mask &= ((years >= first) & (years <= last)).to_numpy()
+
+    if spec.get('types'):
+        mask &= anime['type'].isin(spec['types']).to_numpy()
+
+    if spec.get('studios'):
+        companies, entities = tables['anime_companies'], tables['entities']
+        studio_ids = entities.loc[entities['name'].isin(spec['studios']), 'entity_id']
+        studio_rows = companies[(companies['role'] == 'Studio') & companies['company_id'].isin(studio_ids)]
+        mask &= anime['anime_id'].isin(studio_rows['anime_id']).to_numpy()
+
+    return semi_join(tables, anime[mask])
@@ -0,0 +1,147 @@
+"""
+Content-addressed store for the cleaned tables.
+Each table version is saved once as a zstd-compressed CSV named by the SHA-256 of its
+uncompressed bytes (data/cleaned/objects/ab/abcdef....csv.zst), and manifest.json maps
+table names to the current object. Writing a table whose content is already stored
+only updates the manifest, so unchanged tables are never rewritten or duplicated.
+Readers call resolve(name), which falls back to a plain <name>_cleaned.csv when the
+table is not in the manifest. Those plain CSVs are never deleted implicitly (some are
+tracked in git); --migrate removes the ones the store has superseded.
+
+Usage:
+    python scripts/store.py            # list the manifest
+    python scripts/store.py --gc       # delete objects no longer referenced
+    python scripts/store.py --migrate  # delete plain CSVs of tables held in the store
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import zstandard
+
+# Settings
+store_dir = "data/cleaned"
+ZSTD_LEVEL = 10
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def object_path(digest, directory=None):
+    return os.path.join(directory or store_dir, "objects", digest[:2], f"{digest}.csv.zst")
+
+
+def legacy_path(name, directory=None):
+    return os.path.join(directory or store_dir, f"{name}_cleaned.csv")
+
+
+def load_manifest(directory=None):
+    path = os.path.join(directory or store_dir, "manifest.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, directory=None):
+    """Write the manifest atomically so readers never see a partial file"""
+    path = os.path.join(directory or store_dir, "manifest.json")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def put_bytes(data, directory=None):
+    """Store CSV bytes under their content hash; returns (digest, whether a new object was written)"""
+    digest = content_hash(data)
+    path = object_path(digest, directory)
+    if os.path.exists(path):
+        return digest, False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data))
+    os.replace(tmp_path, path)
+    return digest, True
+
+
+def frame_bytes(df):
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def commit_table(manifest, name, data, directory=None):
+    """Point the manifest at this content for `name`; returns False when it was already current"""
+    digest = content_hash(data)
+    entry = manifest.get(name)
+    if entry is not None and entry['hash'] == digest and os.path.exists(object_path(digest, directory)):
+        return False
+    put_bytes(data, directory)
+    manifest[name] = {
+        'hash': digest,
+        'bytes': len(data),
+        'stored_bytes': os.path.getsize(object_path(digest, directory)),
+        'updated': datetime.now().isoformat(timespec='seconds'),
+    }
+    return True
+
+
+def resolve(name, directory=None):
+    """Path to read table `name` from (pandas and DuckDB both decompress .zst transparently)"""
+    entry = load_manifest(directory).get(name)
+    if entry is not None:
+        return object_path(entry['hash'], directory)
+    return legacy_path(name, directory)
+
+
+def gc(directory=None):
+    """Delete objects the manifest no longer references; returns bytes freed"""
+    referenced = {entry['hash'] for entry in load_manifest(directory).values()}
+    objects_dir = os.path.join(directory or store_dir, "objects")
+    freed = 0
+    for root, _, filenames in os.walk(objects_dir):
+        for filename in filenames:
+            if filename.split(".")[0] not in referenced:
+                path = os.path.join(root, filename)
+                freed += os.path.getsize(path)
+                os.remove(path)
+    return freed
+
+
+def migrate(directory=None):
+    """Delete the plain <name>_cleaned.csv of every table the store holds; returns their names"""
+    removed = []
+    for name, entry in sorted(load_manifest(directory).items()):
+        path = legacy_path(name, directory)
+        if os.path.exists(path) and os.path.exists(object_path(entry['hash'], directory)):
+            os.remove(path)
+            removed.append(name)
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the content-addressed table store")
+    parser.add_argument('--gc', action='store_true', help="delete unreferenced objects")
+    parser.add_argument('--migrate', action='store_true',
+                        help="delete plain *_cleaned.csv files superseded by the store")
+    args = parser.parse_args()
+
+    manifest = load_manifest()
+    for name, entry in sorted(manifest.items()):
+        print(f"  {name:<20} {entry['hash'][:12]}  {entry['bytes']:>12,} B -> {entry['stored_bytes']:>11,} B"
+              f"  ({entry['updated']})")
+    if not manifest:
+        print("Manifest is empty; run scripts/02_clean.py to populate the store.")
+    if args.gc:
+        print(f"Freed {gc():,} bytes of unreferenced objects")
+    if args.migrate:
+        removed = migrate()
+        print(f"Removed {len(removed)} plain CSV(s) superseded by the store: {', '.join(removed) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
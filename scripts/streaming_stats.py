@@ -0,0 +1,224 @@
+"""
+One-pass summary statistics over the anime table.
+Rows are consumed in chunks with no sort of the table (the digest only orders each
+chunk against its few hundred centroids); every statistic is a small mergeable
+state, so chunks (or workers) can be combined in any order:
+    count / mean / variance   pairwise co-moments merged with Chan's update (the
+                              batched form of Welford), so the diagonal gives each
+                              column's moments and the off-diagonal the correlations
+    correlation matrix        pairwise-complete, like DataFrame.corr()
+    min / max                 with the id and title of the row that attains them
+    quantiles                 merging t-digest (only centroids are kept)
+
+Usage:
+    python scripts/streaming_stats.py                   # stream the cleaned anime table
+    python scripts/streaming_stats.py --chunk-rows 5000 --workers 4
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from store import resolve
+from tables import input_dir
+
+# Settings
+COLUMNS = ['score', 'members', 'episodes', 'year']
+CHUNK_ROWS = 50000
+COMPRESSION = 200
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+
+class TDigest:
+    """Merging t-digest: centroids sized by the k1 scale function, so the tails stay exact"""
+
+    def __init__(self, compression=COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, np.ones(len(values))]))
+
+    def merge(self, other):
+        self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+
+    def _compress(self, means, weights):
+        """Group sorted points so that each centroid spans at most one unit of k"""
+        if len(means) == 0:
+            return
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        cluster = np.floor(k).astype(np.int64)
+        cluster -= cluster[0]
+        totals = np.bincount(cluster, weights=weights)
+        used = totals > 0
+        self.means = np.bincount(cluster, weights=weights * means)[used] / totals[used]
+        self.weights = totals[used]
+
+    def quantile(self, q, low, high):
+        """Approximate q-quantile(s), interpolating between centroid centres and the exact extremes"""
+        if len(self.weights) == 0:
+            return np.full(np.shape(q), np.nan)
+        cumulative = np.cumsum(self.weights)
+        centres = (cumulative - self.weights / 2) / cumulative[-1]
+        return np.interp(q, np.concatenate([[0.0], centres, [1.0]]), np.concatenate([[low], self.means, [high]]))
+
+
+class StreamingStats:
+    """Mergeable moments, co-moments, extremes and digests for a fixed set of numeric columns"""
+
+    def __init__(self, columns=COLUMNS, id_col='anime_id', label_col='title', compression=COMPRESSION):
+        p = len(columns)
+        self.columns, self.id_col, self.label_col = list(columns), id_col, label_col
+        # [i, j] entries are over rows where both column i and column j are present
+        self.n = np.zeros((p, p))
+        self.mean = np.zeros((p, p))   # mean of column i
+        self.sq = np.zeros((p, p))     # sum of squared deviations of column i
+        self.co = np.zeros((p, p))     # sum of cross deviations of columns i and j
+        self.min = np.full(p, np.inf)
+        self.max = np.full(p, -np.inf)
+        self.argmin = [None] * p
+        self.argmax = [None] * p
+        self.digests = [TDigest(compression) for _ in columns]
+
+    def update(self, chunk):
+        """Fold one chunk of rows into the state"""
+        other = StreamingStats(self.columns, self.id_col, self.label_col, self.digests[0].compression)
+        other._fill(chunk)
+        self.merge(other)
+        return self
+
+    def _fill(self, chunk):
+        X = chunk[self.columns].to_numpy(dtype=np.float64)
+        present = (~np.isnan(X)).astype(np.float64)
+        # Shift by the chunk means so the sums below do not cancel catastrophically
+        with np.errstate(invalid='ignore'):
+            shift = np.where(present.any(axis=0), np.nanmean(np.where(present > 0, X, np.nan), axis=0), 0.0)
+        Y = np.where(present > 0, X - shift, 0.0)
+
+        self.n = present.T @ present
+        sums = Y.T @ present
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shifted_mean = np.where(self.n > 0, sums / self.n, 0.0)
+            self.mean = shifted_mean + shift[:, None]
+            self.sq = (Y ** 2).T @ present - shifted_mean * sums
+            self.co = Y.T @ Y - shifted_mean * sums.T
+
+        ids = chunk[self.id_col].to_numpy() if self.id_col else np.arange(len(chunk))
+        labels = chunk[self.label_col].to_numpy() if self.label_col else ids
+        for i in range(len(self.columns)):
+            column = X[:, i]
+            if present[:, i].any():
+                lo, hi = np.nanargmin(column), np.nanargmax(column)
+                self.min[i], self.argmin[i] = column[lo], (ids[lo], labels[lo])
+                self.max[i], self.argmax[i] = column[hi], (ids[hi], labels[hi])
+            self.digests[i].update(column)
+
+    def merge(self, other):
+        """Combine another state (e.g. from a later chunk or another worker) into this one"""
+        n = self.n + other.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = other.mean - self.mean
+            weight = np.where(n > 0, self.n * other.n / n, 0.0)
+            self.mean = np.where(n > 0, self.mean + delta * other.n / n, 0.0)
+        self.sq = self.sq + other.sq + delta ** 2 * weight
+        self.co = self.co + other.co + delta * delta.T * weight
+        self.n = n
+        for i in range(len(self.columns)):
+            if other.min[i] < self.min[i]:
+                self.min[i], self.argmin[i] = other.min[i], other.argmin[i]
+            if other.max[i] > self.max[i]:
+                self.max[i], self.argmax[i] = other.max[i], other.argmax[i]
+            self.digests[i].merge(other.digests[i])
+        return self
+
+    def quantiles(self, column, q=QUANTILES):
+        i = self.columns.index(column)
+        return self.digests[i].quantile(q, self.min[i], self.max[i])
+
+    def summary(self, q=QUANTILES):
+        """Per-column count, mean, std, min/max (with the row attaining them) and quantiles"""
+        rows = []
+        for i, column in enumerate(self.columns):
+            count = self.n[i, i]
+            row = {
+                'column': column,
+                'count': int(count),
+                'mean': self.mean[i, i] if count else np.nan,
+                'std': np.sqrt(self.sq[i, i] / (count - 1)) if count > 1 else np.nan,
+                'min': self.min[i] if count else np.nan,
+                'max': self.max[i] if count else np.nan,
+                'argmin_id': self.argmin[i][0] if self.argmin[i] else None,
+                'argmin_label': self.argmin[i][1] if self.argmin[i] else None,
+                'argmax_id': self.argmax[i][0] if self.argmax[i] else None,
+                'argmax_label': self.argmax[i][1] if self.argmax[i] else None,
+            }
+            row.update({f"q{round(p * 100):02d}": v for p, v in zip(q, self.quantiles(column, q))})
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def correlation(self):
+        """Pairwise-complete Pearson correlation matrix"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = self.co / np.sqrt(self.sq * self.sq.T)
+        return pd.DataFrame(np.where(self.n > 1, r, np.nan), index=self.columns, columns=self.columns)
+
+
+def add_year(chunk):
+    """Release year column derived from start_date"""
+    return chunk.assign(year=pd.to_datetime(chunk['start_date'], errors='coerce').dt.year)
+
+
+def frame_chunks(df, chunk_rows=CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def summarize(chunks, columns=COLUMNS, id_col='anime_id', label_col='title'):
+    """StreamingStats over an iterable of chunks (or a single DataFrame)"""
+    if isinstance(chunks, pd.DataFrame):
+        chunks = frame_chunks(chunks)
+    stats = StreamingStats(columns, id_col, label_col)
+    for chunk in chunks:
+        stats.update(add_year(chunk) if 'year' in columns and 'year' not in chunk else chunk)
+    return stats
+
+
+def _chunk_stats(chunk):
+    return StreamingStats().update(add_year(chunk))
+
+
+def summarize_table(name="anime", chunk_rows=CHUNK_ROWS, workers=1):
+    """Stream a cleaned table from disk, optionally folding chunks in a process pool"""
+    chunks = pd.read_csv(resolve(name, input_dir), chunksize=chunk_rows)
+    if workers <= 1:
+        return summarize(chunks)
+    stats = StreamingStats()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for partial in pool.map(_chunk_stats, chunks):
+            stats.merge(partial)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="One-pass summary statistics of the anime table")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=1, help=f"processes (up to {os.cpu_count()} here)")
+    args = parser.parse_args()
+
+    stats = summarize_table(chunk_rows=args.chunk_rows, workers=args.workers)
+    print(stats.summary().to_string(index=False))
+    print("\nCorrelations:")
+    print(stats.correlation().round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
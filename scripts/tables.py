@@ -0,0 +1,215 @@
+"""
+Shared loading of the cleaned tables.
+Phase scripts accept a preloaded {table_name: DataFrame} dict so batch runs can
+read the data once and hand the same tables to every phase.
+
+Preview mode (`--sample [FRACTION]` on the phase scripts, or sample_fraction set here)
+loads a deterministic stratified sample of anime instead: about FRACTION of the titles
+in every (release year, type) stratum, chosen by a seeded hash of anime_id so the same
+titles are picked on every run and as the catalogue grows. Relationship tables are
+semi-joined to the sampled titles (voice actors through their characters), so the
+sample is referentially consistent, and the result is cached in data/cache/samples/.
+
+When entity_resolution.py has written a canonical id map, relationship tables are read
+with every company/person id replaced by its canonical id (credits the merge made
+identical dropped, other duplicate rows kept) and entity names by the canonical name,
+so aliases of one studio or person count once.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from store import content_hash, load_manifest, resolve
+
+input_dir = "data/cleaned"
+sample_dir = "data/cache/samples"
+entity_map_path = "data/entities/canonical_ids.csv"
+
+TABLE_NAMES = [
+    "anime",
+    "anime_characters",
+    "anime_companies",
+    "anime_genres",
+    "anime_staff",
+    "anime_voice_actors",
+    "entities",
+]
+
+# Entity id column of each relationship table, rewritten to canonical ids on read
+ENTITY_COLUMNS = {
+    "anime_companies": "company_id",
+    "anime_staff": "person_id",
+    "anime_voice_actors": "person_id",
+}
+resolve_entities = True
+
+# Preview sampling: None loads everything
+sample_fraction = None
+SAMPLE_FRACTION = 0.1
+SAMPLE_SEED = 42
+
+# Samples already loaded in this process, by cache path
+_samples = {}
+# Entity map already loaded in this process, as (file modification time, map)
+_entity_map = (None, None)
+
+
+def entity_map():
+    """Canonical ids (entity_id, canonical_id, canonical_name) of merged entities, or None"""
+    global _entity_map
+    if not resolve_entities or not os.path.exists(entity_map_path):
+        return None
+    mtime = os.path.getmtime(entity_map_path)
+    if _entity_map[0] != mtime:
+        _entity_map = (mtime, pd.read_csv(entity_map_path))
+    return _entity_map[1]
+
+
+def merged_duplicates(df, column, mapping):
+    """The table with `column` mapped to canonical ids, and a mask of the remapped rows the
+    merge made identical to a row of another member of their group (duplicate rows already
+    in the table are not marked)"""
+    ids = mapping.set_index('entity_id')['canonical_id']
+    original = df[column]
+    df = df.assign(**{column: original.map(ids).fillna(original).astype(original.dtype)})
+    remapped = df[column] != original
+    duplicate = pd.Series(False, index=df.index)
+    if remapped.any():
+        # Among identical rows, keep those of one source id: the canonical id itself, else the smallest
+        source = original.where(remapped, -1)
+        groups = df.groupby(list(df.columns), dropna=False, sort=False).ngroup()
+        duplicate = remapped & (source != source.groupby(groups).transform('min'))
+    return df, duplicate
+
+
+def canonicalize(name, df, mapping):
+    """Rewrite a table's entity ids (or, for entities, names) to their canonical form.
+    A remapped row is dropped only when the merge made it identical to a row of another
+    member of its group; duplicate rows already in the table are left alone."""
+    if name in ENTITY_COLUMNS:
+        df, duplicate = merged_duplicates(df, ENTITY_COLUMNS[name], mapping)
+        df = df[~duplicate].reset_index(drop=True)
+    elif name == "entities":
+        names = mapping.set_index('entity_id')['canonical_name']
+        df['name'] = df['entity_id'].map(names).fillna(df['name'])
+    return df
+
+
+def read_table(name, canonical=True):
+    """Read one cleaned table (resolved through the store manifest); anime dates are parsed
+    and, unless canonical=False, merged entities are mapped to their canonical ids"""
+    df = pd.read_csv(resolve(name, input_dir))
+    if name == "anime":
+        df['start_date'] = pd.to_datetime(df['start_date'])
+    mapping = entity_map() if canonical else None
+    if mapping is not None:
+        df = canonicalize(name, df, mapping)
+    return df
+
+
+def load_tables(names=None, sample=None):
+    """Read the requested cleaned tables (all of them by default) as {name: DataFrame}.
+    With a sample fraction (or sample_fraction set), the tables come from the cached preview sample."""
+    sample = sample if sample is not None else sample_fraction
+    if sample:
+        tables = load_sample(sample)
+        return {name: tables[name] for name in (names or TABLE_NAMES)}
+    return {name: read_table(name) for name in (names or TABLE_NAMES)}
+
+
+def semi_join(tables, anime):
+    """Restrict every relationship table to the given anime (voice actors through their characters)"""
+    restricted = dict(tables)
+    restricted['anime'] = anime
+    anime_ids = anime['anime_id']
+    for name in ['anime_characters', 'anime_companies', 'anime_genres', 'anime_staff']:
+        if name in tables:
+            restricted[name] = tables[name][tables[name]['anime_id'].isin(anime_ids)]
+    if 'anime_voice_actors' in tables and 'anime_characters' in restricted:
+        voice_actors = tables['anime_voice_actors']
+        restricted['anime_voice_actors'] = voice_actors[
+            voice_actors['character_id'].isin(restricted['anime_characters']['character_id'])]
+    return restricted
+
+
+def sample_keys(anime_ids, seed=SAMPLE_SEED):
+    """Seeded 64-bit hash of each anime_id (splitmix64), the per-title sampling order"""
+    x = np.asarray(anime_ids, dtype=np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def stratified_sample(anime, fraction=SAMPLE_FRACTION, seed=SAMPLE_SEED):
+    """About `fraction` of the titles of every (year, type) stratum, at least one per stratum"""
+    strata = pd.DataFrame({
+        'year': pd.to_datetime(anime['start_date'], errors='coerce').dt.year.fillna(-1).to_numpy(),
+        'type': anime['type'].fillna('Unknown').to_numpy(),
+        'key': sample_keys(anime['anime_id'], seed),
+    })
+    groups = strata.groupby(['year', 'type'])['key']
+    keep = groups.rank(method='first') <= np.ceil(groups.transform('size') * fraction)
+    return anime[keep.to_numpy()]
+
+
+def entity_map_hash():
+    """Content hash of the canonical id map, or None when no map is applied"""
+    if entity_map() is None:
+        return None
+    with open(entity_map_path, "rb") as f:
+        return content_hash(f.read())
+
+
+def sample_path(fraction, seed):
+    """Cache file for a sample, keyed by its parameters and the stored table versions"""
+    manifest = load_manifest(input_dir)
+    versions = {name: manifest[name]['hash'] if name in manifest else os.path.getmtime(resolve(name, input_dir))
+                for name in TABLE_NAMES}
+    if entity_map() is not None:
+        versions['entity_map'] = entity_map_hash()
+    key = content_hash(json.dumps({'fraction': fraction, 'seed': seed, 'tables': versions}, sort_keys=True).encode())
+    return os.path.join(sample_dir, f"sample-{fraction:g}-{key[:16]}.pkl")
+
+
+def load_sample(fraction=SAMPLE_FRACTION, seed=SAMPLE_SEED):
+    """All tables restricted to the stratified anime sample, built once per table version"""
+    path = sample_path(fraction, seed)
+    if path in _samples:
+        return _samples[path]
+    if os.path.exists(path):
+        _samples[path] = pd.read_pickle(path)
+        return _samples[path]
+
+    print(f"Building a {fraction:.0%} stratified sample of the cleaned tables...")
+    tables = {name: read_table(name) for name in TABLE_NAMES}
+    sampled = semi_join(tables, stratified_sample(tables['anime'], fraction, seed))
+    print(f"  {len(sampled['anime']):,} of {len(tables['anime']):,} anime")
+
+    os.makedirs(sample_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pd.to_pickle(sampled, tmp_path)
+    os.replace(tmp_path, path)
+    _samples[path] = sampled
+    return sampled
+
+
+def sample_tables():
+    """Every table of the preview sample while sampling is active, else None"""
+    return load_sample(sample_fraction) if sample_fraction else None
+
+
+def add_sample_argument(parser):
+    """`--sample [FRACTION]` for a phase script's command line"""
+    parser.add_argument('--sample', nargs='?', type=float, const=SAMPLE_FRACTION, default=None, metavar='FRACTION',
+                        help=f"preview on a stratified sample of the titles (default fraction {SAMPLE_FRACTION})")
+
+
+def use_sample(fraction):
+    """Make every load_tables() call in this process read the preview sample"""
+    global sample_fraction
+    sample_fraction = fraction
+    if fraction:
+        print(f"Preview mode: {fraction:.0%} stratified sample")
@@ -0,0 +1,126 @@
+"""
+Synopsis text features.
+Streams `anime.synopsis` in chunks through a stateless HashingVectorizer (no vocabulary
+in memory, so chunks can be hashed in parallel), applies TF-IDF weighting, and caches
+the sparse matrix on disk. Used by the score model (08_ml_model.py --synopsis) and
+the similarity index (similarity.py --synopsis-weight).
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import GroupKFold, cross_val_predict
+
+from tables import input_dir
+from store import resolve
+
+# Settings
+features_dir = "data/features"
+N_FEATURES = 2 ** 18
+CHUNK_ROWS = 20000
+
+vectorizer = HashingVectorizer(
+    n_features=N_FEATURES,
+    alternate_sign=False,
+    norm=None,
+    stop_words='english',
+    ngram_range=(1, 2),
+    dtype=np.float32,
+)
+
+
+def _hash_chunk(texts):
+    return vectorizer.transform(texts)
+
+
+def stream_synopses(path, chunk_rows=CHUNK_ROWS):
+    """Yield (anime_ids, synopses) chunks without loading the whole table"""
+    for chunk in pd.read_csv(path, usecols=['anime_id', 'synopsis'], chunksize=chunk_rows):
+        yield chunk['anime_id'].to_numpy(), chunk['synopsis'].fillna("").tolist()
+
+
+def build_tfidf(path, workers=None):
+    """Hashed term counts per chunk (in parallel), then sublinear TF-IDF; returns (matrix, anime_ids)"""
+    id_parts, count_parts = [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for anime_ids, texts in stream_synopses(path):
+            id_parts.append(anime_ids)
+            futures.append(pool.submit(_hash_chunk, texts))
+        count_parts = [future.result() for future in futures]
+
+    counts = sparse.vstack(count_parts, format='csr')
+    tfidf = TfidfTransformer(sublinear_tf=True).fit_transform(counts)
+    return tfidf.astype(np.float32), np.concatenate(id_parts)
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime, 'n_features': N_FEATURES}
+
+
+def load_synopsis_tfidf(workers=None, rebuild=False):
+    """Cached synopsis TF-IDF matrix and its anime_ids, rebuilt when the anime table changes"""
+    path = resolve("anime", input_dir)
+    matrix_path = os.path.join(features_dir, "synopsis_tfidf.npz")
+    ids_path = os.path.join(features_dir, "synopsis_anime_ids.npy")
+    meta_path = os.path.join(features_dir, "synopsis_tfidf.json")
+
+    signature = _source_signature(path)
+    if not rebuild and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f) == signature:
+                return sparse.load_npz(matrix_path).tocsr(), np.load(ids_path)
+
+    print("Building synopsis TF-IDF features...")
+    start = time.time()
+    matrix, anime_ids = build_tfidf(path, workers)
+    os.makedirs(features_dir, exist_ok=True)
+    sparse.save_npz(matrix_path, matrix)
+    np.save(ids_path, anime_ids)
+    with open(meta_path, "w") as f:
+        json.dump(signature, f)
+    print(f"  {matrix.shape[0]:,} synopses, {matrix.nnz:,} non-zeros in {time.time() - start:.1f}s")
+    return matrix, anime_ids
+
+
+def align_rows(matrix, matrix_ids, anime_ids):
+    """Rows of the matrix in the order of anime_ids (all-zero rows for ids without a synopsis)"""
+    positions = pd.Index(matrix_ids).get_indexer(anime_ids)
+    found = positions >= 0
+    # Select through a sparse permutation so nothing is densified
+    selector = sparse.csr_matrix(
+        (np.ones(found.sum(), dtype=np.float32), (np.flatnonzero(found), positions[found])),
+        shape=(len(anime_ids), matrix.shape[0]),
+    )
+    return selector @ matrix
+
+
+def synopsis_score_feature(train_matrix, y_train, test_matrix, groups=None, folds=5, alpha=1.0):
+    """Ridge prediction of the score from synopsis text: out-of-fold for the training rows
+    (by group when given), then one refit on all of them for the test rows"""
+    cv = GroupKFold(n_splits=folds) if groups is not None else folds
+    train_score = cross_val_predict(Ridge(alpha=alpha), train_matrix, y_train, cv=cv, groups=groups)
+    test_score = Ridge(alpha=alpha).fit(train_matrix, y_train).predict(test_matrix)
+    return train_score, test_score
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the synopsis TF-IDF feature cache")
+    parser.add_argument('--rebuild', action='store_true')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    matrix, _ = load_synopsis_tfidf(args.workers, args.rebuild)
+    print(f"Synopsis features: {matrix.shape[0]:,} x {matrix.shape[1]:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Shared test helpers. The scripts import each other as top-level modules and read and
+write every data path relative to the working directory, so each test that touches
+files runs in its own temporary project directory (the `project` fixture).
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import tables  # noqa: E402
+from store import commit_table, frame_bytes, load_manifest, save_manifest  # noqa: E402
+
+COMPANIES = np.arange(1, 13)
+PEOPLE = np.arange(13, 41)
+CHARACTERS = np.arange(41, 71)
+GENRES = ['Action', 'Comedy', 'Drama', 'Fantasy', 'Romance', 'Sci-Fi']
+
+
+def make_tables(seed=0, n_anime=80, n_credits=200):
+    """Small random cleaned tables in the data/raw schema; scores are multiples of 0.5"""
+    rng = np.random.default_rng(seed)
+    anime_ids = np.arange(1, n_anime + 1)
+    start = pd.Timestamp('1990-01-01') + pd.to_timedelta(rng.integers(0, 30 * 365, n_anime), unit='D')
+
+    def credits(columns, keys):
+        frame = pd.DataFrame({name: rng.choice(values, n_credits) for name, values in columns.items()})
+        return frame.drop_duplicates(keys, ignore_index=True)
+
+    return {
+        'anime': pd.DataFrame({
+            'anime_id': anime_ids,
+            'title': [f"Title {i}" for i in anime_ids],
+            'score': np.where(rng.random(n_anime) < 0.1, np.nan, rng.integers(10, 19, n_anime) / 2),
+            'members': rng.integers(100, 100000, n_anime),
+            'episodes': rng.integers(1, 50, n_anime),
+            'type': rng.choice(['TV', 'Movie', 'OVA'], n_anime),
+            'start_date': start.strftime('%Y-%m-%d'),
+            'synopsis': [f"Synopsis {i}" for i in anime_ids],
+            'end_date': (start + pd.Timedelta(days=90)).strftime('%Y-%m-%d'),
+        }),
+        'entities': pd.DataFrame({
+            'entity_id': np.arange(1, CHARACTERS[-1] + 1),
+            'name': [f"Entity {i}" for i in range(1, CHARACTERS[-1] + 1)],
+        }),
+        'anime_characters': credits({'anime_id': anime_ids, 'character_id': CHARACTERS,
+                                     'role': ['Main', 'Supporting']}, ['anime_id', 'character_id']),
+        'anime_companies': credits({'anime_id': anime_ids, 'company_id': COMPANIES,
+                                    'role': ['Studio', 'Producer']}, ['anime_id', 'company_id', 'role']),
+        'anime_genres': credits({'anime_id': anime_ids, 'genre': GENRES}, ['anime_id', 'genre']),
+        'anime_staff': credits({'anime_id': anime_ids, 'person_id': PEOPLE,
+                                'role': ['Director', 'Episode Director', 'Producer']}, ['anime_id', 'person_id']),
+        'anime_voice_actors': credits({'character_id': CHARACTERS, 'person_id': PEOPLE,
+                                       'language': ['Japanese', 'English']},
+                                      ['character_id', 'person_id', 'language']),
+    }
+
+
+def write_cleaned(frames):
+    """Commit tables to the cleaned store, as 02_clean.py does"""
+    manifest = load_manifest(tables.input_dir)
+    for name, df in frames.items():
+        commit_table(manifest, name, frame_bytes(df), tables.input_dir)
+    save_manifest(manifest, tables.input_dir)
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """An empty project directory as the working directory, with no entity map loaded"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tables, '_entity_map', (None, None))
+    return tmp_path
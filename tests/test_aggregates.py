@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+import aggregates
+from conftest import make_tables
+from incremental import apply_changes, diff_table
+from schema import PRIMARY_KEYS
+
+
+def signed(frames):
+    """Source tables as aggregates.load_tables returns them"""
+    return {name: frames[name][columns].assign(sign=1) for name, columns in aggregates.SOURCE_COLUMNS.items()}
+
+
+def edited(frames, seed=1):
+    """A later version of the tables: rescored, deleted, inserted and re-credited rows"""
+    rng = np.random.default_rng(seed)
+    new = {name: df.copy() for name, df in frames.items()}
+    anime = new['anime']
+    rescored = rng.choice(anime.index, 10, replace=False)
+    anime.loc[rescored, 'score'] = rng.integers(10, 19, 10) / 2
+    anime.loc[rescored[:2], 'score'] = np.nan
+    added = anime.tail(3).assign(anime_id=anime['anime_id'].max() + np.arange(1, 4))
+    new['anime'] = pd.concat([anime.drop(anime.index[:3]), added], ignore_index=True)
+
+    companies = new['anime_companies']
+    studios = companies.index[companies['role'] == 'Studio'][:5]
+    companies.loc[studios, 'role'] = 'Producer'
+    new['anime_companies'] = companies.drop_duplicates(PRIMARY_KEYS['anime_companies'], ignore_index=True)
+
+    staff = new['anime_staff']
+    staff.loc[staff.index[:6], 'role'] = 'Director'
+    new['anime_staff'] = staff.drop(staff.index[-4:])
+
+    characters = new['anime_characters']
+    new['anime_characters'] = pd.concat([characters.drop(characters.index[:5]), pd.DataFrame(
+        {'anime_id': added['anime_id'], 'character_id': [41, 42, 43], 'role': 'Main'})], ignore_index=True)
+
+    voice_actors = new['anime_voice_actors']
+    new['anime_voice_actors'] = pd.concat([voice_actors, pd.DataFrame(
+        {'character_id': [41, 42, 43], 'person_id': [13, 14, 15], 'language': 'Japanese'})]).drop_duplicates(
+        PRIMARY_KEYS['anime_voice_actors'], ignore_index=True)
+    return new
+
+
+def sorted_rows(df):
+    return df.sort_values(list(df.columns), ignore_index=True)
+
+
+def test_changelog_round_trip_matches_full_recompute():
+    old = make_tables()
+    new = edited(old)
+    changesets = {name: diff_table(old[name], new[name], PRIMARY_KEYS[name]) for name in aggregates.SOURCE_COLUMNS}
+    assert all(len(changes) for changes in changesets.values())
+
+    # Applying the changelog to the old table gives the new one
+    for name, changes in changesets.items():
+        pd.testing.assert_frame_equal(sorted_rows(apply_changes(old[name], changes)), sorted_rows(new[name]))
+
+    # Deltas from the changelog bring the old aggregates to a full recompute of the new tables
+    updated = aggregates.apply_deltas(aggregates.compute_all(signed(old)),
+                                      aggregates.compute_deltas(signed(new), changesets))
+    assert aggregates.verify(updated, signed(new))
+
+
+def test_verify_detects_a_stale_aggregate():
+    old = make_tables()
+    new = edited(old)
+    assert not aggregates.verify(aggregates.compute_all(signed(old)), signed(new))
@@ -0,0 +1,72 @@
+import os
+
+import pandas as pd
+import pytest
+
+import lazy_engine
+import query
+import tables
+from conftest import make_tables, write_cleaned
+
+# Companies 2 and 3 merge into 1, person 14 into 13; person 16 into 15, which is not listed itself
+MAPPING = pd.DataFrame({
+    'entity_id': [1, 2, 3, 13, 14, 16],
+    'canonical_id': [1, 1, 1, 13, 13, 15],
+    'canonical_name': ["Studio One", "Studio One", "Studio One", "Person", "Person", "Other Person"],
+})
+
+# Rows the merge makes identical, rows it only remaps, and duplicates already in the table
+EDGE_ROWS = {
+    'anime_companies': pd.DataFrame({'anime_id': [1, 1, 1, 2, 2, 3, 3],
+                                     'company_id': [1, 2, 3, 2, 3, 2, 2],
+                                     'role': ['Studio'] * 7}),
+    'anime_staff': pd.DataFrame({'anime_id': [1, 1, 1, 2, 2, 3, 3],
+                                 'person_id': [13, 14, 14, 16, 16, 15, 16],
+                                 'role': ['Director', 'Director', 'Producer', 'Director', 'Director',
+                                          'Director', 'Director']}),
+    'anime_voice_actors': pd.DataFrame({'character_id': [41, 41, 42],
+                                        'person_id': [13, 14, 14],
+                                        'language': ['Japanese', 'Japanese', 'English']}),
+}
+
+
+@pytest.fixture
+def merged_store(project):
+    frames = make_tables()
+    for name, rows in EDGE_ROWS.items():
+        key = 'character_id' if name == 'anime_voice_actors' else 'anime_id'
+        frames[name] = pd.concat([frames[name][~frames[name][key].isin(rows[key])], rows], ignore_index=True)
+    write_cleaned(frames)
+    os.makedirs(os.path.dirname(tables.entity_map_path))
+    MAPPING.to_csv(tables.entity_map_path, index=False)
+    return frames
+
+
+def sorted_rows(df):
+    return df.sort_values(list(df.columns), ignore_index=True)
+
+
+@pytest.mark.parametrize('name', [*tables.ENTITY_COLUMNS, 'entities'])
+def test_engines_canonicalize_alike(merged_store, name):
+    expected = sorted_rows(tables.read_table(name))
+    con = query.connect()
+    duck = sorted_rows(con.execute(f"SELECT * FROM {name}").df())
+    lazy = sorted_rows(lazy_engine.collect(lazy_engine.scan(name)))
+    pd.testing.assert_frame_equal(duck, expected, check_dtype=False)
+    pd.testing.assert_frame_equal(lazy, expected, check_dtype=False)
+
+
+def test_only_rows_the_merge_made_identical_collapse(merged_store):
+    staff = tables.read_table('anime_staff')
+    counts = staff.groupby(['anime_id', 'person_id', 'role']).size()
+    assert counts[(1, 13, 'Director')] == 1
+    assert counts[(1, 13, 'Producer')] == 1
+    # A duplicate already in the table stays; 16's row collapses only into an existing row of 15
+    assert counts[(2, 15, 'Director')] == 2
+    assert counts[(3, 15, 'Director')] == 1
+    assert set(staff['person_id']).isdisjoint({14, 16})
+
+    companies = tables.read_table('anime_companies')
+    studios = companies[companies['role'] == 'Studio'].groupby(['anime_id', 'company_id']).size()
+    assert studios[(2, 1)] == 1
+    assert studios[(3, 1)] == 2
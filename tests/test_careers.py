@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from careers import Careers
+
+
+@pytest.fixture
+def credits():
+    """Random credits with repeated days, unscored titles and scores exact in binary"""
+    rng = np.random.default_rng(0)
+    n = 600
+    return pd.DataFrame({
+        'person_id': rng.integers(1, 40, n),
+        'date': np.datetime64('2000-01-01') + rng.integers(0, 20 * 365, n // 3).repeat(3)[rng.permutation(n)],
+        'anime_id': rng.permutation(n),
+        'score': np.where(rng.random(n) < 0.15, np.nan, rng.integers(10, 19, n) / 2),
+        'members': rng.integers(100, 10000, n).astype(float),
+    })
+
+
+def careers_of(credits):
+    return Careers(credits['person_id'].to_numpy(), credits['date'].to_numpy(), credits['anime_id'].to_numpy(),
+                   credits['score'].to_numpy(), credits['members'].to_numpy())
+
+
+def naive_peaks(credits, years, min_credits):
+    """Best `years`-long window per person, trying every credit day as a start (earliest wins ties)"""
+    span = pd.Timedelta(days=round(years * 365.25))
+    rows = []
+    for person, group in credits.sort_values(['person_id', 'date', 'anime_id']).groupby('person_id'):
+        best = None
+        for start in group['date'].unique():
+            window = group[(group['date'] >= start) & (group['date'] < start + span)]
+            scores = window['score'].dropna()
+            if len(scores) >= min_credits and (best is None or scores.mean() > best[2]):
+                best = (start, window['date'].max(), scores.mean(), len(scores))
+        if best is not None:
+            rows.append((person, *best))
+    return pd.DataFrame(rows, columns=['person_id', 'peak_start', 'peak_end', 'peak_mean', 'peak_credits'])
+
+
+@pytest.mark.parametrize('window', [1, 3, 5])
+def test_rolling_mean_matches_groupby(credits, window):
+    expected = (credits.sort_values(['person_id', 'date', 'anime_id'], ignore_index=True)
+                .groupby('person_id')['score'].transform(lambda s: s.rolling(window, min_periods=1).mean()))
+    actual = careers_of(credits).credits_frame(window)['rolling_mean']
+    np.testing.assert_allclose(actual, expected)
+
+
+@pytest.mark.parametrize('years, min_credits', [(5, 3), (2, 1), (0.5, 2)])
+def test_peak_periods_match_naive_windows(credits, years, min_credits):
+    actual = careers_of(credits).peak_periods(years, min_credits)
+    expected = naive_peaks(credits, years, min_credits)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
@@ -0,0 +1,43 @@
+import sqlite3
+
+import pandas as pd
+
+import export_sqlite
+from conftest import make_tables, write_cleaned
+from results import save_results
+
+
+def bookkeeping(path):
+    """export_tables rows (name, hash, n_rows, exported time) by name"""
+    with sqlite3.connect(path) as con:
+        return {row[0]: row for row in con.execute("SELECT * FROM export_tables")}
+
+
+def exported_project():
+    write_cleaned(make_tables())
+    save_results('demo', {'mean_score': 7.25, 'top': pd.DataFrame({'name': ['a', 'b'], 'value': [1, 2]})})
+    export_sqlite.export("export.sqlite")
+    return bookkeeping("export.sqlite")
+
+
+def test_export_rerun_is_a_no_op(project, capsys):
+    first = exported_project()
+    assert {'studio_stats', 'studio_genre', 'demo_top', 'metrics'} <= set(first)
+    capsys.readouterr()
+
+    export_sqlite.export("export.sqlite")
+    assert f"0 of {len(first)} table(s) changed" in capsys.readouterr().out
+    assert bookkeeping("export.sqlite") == first
+
+
+def test_export_rewrites_only_changed_tables(project, capsys):
+    first = exported_project()
+    save_results('demo', {'mean_score': 7.5, 'top': pd.DataFrame({'name': ['a', 'b'], 'value': [1, 2]})})
+    capsys.readouterr()
+
+    export_sqlite.export("export.sqlite")
+    assert f"1 of {len(first)} table(s) changed" in capsys.readouterr().out
+    second = bookkeeping("export.sqlite")
+    assert [name for name in first if second[name] != first[name]] == ['metrics']
+    with sqlite3.connect("export.sqlite") as con:
+        assert con.execute("SELECT value FROM metrics WHERE name = 'mean_score'").fetchone() == (7.5,)
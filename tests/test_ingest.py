@@ -0,0 +1,41 @@
+import os
+
+from conftest import make_tables
+from ingest import EntityRegistry, existing_entities
+
+
+def raw_snapshot(directory):
+    """A data/raw snapshot where two people share a name"""
+    frames = make_tables()
+    people = frames['anime_staff']['person_id'].drop_duplicates().sort_values().to_numpy()
+    entities = frames['entities']
+    entities.loc[entities['entity_id'].isin(people[:2]), 'name'] = "Namesake"
+    os.makedirs(directory)
+    for name, df in frames.items():
+        df.to_csv(os.path.join(directory, f"{name}.csv"), index=False)
+    return frames, people
+
+
+def test_registry_seeds_from_the_raw_snapshot_without_renumbering(project):
+    frames, people = raw_snapshot("raw")
+    existing = existing_entities("raw")
+    studio = int(frames['anime_companies']['company_id'].iloc[0])
+    person = int(people[2])
+    max_id = int(frames['entities']['entity_id'].max())
+
+    registry = EntityRegistry("entity_registry.csv", existing)
+    assert registry.id('company', 900, f"Entity {studio}") == studio
+    assert registry.id('person', 901, f"Entity {person}") == person
+    # Namesakes are claimed in id order, and a name is only matched within its kind
+    assert registry.id('person', 902, "Namesake") == people[0]
+    assert registry.id('person', 903, "Namesake") == people[1]
+    assert registry.id('person', 904, "Namesake") == max_id + 1
+    assert registry.id('character', 905, f"Entity {studio}") == max_id + 2
+    registry.save()
+
+    reloaded = EntityRegistry("entity_registry.csv", existing)
+    assert reloaded.id('company', 900, f"Entity {studio}") == studio
+    assert reloaded.id('person', 903, "Namesake") == people[1]
+    # Ids already registered are never handed out again
+    assert reloaded.id('person', 906, "Namesake") == max_id + 3
+    assert reloaded.id('person', 907, f"Entity {person}") == max_id + 4